@@ -90,6 +90,70 @@ FORMATO_FECHA_SHIFT = '%d-%m-%Y'  # DD-MM-YYYY
 # Extensiones de archivo permitidas
 EXTENSIONES_PERMITIDAS = ['.csv', '.xlsx', '.xls']
 
+# ============================================
+# PROCESAMIENTO
+# ============================================
+# Procesar archivos en paralelo (un proceso por archivo). Opcional: por defecto serial
+PROCESAMIENTO_PARALELO = False
+
+# Número máximo de procesos (None = número de CPUs)
+MAX_WORKERS_PROCESAMIENTO = None
+
+# Versión del procesamiento por archivo (columnas y cálculos de cada partición). Subirla cuando
+# cambie la salida de _process_and_merge: las particiones y cachés de versiones anteriores se
+# vuelven a procesar. 3: columnas de percentil opcionales (COLUMNAS_PERCENTIL entra en la llave)
+ESQUEMA_PROCESAMIENTO = 3
+
+# Caché de archivos ya procesados (llave: hash del archivo + indicador + máquina + asignaciones + esquema)
+INGESTION_CACHE_MAX_MB = 256       # Presupuesto de memoria
+INGESTION_CACHE_DIR = None         # Carpeta para caché en disco (None = solo memoria)
+
+# Dataset consolidado persistido (Parquet particionado por indicador y máquina)
+DATASET_STORE_DIR = 'data/store'
+
+# Registro compartido entre sesiones: versiones del dataset que se conservan en memoria
+REGISTRO_MAX_VERSIONES = 3
+
+# Resultados de filtros recientes que se memorizan por versión del dataset
+FILTRO_MEMO_MAX = 32
+
+# Resultados de agregaciones memorizados (promedios por week/mes, gráficos, rankings)
+AGREGACION_MEMO_MAX = 256
+
+# Figuras de Plotly memorizadas (serializadas) por huella de los datos y parámetros del gráfico
+FIGURA_CACHE_MAX = 128
+
+# Valores atípicos: límites IQR calculados por grupo (cada máquina y turno tiene su nivel base)
+OUTLIER_AGRUPACION = ['maquina', 'turno']
+
+# Pesos de los KPIs en el Score Global de los rankings (KPIs no listados pesan 1)
+RANKING_PESOS_KPI = {}
+
+# Intervalos de confianza bootstrap de los rankings (remuestreo de registros por entidad)
+BOOTSTRAP_REMUESTRAS = 1000
+BOOTSTRAP_NIVEL = 0.95
+BOOTSTRAP_SEMILLA = 42          # Semilla fija: mismos intervalos en cada rerun de Streamlit
+BOOTSTRAP_BLOQUE_MAX = 2000000  # Máximo de índices remuestreados en memoria a la vez
+
+# Percentil de cada registro calculado al consolidar (columna -> grupo; cada archivo es una máquina).
+# Opcional (float32 por columna y registro): p. ej. {'pct_maquina': ['maquina'], 'pct_turno': ['maquina', 'turno']}
+COLUMNAS_PERCENTIL = {}
+
+# Sketch de cuantiles del cubo de KPIs: error máximo = (máximo - mínimo) / QUANTIL_BINS
+QUANTIL_BINS = 1024
+QUANTIL_EXACTO_MAX = 20000  # Selecciones con hasta estos registros usan cuantiles exactos
+
+# Decimación de series largas en gráficos: puntos por serie = ancho (px) x puntos por pixel
+GRAFICO_ANCHO_PX = 1200
+DECIMACION_PUNTOS_POR_PX = 2
+WEBGL_UMBRAL_PUNTOS = 5000  # Con más puntos por gráfico se usan trazas WebGL (Scattergl)
+BOX_MAX_OUTLIERS = 200      # Valores atípicos dibujados por caja en box plots e histogramas
+
+# Representación compacta en memoria de los DataFrames consolidados
+COLUMNAS_CATEGORICAS = ['maquina', 'turno', 'operador', 'coordinador', 'dia_semana', 'fecha_str']
+COLUMNAS_CALENDARIO_TIPOS = {'dia': 'int8', 'mes': 'int8', 'week': 'int8', 'mes_asignado': 'int8', 'año': 'int16'}
+KPI_FLOAT32 = False  # Guardar el KPI como float32 (menos memoria, menor precisión)
+
 # ============================================
 # COLORES PARA VISUALIZACIONES
 # ============================================
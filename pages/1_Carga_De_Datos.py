@@ -1,11 +1,22 @@
+import os
 import streamlit as st
 import pandas as pd
-from Config.constants import MAQUINAS, INDICADORES, FECHA_INICIO, FECHA_FIN
+from Config.constants import (
+    MAQUINAS,
+    INDICADORES,
+    FECHA_INICIO,
+    FECHA_FIN,
+    PROCESAMIENTO_PARALELO,
+    MAX_WORKERS_PROCESAMIENTO
+)
 from utils import (
     load_asignaciones_csv,
     consolidate_all_data,
     save_to_session_state,
-    check_data_completeness
+    check_data_completeness,
+    clear_dataset,
+    load_from_session_state,
+    get_dataset_registry
 )
 
 # ============================
@@ -45,6 +56,10 @@ with st.expander("📋 **Instrucciones de Carga**", expanded=True):
     4. Haz clic en **"Procesar Datos"** para validar y cargar
     
     ⚠️ **Nota**: No es necesario subir los 4 indicadores para todas las máquinas. Puedes cargar datos parciales.
+    
+    🔁 **Reemplazo de archivos**: Cada archivo reemplaza solo los datos de su máquina e indicador.
+    Los datos cargados previamente para otras máquinas o indicadores se conservan
+    (usa **Limpiar Todo** en Opciones Avanzadas para empezar de cero).
     """)
 
 st.markdown("---")
@@ -150,6 +165,21 @@ if total_files == 0:
     st.warning("⚠️ No hay archivos subidos. Sube al menos un archivo para continuar.")
     st.stop()
 
+with st.expander("⚙️ Opciones de Procesamiento"):
+    procesamiento_paralelo = st.checkbox(
+        "Procesar archivos en paralelo",
+        value=PROCESAMIENTO_PARALELO,
+        help="Procesa cada archivo en un proceso separado. Útil cuando se suben muchos archivos"
+    )
+    max_workers = st.number_input(
+        "Número máximo de procesos:",
+        min_value=1,
+        max_value=max(os.cpu_count() or 1, 1),
+        value=min(MAX_WORKERS_PROCESAMIENTO or os.cpu_count() or 1, max(os.cpu_count() or 1, 1)),
+        step=1,
+        disabled=not procesamiento_paralelo
+    )
+
 col_btn1, col_btn2 = st.columns([1, 3])
 with col_btn1:
     process_button = st.button("🚀 Procesar Datos", type="primary", use_container_width=True)
@@ -176,7 +206,14 @@ if process_button:
         
         # 2. Consolidar archivos
         st.info("🔄 Validando y procesando archivos...")
-        consolidated_data, reportes = consolidate_all_data(uploaded_data, df_asignaciones)
+        # Los archivos reemplazan solo su partición (máquina, indicador) en el dataset actual
+        consolidated_data, reportes = consolidate_all_data(
+            uploaded_data,
+            df_asignaciones,
+            paralelo=procesamiento_paralelo,
+            max_workers=int(max_workers),
+            base=load_from_session_state()
+        )
         
         # 3. Reporte general
         st.markdown("---")
@@ -186,6 +223,9 @@ if process_button:
         successful = sum(1 for r in reportes if r['reporte']['es_valido'])
         failed = total_validations - successful
         
+        reutilizados = sum(1 for r in reportes if r.get('desde_cache'))
+        sin_cambios = sum(1 for r in reportes if r.get('sin_cambios'))
+        
         col_v1, col_v2, col_v3 = st.columns(3)
         with col_v1:
             st.metric("Total Archivos", total_validations)
@@ -193,6 +233,10 @@ if process_button:
             st.metric("Validados ✅", successful, delta="OK")
         with col_v3:
             st.metric("Con Errores ❌", failed, delta="Revisar" if failed > 0 else "Todo bien")
+        
+        if reutilizados > 0:
+            st.caption(f"♻️ {reutilizados} archivo(s) sin cambios reutilizados de la caché (no se volvieron a procesar)"
+                       + (f" • {sin_cambios} partición(es) idénticas a las ya cargadas" if sin_cambios > 0 else ""))
 
         # 4. Detalle de validaciones
         with st.expander("📝 Ver Detalle de Validaciones", expanded=(failed > 0)):
@@ -226,7 +270,7 @@ if process_button:
         if consolidated_data:
             st.success("🎉 **¡Datos procesados exitosamente!**")
 
-            save_to_session_state(consolidated_data)
+            consolidated_data = save_to_session_state(consolidated_data)
 
             st.markdown("---")
             st.subheader("👀 Vista Previa de Datos")
@@ -266,6 +310,23 @@ if process_button:
                         hide_index=True
                     )
 
+            reporte_memoria = consolidated_data.memory_report()
+            if len(reporte_memoria) > 0:
+                with st.expander("💾 Uso de Memoria del Dataset"):
+                    antes = reporte_memoria['bytes_antes'].sum()
+                    despues = reporte_memoria['bytes_despues'].sum()
+                    st.caption(f"Representación compacta (categóricas y enteros pequeños): "
+                               f"{antes / 1024**2:.1f} MB → {despues / 1024**2:.1f} MB "
+                               f"({(1 - despues / antes) * 100:.0f}% menos)")
+                    st.dataframe(
+                        reporte_memoria.assign(
+                            MB_antes=reporte_memoria['bytes_antes'] / 1024**2,
+                            MB_despues=reporte_memoria['bytes_despues'] / 1024**2
+                        )[['indicador', 'filas', 'MB_antes', 'MB_despues', 'ahorro_pct']].round(2),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+
             st.markdown("---")
             st.success("✅ **Datos listos para análisis!** Puedes ir a las otras secciones del dashboard.")
 
@@ -290,11 +351,13 @@ st.markdown("---")
 
 with st.expander("🗑️ Opciones Avanzadas"):
     st.markdown("### Limpiar Datos Cargados")
-    st.warning("⚠️ Esto eliminará todos los datos cargados actualmente")
+    st.warning("⚠️ Esto eliminará todos los datos cargados actualmente (incluyendo los guardados en disco)")
     
     if st.button("🗑️ Limpiar Todo", type="secondary"):
-        for key in ['data_loaded', 'kpi_data', 'fecha_carga']:
+        for key in ['data_loaded', 'fecha_carga', 'dataset_version']:
             if key in st.session_state:
                 del st.session_state[key]
+        get_dataset_registry().clear()
+        clear_dataset()
         st.success("✅ Datos limpiados. Recarga la página para empezar de nuevo.")
         st.rerun()
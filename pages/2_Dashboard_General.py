@@ -19,7 +19,10 @@ from utils import (
     create_gauge_chart,
     create_multi_line_comparison,
     create_week_performance_chart,
-    create_operator_ranking
+    create_operator_ranking,
+    bootstrap_ranking,
+    get_filter_engine,
+    get_kpi_cube
 )
 
 # Configuración de la página
@@ -85,15 +88,8 @@ selected_turnos = st.sidebar.multiselect(
 )
 
 # Aplicar filtros a todos los DataFrames
-filtered_data = {}
-for indicador, df in data.items():
-    df_filtered = df[
-        (df['fecha'] >= pd.to_datetime(fecha_inicio)) &
-        (df['fecha'] <= pd.to_datetime(fecha_fin)) &
-        (df['maquina'].isin(selected_maquinas)) &
-        (df['turno'].isin(selected_turnos))
-    ].copy()
-    filtered_data[indicador] = df_filtered
+filtros = {'maquina': selected_maquinas, 'turno': selected_turnos}
+filtered_data = get_filter_engine(data).filter_all(fecha_inicio, fecha_fin, **filtros)
 
 st.sidebar.markdown("---")
 st.sidebar.info(f"📅 Periodo: {fecha_inicio.strftime('%d/%m/%Y')} - {fecha_fin.strftime('%d/%m/%Y')}")
@@ -190,26 +186,31 @@ for idx, (indicador, df) in enumerate(filtered_data.items()):
         if len(df) > 0:
             better_direction = get_kpi_direction(indicador)
             
+            # Promedios por week y estadísticas rápidas desde el cubo de agregados
+            cubo = get_kpi_cube(data, indicador)
+            total = cubo.rollup([], fecha_inicio, fecha_fin, **filtros).iloc[0]
+            por_week = cubo.rollup(['week'], fecha_inicio, fecha_fin, **filtros)['mean']
+            
             fig = create_week_performance_chart(
                 df=df,
                 kpi_col=indicador,
                 kpi_name=indicador,
-                better_direction=better_direction
+                better_direction=better_direction,
+                week_avg=por_week.rename('promedio').reset_index()
             )
             
             st.plotly_chart(fig, use_container_width=True)
             
-            # Estadísticas rápidas
             col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
             
             with col_stat1:
-                st.metric("Promedio", f"{df[indicador].mean():.2f}")
+                st.metric("Promedio", f"{total['mean']:.2f}")
             with col_stat2:
-                st.metric("Mejor Week", f"{df.groupby('week')[indicador].mean().max():.2f}")
+                st.metric("Mejor Week", f"{por_week.max():.2f}")
             with col_stat3:
-                st.metric("Peor Week", f"{df.groupby('week')[indicador].mean().min():.2f}")
+                st.metric("Peor Week", f"{por_week.min():.2f}")
             with col_stat4:
-                st.metric("Desv. Est.", f"{df[indicador].std():.2f}")
+                st.metric("Desv. Est.", f"{total['std']:.2f}")
         else:
             st.info("No hay datos disponibles para este indicador")
 
@@ -232,7 +233,12 @@ df_selected = filtered_data[selected_kpi]
 
 if len(df_selected) > 0:
     # Calcular promedio por máquina
-    maquina_avg = df_selected.groupby('maquina')[selected_kpi].mean().reset_index()
+    maquina_avg = (
+        get_kpi_cube(data, selected_kpi)
+        .rollup(['maquina'], fecha_inicio, fecha_fin, **filtros)['mean']
+        .rename(selected_kpi)
+        .reset_index()
+    )
     maquina_avg = maquina_avg.sort_values(selected_kpi, ascending=False)
     
     fig = create_bar_chart(
@@ -325,20 +331,36 @@ if len(df_top) > 0:
             df=df_top,
             kpi_col=top_kpi,
             kpi_name=top_kpi,
-            top_n=top_n
+            top_n=top_n,
+            show_ci=True
         )
         
         st.plotly_chart(fig, use_container_width=True)
         
         # Mostrar tabla con detalles
         with st.expander("📊 Ver estadísticas detalladas"):
-            op_stats = df_top.groupby('operador').agg({
+            op_stats = df_top.groupby('operador', observed=True).agg({
                 top_kpi: ['mean', 'std', 'count'],
                 'maquina': lambda x: ', '.join(x.unique())
             }).reset_index()
             
             op_stats.columns = ['Operador', 'Promedio', 'Desv.Est', 'Registros', 'Máquinas']
-            op_stats = op_stats.sort_values('Promedio', ascending=False).head(top_n)
+            op_stats = op_stats.sort_values('Promedio', ascending=get_kpi_direction(top_kpi) == 'bajo').head(top_n)
+            
+            # Incertidumbre del promedio y estabilidad del lugar (bootstrap); operadores
+            # sin valores quedan en "—"
+            ic = bootstrap_ranking(df_top, top_kpi, ['operador'])
+            ic = ic.assign(operador=ic['operador'].astype(str)).set_index('operador')
+            ic = ic.reindex(op_stats['Operador'].astype(str))
+            op_stats['IC 95%'] = [
+                f"{lo:.2f} - {hi:.2f}" if pd.notna(lo) else "—"
+                for lo, hi in zip(ic['ci_inf'], ic['ci_sup'])
+            ]
+            op_stats['Lugar (IC)'] = [
+                f"{int(lo)}° - {int(hi)}°" if pd.notna(lo) else "—"
+                for lo, hi in zip(ic['rango_ci_inf'], ic['rango_ci_sup'])
+            ]
+            op_stats['P(Top 3)'] = (ic['prob_top3'].to_numpy() * 100).round(0)
             
             st.dataframe(
                 op_stats.style.background_gradient(subset=['Promedio'], cmap='RdYlGn'),
@@ -363,19 +385,24 @@ for idx, (indicador, df) in enumerate(filtered_data.items()):
         if len(df) > 0:
             col_sum1, col_sum2, col_sum3 = st.columns(3)
             
+            # Agregados y cuantiles desde el cubo (cuantiles exactos en selecciones pequeñas)
+            cubo = get_kpi_cube(data, indicador)
+            total = cubo.rollup([], fecha_inicio, fecha_fin, **filtros).iloc[0]
+            cuantiles = cubo.quantiles([0.5, 0.95], [], fecha_inicio, fecha_fin, **filtros).iloc[0]
+            
             with col_sum1:
                 st.markdown("**Estadísticas Generales**")
                 st.metric("Total Registros", f"{len(df):,}")
-                st.metric("Promedio", f"{df[indicador].mean():.2f}")
-                st.metric("Mediana", f"{df[indicador].median():.2f}")
-                st.metric("Desviación Estándar", f"{df[indicador].std():.2f}")
+                st.metric("Promedio", f"{total['mean']:.2f}")
+                st.metric("Mediana", f"{cuantiles['p50']:.2f}")
+                st.metric("Desviación Estándar", f"{total['std']:.2f}")
             
             with col_sum2:
                 st.markdown("**Valores Extremos**")
-                st.metric("Valor Máximo", f"{df[indicador].max():.2f}")
-                st.metric("Valor Mínimo", f"{df[indicador].min():.2f}")
-                st.metric("Rango", f"{df[indicador].max() - df[indicador].min():.2f}")
-                st.metric("Percentil 95", f"{df[indicador].quantile(0.95):.2f}")
+                st.metric("Valor Máximo", f"{total['max']:.2f}")
+                st.metric("Valor Mínimo", f"{total['min']:.2f}")
+                st.metric("Rango", f"{total['max'] - total['min']:.2f}")
+                st.metric("Percentil 95", f"{cuantiles['p95']:.2f}")
             
             with col_sum3:
                 st.markdown("**Cobertura de Datos**")
@@ -11,14 +11,15 @@ from utils import (
     load_from_session_state,
     calculate_week_average,
     get_kpi_direction,
-    calculate_percentile_rank,
+    get_percentile_index,
     calculate_trend,
     create_line_chart,
     create_bar_chart,
     create_histogram,
     create_box_plot,
     create_heatmap,
-    create_scatter_plot
+    create_scatter_plot,
+    get_filter_engine
 )
 
 # Configuración de la página
@@ -109,15 +110,11 @@ selected_turnos = st.sidebar.multiselect(
 )
 
 # Filtrar datos para el operador seleccionado
-operador_data = {}
-for indicador, df in data.items():
-    df_filtered = df[
-        (df['operador'] == selected_operador) &
-        (df['fecha'] >= pd.to_datetime(fecha_inicio)) &
-        (df['fecha'] <= pd.to_datetime(fecha_fin)) &
-        (df['turno'].isin(selected_turnos))
-    ].copy()
-    operador_data[indicador] = df_filtered
+operador_data = get_filter_engine(data).filter_all(
+    fecha_inicio, fecha_fin,
+    operador=[selected_operador],
+    turno=selected_turnos
+)
 
 # Información del operador
 st.sidebar.markdown("---")
@@ -157,8 +154,8 @@ for idx, (indicador, df) in enumerate(operador_data.items()):
             operador_stats[indicador] = avg_value
             
             # Calcular percentil vs todos los operadores
-            all_data = data[indicador][data[indicador]['operador'] != 'SIN_ASIGNAR']
-            percentile = calculate_percentile_rank(all_data, indicador, avg_value)
+            percentiles = get_percentile_index(data, indicador, solo_asignados=True)
+            percentile = percentiles.rank([avg_value])[0]
             
             # Determinar si es top performer
             better_direction = get_kpi_direction(indicador)
@@ -276,7 +273,7 @@ df_maq = operador_data[maq_kpi]
 
 if len(df_maq) > 0 and df_maq['maquina'].nunique() > 0:
     # Calcular promedio por máquina
-    maq_avg = df_maq.groupby('maquina')[maq_kpi].agg(['mean', 'count', 'std']).reset_index()
+    maq_avg = df_maq.groupby('maquina', observed=True)[maq_kpi].agg(['mean', 'count', 'std']).reset_index()
     maq_avg.columns = ['maquina', 'promedio', 'registros', 'desv_est']
     maq_avg = maq_avg.sort_values('promedio', ascending=False)
     
@@ -340,7 +337,7 @@ if len(df_turno) > 0:
     
     with col_graph:
         # Gráfico de barras por turno
-        turno_avg = df_turno.groupby('turno')[turno_kpi].mean().reset_index()
+        turno_avg = df_turno.groupby('turno', observed=True)[turno_kpi].mean().reset_index()
         turno_avg = turno_avg.sort_values('turno')
         
         fig = create_bar_chart(
@@ -368,7 +365,7 @@ if len(df_turno) > 0:
     
     # Estadísticas por turno
     st.markdown("**📊 Estadísticas por Turno:**")
-    turno_stats = df_turno.groupby('turno').agg({
+    turno_stats = df_turno.groupby('turno', observed=True).agg({
         turno_kpi: ['mean', 'std', 'min', 'max', 'count']
     }).reset_index()
     turno_stats.columns = ['Turno', 'Promedio', 'Desv.Est', 'Mínimo', 'Máximo', 'Registros']
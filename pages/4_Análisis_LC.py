@@ -4,21 +4,27 @@ Análisis de Line Coordinators - Performance de Equipos
 
 import streamlit as st
 import pandas as pd
-import numpy as np
 from datetime import datetime
 from Config.constants import INDICADORES, TURNOS, COLOR_PALETTE
 from utils import (
     load_from_session_state,
     calculate_week_average,
     get_kpi_direction,
-    calculate_trend,
+    compute_trends,
+    trend_arrow,
     create_line_chart,
     create_bar_chart,
     create_box_plot,
     create_heatmap,
     create_sunburst_chart,
     create_animated_bar_chart,
-    create_multi_line_comparison
+    create_multi_line_comparison,
+    get_filter_engine,
+    entity_kpi_stats,
+    entity_stats,
+    entity_period_means,
+    compute_ranking,
+    bootstrap_ranking
 )
 
 # Configuración de la página
@@ -111,16 +117,12 @@ selected_turnos = st.sidebar.multiselect(
 )
 
 # Aplicar filtros
-filtered_data = {}
-for indicador, df in data.items():
-    df_filtered = df[
-        (df['fecha'] >= pd.to_datetime(fecha_inicio)) &
-        (df['fecha'] <= pd.to_datetime(fecha_fin)) &
-        (df['maquina'].isin(selected_maquinas)) &
-        (df['turno'].isin(selected_turnos)) &
-        (df['coordinador'] != 'SIN_ASIGNAR')
-    ].copy()
-    filtered_data[indicador] = df_filtered
+filtered_data = get_filter_engine(data).filter_all(
+    fecha_inicio, fecha_fin,
+    maquina=selected_maquinas,
+    turno=selected_turnos,
+    coordinador=all_lcs  # Excluye SIN_ASIGNAR
+)
 
 st.sidebar.markdown("---")
 st.sidebar.info(f"📅 Periodo: {fecha_inicio.strftime('%d/%m/%Y')} - {fecha_fin.strftime('%d/%m/%Y')}")
@@ -131,7 +133,9 @@ st.sidebar.info(f"📅 Periodo: {fecha_inicio.strftime('%d/%m/%Y')} - {fecha_fin
 
 st.subheader("📊 Comparativa General de Line Coordinators")
 
-# Calcular métricas por LC
+# Calcular métricas por LC (todos los LCs y KPIs en una sola pasada)
+stats_lc = entity_stats(filtered_data, 'coordinador')
+stats_lc = stats_lc.assign(coordinador=stats_lc['coordinador'].astype(str)).set_index(['coordinador', 'indicador'])
 lc_metrics = []
 
 for lc in all_lcs:
@@ -140,12 +144,11 @@ for lc in all_lcs:
     # Contar operadores en el equipo
     lc_row['Operadores'] = len(lc_teams[lc])
     
-    # Calcular promedios por KPI
-    for indicador, df in filtered_data.items():
-        df_lc = df[df['coordinador'] == lc]
-        if len(df_lc) > 0:
-            lc_row[f'{indicador}_avg'] = df_lc[indicador].mean()
-            lc_row[f'{indicador}_count'] = len(df_lc)
+    # Promedios por KPI
+    for indicador in filtered_data.keys():
+        if (lc, indicador) in stats_lc.index:
+            lc_row[f'{indicador}_avg'] = stats_lc.at[(lc, indicador), 'promedio']
+            lc_row[f'{indicador}_count'] = stats_lc.at[(lc, indicador), 'registros']
         else:
             lc_row[f'{indicador}_avg'] = None
             lc_row[f'{indicador}_count'] = 0
@@ -200,21 +203,35 @@ with col_kpi_selector:
     )
 
 # Preparar datos para comparación
-lc_comparison = []
-for lc in all_lcs:
-    df_lc = filtered_data[selected_kpi][filtered_data[selected_kpi]['coordinador'] == lc]
-    if len(df_lc) > 0:
-        lc_comparison.append({
-            'LC': lc,
-            'Promedio': df_lc[selected_kpi].mean(),
-            'Desv_Est': df_lc[selected_kpi].std(),
-            'Min': df_lc[selected_kpi].min(),
-            'Max': df_lc[selected_kpi].max(),
-            'Registros': len(df_lc)
-        })
-
-if lc_comparison:
-    df_comparison = pd.DataFrame(lc_comparison)
+# Tendencia de todos los LCs en una sola pasada
+tendencias_lc = compute_trends(filtered_data[selected_kpi], selected_kpi, ['coordinador']).set_index('coordinador')
+# Sin correlación (una sola fecha o KPI constante) no hay tendencia que mostrar
+tendencias_lc = tendencias_lc.loc[tendencias_lc['correlacion'].notna(), 'tendencia']
+
+df_comparison = entity_kpi_stats(filtered_data[selected_kpi], selected_kpi, 'coordinador')
+df_comparison = df_comparison[df_comparison['coordinador'].isin(all_lcs)]
+
+if len(df_comparison) > 0:
+    df_comparison = pd.DataFrame({
+        'LC': df_comparison['coordinador'].astype(str).to_numpy(),
+        'Promedio': df_comparison['promedio'].to_numpy(),
+        'Tendencia': [
+            trend_arrow(tendencias_lc.get(lc, 'estable'))
+            for lc in df_comparison['coordinador']
+        ],
+        'Desv_Est': df_comparison['desv_est'].to_numpy(),
+        'Min': df_comparison['minimo'].to_numpy(),
+        'Max': df_comparison['maximo'].to_numpy(),
+        'Registros': df_comparison['registros'].to_numpy()
+    })
+    
+    # Intervalos de confianza bootstrap del promedio y probabilidad de ser el mejor LC
+    ic_lc = bootstrap_ranking(filtered_data[selected_kpi], selected_kpi, ['coordinador'])
+    ic_lc = ic_lc.assign(coordinador=ic_lc['coordinador'].astype(str)).set_index('coordinador')
+    ic_lc = ic_lc.reindex(df_comparison['LC'])
+    df_comparison['IC_Inf'] = ic_lc['ci_inf'].to_numpy()
+    df_comparison['IC_Sup'] = ic_lc['ci_sup'].to_numpy()
+    df_comparison['P(Mejor) %'] = (ic_lc['prob_primero'].to_numpy() * 100).round(0)
     
     col_bar, col_box = st.columns([2, 1])
     
@@ -260,7 +277,9 @@ if lc_comparison:
     else:
         best_lc = df_comparison.loc[df_comparison['Promedio'].idxmin(), 'LC']
     
-    st.success(f"🏆 **Mejor Performance en {selected_kpi}**: {best_lc}")
+    prob_best = df_comparison.loc[df_comparison['LC'] == best_lc, 'P(Mejor) %'].iloc[0]
+    st.success(f"🏆 **Mejor Performance en {selected_kpi}**: {best_lc} "
+               f"(primer lugar en {prob_best:.0f}% de las remuestras bootstrap)")
 else:
     st.info("No hay datos suficientes para comparar")
 
@@ -281,17 +300,11 @@ with col_evolution_kpi:
     )
 
 # Calcular promedio por week para cada LC
-evolution_data = []
+df_evolution = entity_period_means(filtered_data[evolution_kpi], evolution_kpi, 'coordinador', 'week')
+df_evolution = df_evolution[df_evolution['coordinador'].isin(all_lcs)]
 
-for lc in all_lcs:
-    df_lc = filtered_data[evolution_kpi][filtered_data[evolution_kpi]['coordinador'] == lc]
-    if len(df_lc) > 0:
-        week_avg = df_lc.groupby('week')[evolution_kpi].mean().reset_index()
-        week_avg['LC'] = lc
-        evolution_data.append(week_avg)
-
-if evolution_data:
-    df_evolution = pd.concat(evolution_data, ignore_index=True)
+if len(df_evolution) > 0:
+    df_evolution = df_evolution.assign(LC=df_evolution['coordinador'].astype(str)).drop(columns='coordinador')
     
     # Gráfico de líneas comparativo
     fig = create_line_chart(
@@ -311,12 +324,12 @@ if evolution_data:
     st.markdown("**📈 Análisis de Tendencias:**")
     
     trend_cols = st.columns(len(all_lcs))
+    df_trend = compute_trends(filtered_data[evolution_kpi], evolution_kpi, ['coordinador']).set_index('coordinador')
     
     for idx, lc in enumerate(all_lcs):
         with trend_cols[idx]:
-            df_lc = filtered_data[evolution_kpi][filtered_data[evolution_kpi]['coordinador'] == lc]
-            if len(df_lc) > 1:
-                tendencia = calculate_trend(df_lc, evolution_kpi)
+            if lc in df_trend.index and pd.notna(df_trend.loc[lc, 'correlacion']):
+                tendencia = df_trend.loc[lc, 'tendencia']
                 
                 if tendencia == "mejorando":
                     st.success(f"**{lc}**: 📈 Mejorando")
@@ -351,17 +364,20 @@ for idx, lc in enumerate(all_lcs):
             key=f'team_kpi_{lc}'
         )
         
-        # Obtener datos del equipo
-        df_team = filtered_data[team_kpi][filtered_data[team_kpi]['coordinador'] == lc]
+        # Estadísticas del equipo y de sus operadores (calculadas una vez para todos los LCs)
+        team_stats = entity_kpi_stats(filtered_data[team_kpi], team_kpi, 'coordinador')
+        team_stats = team_stats[team_stats['coordinador'] == lc]
         
-        if len(df_team) > 0:
-            # Calcular promedio por operador
-            op_stats = df_team.groupby('operador').agg({
-                team_kpi: ['mean', 'std', 'count'],
-                'maquina': lambda x: x.nunique()
-            }).reset_index()
-            
-            op_stats.columns = ['Operador', 'Promedio', 'Desv_Est', 'Registros', 'Máquinas']
+        if len(team_stats) > 0:
+            op_stats = entity_kpi_stats(filtered_data[team_kpi], team_kpi, ['coordinador', 'operador'])
+            op_stats = op_stats[op_stats['coordinador'] == lc]
+            op_stats = pd.DataFrame({
+                'Operador': op_stats['operador'].astype(str).to_numpy(),
+                'Promedio': op_stats['promedio'].to_numpy(),
+                'Desv_Est': op_stats['desv_est'].to_numpy(),
+                'Registros': op_stats['validos'].to_numpy(),
+                'Máquinas': op_stats['maquinas'].to_numpy()
+            })
             op_stats = op_stats.sort_values('Promedio', ascending=False)
             
             col_team_chart, col_team_table = st.columns([2, 1])
@@ -384,7 +400,7 @@ for idx, lc in enumerate(all_lcs):
                 st.markdown("**📊 Estadísticas:**")
                 
                 # Promedio del equipo
-                team_avg = df_team[team_kpi].mean()
+                team_avg = team_stats['promedio'].iloc[0]
                 st.metric("Promedio del Equipo", f"{team_avg:.2f}")
                 
                 # Mejor operador
@@ -393,7 +409,7 @@ for idx, lc in enumerate(all_lcs):
                 st.metric("Mejor Operador", best_op, delta=f"{best_val:.2f}")
                 
                 # Variabilidad
-                team_std = df_team[team_kpi].std()
+                team_std = team_stats['desv_est'].iloc[0]
                 st.metric("Variabilidad (Desv.Est)", f"{team_std:.2f}")
                 
                 # Consistencia
@@ -444,16 +460,11 @@ with col_anim_kpi:
     )
 
 # Preparar datos por week
-anim_data = []
-for lc in all_lcs:
-    df_lc = filtered_data[animated_kpi][filtered_data[animated_kpi]['coordinador'] == lc]
-    if len(df_lc) > 0:
-        week_data = df_lc.groupby('week')[animated_kpi].mean().reset_index()
-        week_data['LC'] = lc
-        anim_data.append(week_data)
-
-if anim_data:
-    df_anim = pd.concat(anim_data, ignore_index=True)
+df_anim = entity_period_means(filtered_data[animated_kpi], animated_kpi, 'coordinador', 'week')
+df_anim = df_anim[df_anim['coordinador'].isin(all_lcs)]
+
+if len(df_anim) > 0:
+    df_anim = df_anim.assign(LC=df_anim['coordinador'].astype(str)).drop(columns='coordinador')
     
     fig = create_animated_bar_chart(
         df=df_anim,
@@ -478,44 +489,10 @@ st.markdown("---")
 
 st.subheader("🏆 Ranking General de Line Coordinators")
 
-# Calcular ranking ponderado (promedio de todos los KPIs normalizados)
-ranking_data = []
+# Calcular ranking ponderado (promedio de todos los KPIs normalizados, una sola pasada)
+df_ranking = compute_ranking(filtered_data, 'coordinador', entidades=all_lcs).rename(columns={'coordinador': 'LC'})
 
-for lc in all_lcs:
-    lc_scores = {}
-    
-    for indicador, df in filtered_data.items():
-        df_lc = df[df['coordinador'] == lc]
-        if len(df_lc) > 0:
-            avg_lc = df_lc[indicador].mean()
-            
-            # Normalizar según dirección del KPI
-            all_values = df[indicador].values
-            min_val = all_values.min()
-            max_val = all_values.max()
-            
-            if max_val != min_val:
-                normalized = (avg_lc - min_val) / (max_val - min_val)
-                
-                # Invertir si "bajo es mejor"
-                if get_kpi_direction(indicador) == 'bajo':
-                    normalized = 1 - normalized
-                
-                lc_scores[indicador] = normalized * 100
-            else:
-                lc_scores[indicador] = 50.0
-    
-    if lc_scores:
-        ranking_data.append({
-            'LC': lc,
-            'Score_Global': np.mean(list(lc_scores.values())),
-            **lc_scores
-        })
-
-if ranking_data:
-    df_ranking = pd.DataFrame(ranking_data)
-    df_ranking = df_ranking.sort_values('Score_Global', ascending=False)
-    
+if len(df_ranking) > 0:
     # Mostrar podio
     col_rank1, col_rank2, col_rank3 = st.columns(3)
     
@@ -534,8 +511,9 @@ if ranking_data:
                 for indicador in filtered_data.keys():
                     if indicador in df_ranking.columns:
                         ind_score = df_ranking.iloc[idx][indicador]
-                        st.progress(ind_score / 100)
-                        st.caption(f"{indicador}: {ind_score:.1f}")
+                        if pd.notna(ind_score):
+                            st.progress(ind_score / 100)
+                            st.caption(f"{indicador}: {ind_score:.1f}")
     
     # Tabla completa
     st.markdown("**📊 Ranking Detallado:**")
@@ -545,7 +523,7 @@ if ranking_data:
         hide_index=True
     )
     
-    st.caption("💡 **Metodología**: Score Global calculado como promedio de KPIs normalizados (0-100)")
+    st.caption("💡 **Metodología**: Score Global calculado como promedio ponderado de KPIs normalizados (0-100; mismo peso por defecto)")
 else:
     st.info("No hay datos suficientes para calcular ranking")
 
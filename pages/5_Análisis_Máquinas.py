@@ -12,7 +12,7 @@ from utils import (
     calculate_week_average,
     get_kpi_direction,
     calculate_trend,
-    identify_outliers,
+    detect_outliers,
     create_line_chart,
     create_bar_chart,
     create_histogram,
@@ -21,7 +21,15 @@ from utils import (
     create_scatter_plot,
     create_multi_line_comparison,
     create_operator_ranking,
-    create_week_performance_chart
+    create_week_performance_chart,
+    get_fact_table,
+    compute_correlations,
+    strong_correlations,
+    lag_label,
+    compute_trends,
+    trend_arrow,
+    get_filter_engine,
+    get_kpi_cube
 )
 
 # Configuración de la página
@@ -112,15 +120,8 @@ selected_turnos = st.sidebar.multiselect(
 )
 
 # Filtrar datos para la máquina seleccionada
-machine_data = {}
-for indicador, df in data.items():
-    df_filtered = df[
-        (df['maquina'] == selected_machine) &
-        (df['fecha'] >= pd.to_datetime(fecha_inicio)) &
-        (df['fecha'] <= pd.to_datetime(fecha_fin)) &
-        (df['turno'].isin(selected_turnos))
-    ].copy()
-    machine_data[indicador] = df_filtered
+filtros = {'maquina': [selected_machine], 'turno': selected_turnos}
+machine_data = get_filter_engine(data).filter_all(fecha_inicio, fecha_fin, **filtros)
 
 # Información de la máquina
 st.sidebar.markdown("---")
@@ -196,6 +197,9 @@ st.markdown("---")
 
 st.subheader("🔍 Análisis Detallado por KPI")
 
+# Valores atípicos de todos los KPIs (límites IQR por máquina y turno, sin copiar)
+outliers = detect_outliers(machine_data)
+
 # Tabs para cada indicador
 kpi_tabs = st.tabs([f"{ind}" for ind in machine_data.keys()])
 
@@ -233,30 +237,33 @@ for idx, (indicador, df) in enumerate(machine_data.items()):
             # Estadísticas detalladas
             st.markdown(f"**📊 Estadísticas de {indicador}:**")
             
+            cubo = get_kpi_cube(data, indicador)
+            total = cubo.rollup([], fecha_inicio, fecha_fin, **filtros).iloc[0]
+            mediana = cubo.quantiles([0.5], [], fecha_inicio, fecha_fin, **filtros)['p50'].iloc[0]
+            
             stat_cols = st.columns(6)
             
             with stat_cols[0]:
-                st.metric("Promedio", f"{df[indicador].mean():.2f}")
+                st.metric("Promedio", f"{total['mean']:.2f}")
             with stat_cols[1]:
-                st.metric("Mediana", f"{df[indicador].median():.2f}")
+                st.metric("Mediana", f"{mediana:.2f}")
             with stat_cols[2]:
-                st.metric("Desv. Est.", f"{df[indicador].std():.2f}")
+                st.metric("Desv. Est.", f"{total['std']:.2f}")
             with stat_cols[3]:
-                st.metric("Mínimo", f"{df[indicador].min():.2f}")
+                st.metric("Mínimo", f"{total['min']:.2f}")
             with stat_cols[4]:
-                st.metric("Máximo", f"{df[indicador].max():.2f}")
+                st.metric("Máximo", f"{total['max']:.2f}")
             with stat_cols[5]:
-                st.metric("Rango", f"{df[indicador].max() - df[indicador].min():.2f}")
+                st.metric("Rango", f"{total['max'] - total['min']:.2f}")
             
             # Detectar outliers
-            df_outliers = identify_outliers(df.copy(), indicador)
-            n_outliers = df_outliers['is_outlier'].sum()
+            n_outliers = outliers[indicador]['n_atipicos']
             
             if n_outliers > 0:
-                st.warning(f"⚠️ Se detectaron **{n_outliers}** valores atípicos ({n_outliers/len(df)*100:.1f}%)")
+                st.warning(f"⚠️ Se detectaron **{n_outliers}** valores atípicos ({n_outliers/len(df)*100:.1f}%) respecto a los límites IQR de cada turno")
                 
                 with st.expander("Ver outliers detectados"):
-                    df_outliers_only = df_outliers[df_outliers['is_outlier']]
+                    df_outliers_only = df[outliers[indicador]['mascara']]
                     st.dataframe(
                         df_outliers_only[['fecha_str', 'turno', 'operador', indicador]],
                         use_container_width=True,
@@ -303,18 +310,19 @@ if len(df_ops) > 0:
             df=df_ops_assigned,
             kpi_col=operator_kpi,
             kpi_name=operator_kpi,
-            top_n=top_n_ops
+            top_n=top_n_ops,
+            show_ci=True
         )
         
         st.plotly_chart(fig_rank, use_container_width=True)
         
         # Tabla detallada de operadores
-        op_stats = df_ops_assigned.groupby('operador').agg({
+        op_stats = df_ops_assigned.groupby('operador', observed=True).agg({
             operator_kpi: ['mean', 'std', 'min', 'max', 'count']
         }).reset_index()
         
         op_stats.columns = ['Operador', 'Promedio', 'Desv.Est', 'Mínimo', 'Máximo', 'Registros']
-        op_stats = op_stats.sort_values('Promedio', ascending=False).head(top_n_ops)
+        op_stats = op_stats.sort_values('Promedio', ascending=get_kpi_direction(operator_kpi) == 'bajo').head(top_n_ops)
         
         st.markdown("**📋 Estadísticas Detalladas:**")
         st.dataframe(
@@ -373,7 +381,7 @@ if len(df_turno) > 0:
     
     with col_turno_bar:
         # Promedio por turno
-        turno_avg = df_turno.groupby('turno')[turno_kpi].mean().reset_index()
+        turno_avg = df_turno.groupby('turno', observed=True)[turno_kpi].mean().reset_index()
         
         fig_turno = create_bar_chart(
             df=turno_avg,
@@ -417,7 +425,7 @@ if len(df_turno) > 0:
     # Tabla estadística por turno
     st.markdown("**📊 Estadísticas por Turno:**")
     
-    turno_stats = df_turno.groupby('turno').agg({
+    turno_stats = df_turno.groupby('turno', observed=True).agg({
         turno_kpi: ['mean', 'std', 'min', 'max', 'count']
     }).reset_index()
     
@@ -479,6 +487,12 @@ if all_machines_data:
     df_comp = pd.DataFrame(all_machines_data)
     df_comp = df_comp.sort_values('Promedio', ascending=False)
     
+    # Tendencia de todas las máquinas en una sola pasada
+    tendencias = compute_trends(df_all, comp_kpi, ['maquina']).set_index('maquina')
+    # Sin correlación (una sola fecha o KPI constante) no hay tendencia que mostrar
+    tendencias = tendencias.loc[tendencias['correlacion'].notna(), 'tendencia']
+    df_comp['Tendencia'] = [trend_arrow(tendencias.get(m, 'estable')) for m in df_comp['Máquina']]
+    
     # Bar chart comparativo
     fig_comp = create_bar_chart(
         df=df_comp,
@@ -500,7 +514,7 @@ if all_machines_data:
     
     # Agregar ranking
     df_comp['Ranking'] = range(1, len(df_comp) + 1)
-    df_comp = df_comp[['Ranking', 'Máquina', 'Promedio', 'Desv_Est', 'Registros']]
+    df_comp = df_comp[['Ranking', 'Máquina', 'Promedio', 'Tendencia', 'Desv_Est', 'Registros']]
     
     st.dataframe(
         df_comp.style.background_gradient(subset=['Promedio'], cmap='RdYlGn'),
@@ -576,7 +590,7 @@ recommendations = []
 # Análisis de turnos
 for indicador, df in machine_data.items():
     if len(df) > 0 and df['turno'].nunique() > 1:
-        turno_avg = df.groupby('turno')[indicador].mean()
+        turno_avg = df.groupby('turno', observed=True)[indicador].mean()
         better = get_kpi_direction(indicador)
         
         if better == 'alto':
@@ -595,7 +609,7 @@ for indicador, df in machine_data.items():
     if len(df) > 0:
         df_ops = df[df['operador'] != 'SIN_ASIGNAR']
         if len(df_ops) > 0 and df_ops['operador'].nunique() > 2:
-            op_avg = df_ops.groupby('operador')[indicador].mean()
+            op_avg = df_ops.groupby('operador', observed=True)[indicador].mean()
             better = get_kpi_direction(indicador)
             
             if better == 'alto':
@@ -715,13 +729,7 @@ with quality_cols[1]:
 
 with quality_cols[2]:
     # Outliers detectados
-    total_outliers = 0
-    for df in machine_data.values():
-        if len(df) > 0:
-            for indicador in df.columns:
-                if indicador in INDICADORES:
-                    df_temp = identify_outliers(df.copy(), indicador)
-                    total_outliers += df_temp['is_outlier'].sum()
+    total_outliers = sum(resultado['n_atipicos'] for resultado in outliers.values())
     
     outlier_rate = (total_outliers / total_records * 100) if total_records > 0 else 0
     
@@ -785,7 +793,7 @@ for indicador, df in machine_data.items():
     if len(df) > 0:
         df_ops = df[df['operador'] != 'SIN_ASIGNAR']
         if len(df_ops) > 0 and df_ops['operador'].nunique() > 2:
-            op_stats = df_ops.groupby('operador')[indicador].agg(['mean', 'std', 'count'])
+            op_stats = df_ops.groupby('operador', observed=True)[indicador].agg(['mean', 'std', 'count'])
             op_stats = op_stats[op_stats['count'] >= 5]  # Solo operadores con suficientes datos
             
             if len(op_stats) > 0:
@@ -799,28 +807,39 @@ for indicador, df in machine_data.items():
                     'mensaje': f"{most_consistent} es el operador más consistente en {indicador} (Desv.Est: {consistency_val:.2f})"
                 })
 
-# Insight 3: Correlaciones fuertes
+# Insight 3: Correlaciones fuertes (toda la flota, mismo turno y con desfase)
 if len(machine_data) >= 2:
-    kpis = list(machine_data.keys())
-    for i in range(len(kpis)):
-        for j in range(i + 1, len(kpis)):
-            kpi1, kpi2 = kpis[i], kpis[j]
-            
-            df1 = machine_data[kpi1][['fecha_str', 'turno', kpi1]]
-            df2 = machine_data[kpi2][['fecha_str', 'turno', kpi2]]
-            
-            df_merged = pd.merge(df1, df2, on=['fecha_str', 'turno'], how='inner')
-            
-            if len(df_merged) > 10:
-                corr = df_merged[kpi1].corr(df_merged[kpi2])
-                
-                if abs(corr) > 0.7:  # Correlación fuerte
-                    direction = "positiva" if corr > 0 else "negativa"
-                    insights.append({
-                        'tipo': 'Correlación',
-                        'kpi': f"{kpi1} & {kpi2}",
-                        'mensaje': f"Correlación {direction} fuerte detectada ({corr:.2f}). Cuando {kpi1} cambia, {kpi2} tiende a cambiar en {'la misma' if corr > 0 else 'dirección opuesta'}"
-                    })
+    # Tabla de hechos: los KPIs ya vienen alineados por máquina, fecha y turno
+    fact = get_fact_table(data)
+    kpis = [kpi for kpi in machine_data.keys() if kpi in fact.columns]
+    # Correlación por pares con al menos 11 registros en común
+    correlaciones = compute_correlations(
+        fact, kpis,
+        fecha_inicio=pd.to_datetime(fecha_inicio),
+        fecha_fin=pd.to_datetime(fecha_fin),
+        turnos=selected_turnos
+    )
+    fuertes = strong_correlations(correlaciones, umbral=0.7)  # Correlación fuerte
+    # Primero la máquina seleccionada y las correlaciones simultáneas
+    fuertes = fuertes.assign(otra_maquina=fuertes['maquina'] != selected_machine)
+    fuertes = fuertes.sort_values(['otra_maquina', 'lag'], kind='stable')
+    
+    for row in fuertes.itertuples(index=False):
+        kpi1, kpi2, corr = row.kpi_1, row.kpi_2, row.correlacion
+        direction = "positiva" if corr > 0 else "negativa"
+        
+        if row.lag == 0:
+            insights.append({
+                'tipo': 'Correlación' if row.maquina == selected_machine else 'Correlación en la Flota',
+                'kpi': f"{kpi1} & {kpi2}" if row.maquina == selected_machine else f"{kpi1} & {kpi2} ({row.maquina})",
+                'mensaje': f"Correlación {direction} fuerte detectada ({corr:.2f}). Cuando {kpi1} cambia, {kpi2} tiende a cambiar en {'la misma' if corr > 0 else 'dirección opuesta'}"
+            })
+        else:
+            insights.append({
+                'tipo': 'Correlación con Desfase',
+                'kpi': f"{kpi1} → {kpi2} ({row.maquina})",
+                'mensaje': f"{kpi1} anticipa a {kpi2} en el {lag_label(row.lag)} (correlación {direction} de {corr:.2f}, {row.n} registros)"
+            })
 
 # Mostrar insights
 if insights:
@@ -12,10 +12,96 @@ from .data_loader import (
     load_from_session_state
 )
 
+from .dataset_store import (
+    PartitionedDataset,
+    save_dataset,
+    load_dataset,
+    clear_dataset
+)
+
+from .dataset_registry import (
+    DatasetRegistry,
+    get_dataset_registry
+)
+
+from .fact_table import (
+    build_fact_table,
+    get_fact_table
+)
+
+from .filters import (
+    FrameIndex,
+    FilterEngine,
+    get_filter_engine
+)
+
+from .kpi_cube import (
+    KPICube,
+    get_kpi_cube
+)
+
+from .percentiles import (
+    PercentileIndex,
+    get_percentile_index,
+    add_percentile_columns
+)
+
+from .trends import (
+    trend_label,
+    trend_arrow,
+    student_t_pvalue,
+    compute_trends,
+    compute_all_trends
+)
+
+from .outliers import (
+    grouped_quartiles,
+    outlier_summary,
+    detect_outliers,
+    outlier_counts
+)
+
+from .correlations import (
+    build_kpi_tensor,
+    lagged_correlations,
+    compute_correlations,
+    strong_correlations,
+    lag_label
+)
+
+from .ranking import (
+    entity_kpi_stats,
+    entity_stats,
+    entity_period_means,
+    compute_ranking
+)
+
+from .bootstrap import (
+    bootstrap_means,
+    bootstrap_ranking,
+    bootstrap_all_rankings
+)
+
+from .memo import (
+    AggregationMemo,
+    get_aggregation_memo,
+    frame_signature,
+    call_key,
+    memoize_aggregation,
+    register_frame
+)
+
+from .ingestion_cache import (
+    IngestionCache,
+    get_ingestion_cache
+)
+
 from .validators import (
     validate_filename,
     validate_file_structure,
     validate_shift_format,
+    validate_indicator_frame,
+    compute_column_stats,
     validate_machine_name,
     check_data_completeness,
     generate_validation_report
@@ -23,7 +109,10 @@ from .validators import (
 
 from .calculations import (
     parse_shift_column,
+    parse_shift_series,
     get_pmi_week_number,
+    get_pmi_calendar,
+    lookup_pmi_calendar,
     calculate_week_average,
     calculate_month_average,
     process_updt_file,
@@ -33,6 +122,13 @@ from .calculations import (
     calculate_trend
 )
 
+from .decimation import (
+    decimate_frame,
+    lttb_indices,
+    minmax_indices,
+    target_points
+)
+
 from .visualizations import (
     create_line_chart,
     create_bar_chart,
@@ -45,7 +141,14 @@ from .visualizations import (
     create_multi_line_comparison,
     create_sunburst_chart,
     create_week_performance_chart,
-    create_operator_ranking
+    create_operator_ranking,
+    group_mean,
+    pivot_mean,
+    operator_ranking_table,
+    histogram_table,
+    box_stats_table,
+    cache_figure,
+    get_figure_cache
 )
 
 __all__ = [
@@ -58,17 +161,93 @@ __all__ = [
     'save_to_session_state',
     'load_from_session_state',
     
+    # Dataset Store
+    'PartitionedDataset',
+    'save_dataset',
+    'load_dataset',
+    'clear_dataset',
+    
+    # Dataset Registry
+    'DatasetRegistry',
+    'get_dataset_registry',
+    
+    # Fact Table
+    'build_fact_table',
+    'get_fact_table',
+    
+    # Filters
+    'FrameIndex',
+    'FilterEngine',
+    'get_filter_engine',
+    
+    # KPI Cube
+    'KPICube',
+    'get_kpi_cube',
+    
+    # Percentiles
+    'PercentileIndex',
+    'get_percentile_index',
+    'add_percentile_columns',
+    
+    # Trends
+    'trend_label',
+    'trend_arrow',
+    'student_t_pvalue',
+    'compute_trends',
+    'compute_all_trends',
+    
+    # Outliers
+    'grouped_quartiles',
+    'outlier_summary',
+    'detect_outliers',
+    'outlier_counts',
+    
+    # Correlations
+    'build_kpi_tensor',
+    'lagged_correlations',
+    'compute_correlations',
+    'strong_correlations',
+    'lag_label',
+    
+    # Ranking
+    'entity_kpi_stats',
+    'entity_stats',
+    'entity_period_means',
+    'compute_ranking',
+    
+    # Bootstrap
+    'bootstrap_means',
+    'bootstrap_ranking',
+    'bootstrap_all_rankings',
+    
+    # Aggregation Memo
+    'AggregationMemo',
+    'get_aggregation_memo',
+    'frame_signature',
+    'call_key',
+    'memoize_aggregation',
+    'register_frame',
+    
+    # Ingestion Cache
+    'IngestionCache',
+    'get_ingestion_cache',
+    
     # Validators
     'validate_filename',
     'validate_file_structure',
     'validate_shift_format',
+    'validate_indicator_frame',
+    'compute_column_stats',
     'validate_machine_name',
     'check_data_completeness',
     'generate_validation_report',
     
     # Calculations
     'parse_shift_column',
+    'parse_shift_series',
     'get_pmi_week_number',
+    'get_pmi_calendar',
+    'lookup_pmi_calendar',
     'calculate_week_average',
     'calculate_month_average',
     'process_updt_file',
@@ -77,6 +256,12 @@ __all__ = [
     'identify_outliers',
     'calculate_trend',
     
+    # Decimation
+    'decimate_frame',
+    'lttb_indices',
+    'minmax_indices',
+    'target_points',
+    
     # Visualizations
     'create_line_chart',
     'create_bar_chart',
@@ -89,5 +274,12 @@ __all__ = [
     'create_multi_line_comparison',
     'create_sunburst_chart',
     'create_week_performance_chart',
-    'create_operator_ranking'
+    'create_operator_ranking',
+    'group_mean',
+    'pivot_mean',
+    'operator_ranking_table',
+    'histogram_table',
+    'box_stats_table',
+    'cache_figure',
+    'get_figure_cache'
 ]
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+Intervalos de confianza bootstrap y estabilidad de rankings
+
+Los registros de todas las entidades (operadores, LCs, ...) se ordenan por grupo y
+cada remuestreo es una matriz de índices (remuestras x registros): el índice de
+cada posición se sortea dentro del segmento de su grupo y los promedios salen de
+np.add.reduceat, sin ciclos de Python por remuestra ni por entidad. Las remuestras
+se procesan en bloques de a lo más BOOTSTRAP_BLOQUE_MAX índices.
+"""
+
+from collections.abc import Mapping
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from Config.constants import (
+    BOOTSTRAP_REMUESTRAS, BOOTSTRAP_NIVEL, BOOTSTRAP_SEMILLA, BOOTSTRAP_BLOQUE_MAX
+)
+from utils.indicators import get_kpi_direction
+from utils.memo import memoize_aggregation
+
+
+def bootstrap_means(valores: np.ndarray,
+                    codigos: np.ndarray,
+                    n_grupos: int,
+                    n_remuestras: int = BOOTSTRAP_REMUESTRAS,
+                    semilla: Optional[int] = BOOTSTRAP_SEMILLA) -> np.ndarray:
+    """
+    Promedios bootstrap de cada grupo
+
+    Args:
+        valores: Valores (NaN se ignoran)
+        codigos: Grupo de cada valor (0..n_grupos-1; -1 = sin grupo)
+        n_grupos: Número de grupos
+        n_remuestras: Número de remuestras
+        semilla: Semilla del generador (None = aleatoria)
+
+    Returns:
+        Matriz (n_remuestras x n_grupos) de promedios (NaN en grupos sin datos)
+    """
+    validos = ~np.isnan(valores) & (codigos >= 0)
+    v, c = valores[validos], codigos[validos]
+    orden = np.argsort(c, kind='stable')
+    v, c = v[orden], c[orden]
+
+    n = np.bincount(c, minlength=n_grupos)
+    inicio = np.concatenate([[0], np.cumsum(n)[:-1]])
+    medias = np.full((n_remuestras, n_grupos), np.nan)
+    con_datos = np.flatnonzero(n > 0)
+    if len(v) == 0:
+        return medias
+
+    # Inicio y tamaño del segmento de cada posición: índice = inicio + floor(u x n)
+    inicio_pos = inicio[c]
+    n_pos = n[c].astype(np.float64)
+    rng = np.random.default_rng(semilla)
+    bloque = max(1, BOOTSTRAP_BLOQUE_MAX // len(v))
+
+    for desde in range(0, n_remuestras, bloque):
+        hasta = min(desde + bloque, n_remuestras)
+        u = rng.random((hasta - desde, len(v)))
+        indices = inicio_pos + (u * n_pos).astype(np.int64)
+        sumas = np.add.reduceat(v[indices], inicio[con_datos], axis=1)
+        medias[desde:hasta, con_datos] = sumas / n[con_datos]
+    return medias
+
+
+def _rank_rows(medias: np.ndarray, mayor_es_mejor: bool) -> np.ndarray:
+    """Posición (1 = mejor) de cada grupo en cada fila de la matriz"""
+    orden = np.argsort(-medias if mayor_es_mejor else medias, axis=1, kind='stable')
+    rangos = np.empty_like(orden)
+    np.put_along_axis(rangos, orden, np.arange(1, medias.shape[1] + 1), axis=1)
+    return rangos
+
+
+@memoize_aggregation(lambda df, kpi_col, by=None, **kwargs: [kpi_col] + list(by or ['operador']))
+def bootstrap_ranking(df: pd.DataFrame,
+                      kpi_col: str,
+                      by: Optional[List[str]] = None,
+                      n_remuestras: int = BOOTSTRAP_REMUESTRAS,
+                      nivel: float = BOOTSTRAP_NIVEL,
+                      semilla: Optional[int] = BOOTSTRAP_SEMILLA,
+                      direccion: Optional[str] = None) -> pd.DataFrame:
+    """
+    Ranking por promedio con intervalos de confianza bootstrap (memoizada)
+
+    Args:
+        df: DataFrame con el KPI (no se modifica ni se copia)
+        kpi_col: Columna del KPI
+        by: Columnas que definen las entidades (por defecto ['operador'])
+        n_remuestras: Número de remuestras
+        nivel: Nivel de confianza de los intervalos (p. ej. 0.95)
+        semilla: Semilla del generador (None = aleatoria)
+        direccion: 'alto' o 'bajo' es mejor (por defecto la del KPI)
+
+    Returns:
+        DataFrame con las columnas de by más 'n', 'promedio', 'ci_inf', 'ci_sup',
+        'rango' (1 = mejor), 'rango_ci_inf', 'rango_ci_sup', 'prob_rango'
+        (probabilidad de conservar su posición), 'prob_primero' y 'prob_top3';
+        ordenado por rango. Las entidades sin valores se omiten.
+    """
+    by = list(by or ['operador'])
+    columnas = by + ['n', 'promedio', 'ci_inf', 'ci_sup', 'rango', 'rango_ci_inf',
+                     'rango_ci_sup', 'prob_rango', 'prob_primero', 'prob_top3']
+    if len(df) == 0:
+        return pd.DataFrame(columns=columnas)
+
+    grupos = df.groupby(by, observed=True, sort=True)
+    codigos = grupos.ngroup().to_numpy(dtype=np.int64)
+    tabla = grupos.size().index.to_frame(index=False)
+    valores = df[kpi_col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    # Solo entidades con al menos un valor
+    n = np.bincount(codigos[~np.isnan(valores) & (codigos >= 0)], minlength=len(tabla))
+    presentes = np.flatnonzero(n > 0)
+    if len(presentes) == 0:
+        return pd.DataFrame(columns=columnas)
+    nuevo_codigo = np.full(len(tabla), -1, dtype=np.int64)
+    nuevo_codigo[presentes] = np.arange(len(presentes))
+    codigos = np.where(codigos >= 0, nuevo_codigo[np.maximum(codigos, 0)], -1)
+    tabla = tabla.iloc[presentes].reset_index(drop=True)
+    n = n[presentes]
+
+    sumas = np.bincount(codigos[codigos >= 0], weights=np.nan_to_num(valores[codigos >= 0]),
+                        minlength=len(tabla))
+    promedio = sumas / n
+    medias = bootstrap_means(valores, codigos, len(tabla), n_remuestras, semilla)
+
+    mayor_es_mejor = (direccion or get_kpi_direction(kpi_col)) != 'bajo'
+    alfa = (1 - nivel) / 2
+    rango = _rank_rows(promedio[np.newaxis, :], mayor_es_mejor)[0]
+    rangos = _rank_rows(medias, mayor_es_mejor)
+
+    tabla = tabla.assign(
+        n=n,
+        promedio=promedio,
+        ci_inf=np.quantile(medias, alfa, axis=0),
+        ci_sup=np.quantile(medias, 1 - alfa, axis=0),
+        rango=rango,
+        rango_ci_inf=np.quantile(rangos, alfa, axis=0, method='inverted_cdf'),
+        rango_ci_sup=np.quantile(rangos, 1 - alfa, axis=0, method='inverted_cdf'),
+        prob_rango=(rangos == rango).mean(axis=0),
+        prob_primero=(rangos == 1).mean(axis=0),
+        prob_top3=(rangos <= 3).mean(axis=0)
+    )
+    return tabla.sort_values('rango').reset_index(drop=True)[columnas]
+
+
+def bootstrap_all_rankings(data: Mapping,
+                           by: Optional[List[str]] = None,
+                           n_remuestras: int = BOOTSTRAP_REMUESTRAS,
+                           nivel: float = BOOTSTRAP_NIVEL) -> pd.DataFrame:
+    """
+    Rankings bootstrap de todos los KPIs
+
+    Args:
+        data: Mapping indicador -> DataFrame (p. ej. resultado de filter_all)
+        by: Columnas que definen las entidades (por defecto ['operador'])
+        n_remuestras: Número de remuestras
+        nivel: Nivel de confianza de los intervalos
+
+    Returns:
+        DataFrame de bootstrap_ranking con una columna 'indicador' adicional
+    """
+    tablas = [
+        bootstrap_ranking(df, indicador, by, n_remuestras, nivel).assign(indicador=indicador)
+        for indicador, df in data.items()
+        if indicador in df.columns and len(df) > 0
+    ]
+    if not tablas:
+        return pd.DataFrame(columns=['indicador'] + list(by or ['operador']) +
+                            ['n', 'promedio', 'ci_inf', 'ci_sup', 'rango', 'rango_ci_inf',
+                             'rango_ci_sup', 'prob_rango', 'prob_primero', 'prob_top3'])
+    tabla = pd.concat(tablas, ignore_index=True)
+    return tabla[['indicador'] + [c for c in tabla.columns if c != 'indicador']]
@@ -7,7 +7,12 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
 import calendar
-from Config.constants import FORMATO_FECHA_SHIFT, INDICADORES
+from functools import lru_cache
+from Config.constants import FORMATO_FECHA_SHIFT
+from utils.indicators import get_kpi_direction
+from utils.memo import memoize_aggregation
+from utils.outliers import outlier_summary
+from utils.trends import compute_trends
 
 def parse_shift_column(shift_str: str) -> Dict:
     """
@@ -55,6 +60,70 @@ def parse_shift_column(shift_str: str) -> Dict:
         raise ValueError(f"Error parseando shift '{shift_str}': {str(e)}")
 
 
+def parse_shift_series(shift_series: pd.Series) -> pd.DataFrame:
+    """
+    Versión columnar de parse_shift_column para una Serie completa de 'Shift'
+
+    Produce las mismas columnas que parse_shift_column (turno, fecha, dia, mes,
+    año, week, dia_semana, mes_asignado, fecha_str) con operaciones sobre la
+    columna entera en lugar de un parseo fila por fila.
+
+    Args:
+        shift_series: Serie con valores 'S[1-3] DD-MM-YYYY'
+
+    Returns:
+        DataFrame con el mismo índice que shift_series
+    """
+    partes = shift_series.astype(str).str.strip().str.extract(r'^(\S+)\s+(\S+)$')
+    fechas = pd.to_datetime(partes[1], format=FORMATO_FECHA_SHIFT, errors='coerce')
+
+    invalidos = fechas.isna()
+    if invalidos.any():
+        valor = shift_series[invalidos].iloc[0]
+        raise ValueError(f"Error parseando shift '{valor}': formato incorrecto")
+
+    # Week y mes asignado salen del calendario PMI precalculado
+    calendario = lookup_pmi_calendar(fechas)
+
+    return pd.DataFrame({
+        'turno': partes[0],
+        'fecha': fechas,
+        'dia': fechas.dt.day.astype(np.int64),
+        'mes': fechas.dt.month.astype(np.int64),
+        'año': fechas.dt.year.astype(np.int64),
+        'week': calendario['week'].to_numpy(),
+        'dia_semana': fechas.dt.day_name(),
+        'mes_asignado': calendario['mes_asignado'].to_numpy(),
+        'fecha_str': fechas.dt.strftime('%Y-%m-%d')
+    }, index=shift_series.index)
+
+
+def get_pmi_week_numbers(fechas: pd.Series) -> np.ndarray:
+    """
+    Versión vectorizada de get_pmi_week_number para una Serie de fechas
+
+    Args:
+        fechas: Serie datetime64
+
+    Returns:
+        Arreglo con el número de week PMI de cada fecha
+    """
+    dia_del_año = fechas.dt.dayofyear.to_numpy(dtype=np.int64) - 1
+    dia_semana_1_ene = (fechas.dt.weekday.to_numpy(dtype=np.int64) - dia_del_año) % 7
+
+    # Años que empiezan en Lunes usan ISO week
+    iso_week = fechas.dt.isocalendar().week.to_numpy(dtype=np.int64)
+
+    dias_hasta_lunes = (7 - dia_semana_1_ene) % 7
+    week_custom = np.where(
+        dia_del_año < dias_hasta_lunes,
+        1,
+        (dia_del_año - dias_hasta_lunes) // 7 + 2
+    )
+
+    return np.where(dia_semana_1_ene == 0, iso_week, week_custom)
+
+
 def get_pmi_week_number(fecha: datetime) -> int:
     """
     Calcula el número de week según lógica PMI
@@ -114,18 +183,31 @@ def get_month_for_week(fecha: datetime, week_num: int) -> int:
     # Encontrar el rango completo de la week
     inicio_week, fin_week = get_week_date_range(fecha.year, week_num)
     
-    # Contar días en cada mes
-    dias_por_mes = {}
-    current_date = inicio_week
+    # Una week abarca a lo más dos meses: contar los días que caen en el mes de inicio
+    inicio = np.array([inicio_week], dtype='datetime64[D]')
+    fin = np.array([fin_week], dtype='datetime64[D]')
+    return int(_majority_month(inicio, fin)[0])
+
+
+def _majority_month(inicio: np.ndarray, fin: np.ndarray) -> np.ndarray:
+    """
+    Mes con más días dentro de cada rango [inicio, fin] (en empate gana el primero)
     
-    while current_date <= fin_week:
-        mes = current_date.month
-        dias_por_mes[mes] = dias_por_mes.get(mes, 0) + 1
-        current_date += timedelta(days=1)
+    Args:
+        inicio: Arreglo datetime64[D] con el inicio de cada week
+        fin: Arreglo datetime64[D] con el fin de cada week
     
-    # Devolver el mes con más días
-    mes_asignado = max(dias_por_mes, key=dias_por_mes.get)
-    return mes_asignado
+    Returns:
+        Arreglo con el número de mes (1-12) asignado a cada rango
+    """
+    mes_inicio = inicio.astype('datetime64[M]')
+    fin_mes_inicio = (mes_inicio + 1).astype('datetime64[D]') - 1
+    
+    dias_totales = (fin - inicio).astype(np.int64) + 1
+    dias_mes_inicio = (np.minimum(fin, fin_mes_inicio) - inicio).astype(np.int64) + 1
+    
+    mes_ganador = np.where(dias_mes_inicio * 2 >= dias_totales, mes_inicio, fin.astype('datetime64[M]'))
+    return mes_ganador.astype(np.int64) % 12 + 1
 
 
 def get_week_date_range(año: int, week_num: int) -> Tuple[datetime, datetime]:
@@ -162,6 +244,97 @@ def get_week_date_range(año: int, week_num: int) -> Tuple[datetime, datetime]:
     return inicio, fin
 
 
+@lru_cache(maxsize=None)
+def _build_pmi_calendar_year(año: int) -> pd.DataFrame:
+    """
+    Construye el calendario PMI de un año completo (una fila por día)
+    
+    Args:
+        año: Año a construir
+    
+    Returns:
+        DataFrame indexado por fecha con week, week_inicio, week_fin y mes_asignado
+    """
+    fechas = pd.Series(pd.date_range(f'{año}-01-01', f'{año}-12-31', freq='D'))
+    weeks = get_pmi_week_numbers(fechas)
+    
+    primer_dia = np.datetime64(f'{año}-01-01', 'D')
+    dia_semana = int(pd.Timestamp(primer_dia).weekday())
+    
+    # Mismas reglas que get_week_date_range, calculadas para todas las weeks a la vez
+    dias_hasta_lunes = (7 - dia_semana) % 7 or 7
+    primer_lunes = primer_dia + dias_hasta_lunes
+    
+    inicio = np.where(
+        weeks == 1,
+        primer_dia,
+        primer_lunes + (weeks - 2) * 7
+    ).astype('datetime64[D]')
+    fin = np.where(
+        weeks == 1,
+        primer_dia + (6 - dia_semana) % 7,
+        inicio + 6
+    ).astype('datetime64[D]')
+    
+    calendario = pd.DataFrame({
+        'week': weeks,
+        'week_inicio': inicio.astype('datetime64[ns]'),
+        'week_fin': fin.astype('datetime64[ns]'),
+        'mes_asignado': _majority_month(inicio, fin)
+    }, index=pd.DatetimeIndex(fechas, name='fecha'))
+    
+    return calendario
+
+
+@lru_cache(maxsize=32)
+def get_pmi_calendar(año_inicio: int, año_fin: int) -> pd.DataFrame:
+    """
+    Tabla de dimensión del calendario PMI para un rango de años (memoizada)
+    
+    Cada fila es un día con su week PMI, el rango (inicio, fin) de esa week y el
+    mes al que se asigna la week. La tabla es de solo lectura: no modificarla.
+    
+    Args:
+        año_inicio: Primer año (inclusive)
+        año_fin: Último año (inclusive)
+    
+    Returns:
+        DataFrame indexado por fecha, contiguo día por día
+    """
+    return pd.concat([_build_pmi_calendar_year(año) for año in range(año_inicio, año_fin + 1)])
+
+
+def lookup_pmi_calendar(fechas: pd.Series) -> pd.DataFrame:
+    """
+    Busca en el calendario PMI la week y mes asignado de cada fecha (vectorizado)
+    
+    Args:
+        fechas: Serie datetime64 sin nulos
+    
+    Returns:
+        DataFrame con columnas week, week_inicio, week_fin y mes_asignado,
+        alineado con el índice de fechas
+    """
+    dias = pd.to_datetime(fechas).to_numpy().astype('datetime64[D]')
+    
+    if len(dias) == 0:
+        vacio = _build_pmi_calendar_year(2000).iloc[:0].copy()
+        vacio.index = fechas.index[:0] if isinstance(fechas, pd.Series) else pd.RangeIndex(0)
+        return vacio
+    
+    año_inicio = int(dias.min().astype('datetime64[Y]').astype(np.int64)) + 1970
+    año_fin = int(dias.max().astype('datetime64[Y]').astype(np.int64)) + 1970
+    calendario = get_pmi_calendar(año_inicio, año_fin)
+    
+    # Al ser contiguo, la posición de cada fecha es su distancia en días al 1 de enero
+    posiciones = (dias - np.datetime64(f'{año_inicio}-01-01', 'D')).astype(np.int64)
+    resultado = calendario.iloc[posiciones]
+    resultado.index = fechas.index if isinstance(fechas, pd.Series) else pd.RangeIndex(len(dias))
+    
+    return resultado
+
+
+@memoize_aggregation(lambda df, kpi_column: ['week', 'fecha', kpi_column])
 def calculate_week_average(df: pd.DataFrame, kpi_column: str) -> pd.DataFrame:
     """
     Calcula promedios por week para un KPI específico
@@ -188,6 +361,7 @@ def calculate_week_average(df: pd.DataFrame, kpi_column: str) -> pd.DataFrame:
     return week_avg
 
 
+@memoize_aggregation(lambda df, kpi_column: ['mes_asignado', 'fecha', kpi_column])
 def calculate_month_average(df: pd.DataFrame, kpi_column: str) -> pd.DataFrame:
     """
     Calcula promedios por mes para un KPI específico
@@ -254,23 +428,6 @@ def process_updt_file(df: pd.DataFrame) -> pd.DataFrame:
     return df_filtered[['Shift', 'UPDT']]
 
 
-def get_kpi_direction(kpi_name: str) -> str:
-    """
-    Obtiene la dirección de mejora de un KPI
-    
-    Args:
-        kpi_name: Nombre del KPI
-    
-    Returns:
-        'alto' o 'bajo' indicando qué es mejor
-    """
-    for key, value in INDICADORES.items():
-        if kpi_name in value['variantes']:
-            return value['mejor']
-    
-    return 'alto'  # Default
-
-
 def calculate_percentile_rank(df: pd.DataFrame, kpi_column: str, value: float) -> float:
     """
     Calcula el percentil de un valor dentro de una distribución
@@ -304,14 +461,8 @@ def identify_outliers(df: pd.DataFrame, kpi_column: str) -> pd.DataFrame:
     Returns:
         DataFrame con columna 'is_outlier' (bool)
     """
-    Q1 = df[kpi_column].quantile(0.25)
-    Q3 = df[kpi_column].quantile(0.75)
-    IQR = Q3 - Q1
-    
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
-    
-    df['is_outlier'] = (df[kpi_column] < lower_bound) | (df[kpi_column] > upper_bound)
+    # Límites globales; para límites por máquina/turno sin copiar ver utils.outliers
+    df['is_outlier'] = outlier_summary(df, kpi_column)['mascara']
     
     return df
 
@@ -328,21 +479,5 @@ def calculate_trend(df: pd.DataFrame, kpi_column: str, date_column: str = 'fecha
     Returns:
         'mejorando', 'empeorando' o 'estable'
     """
-    # Ordenar por fecha
-    df_sorted = df.sort_values(date_column)
-    
-    # Calcular correlación entre fecha y KPI
-    # Convertir fecha a ordinal para correlación
-    df_sorted['fecha_num'] = pd.to_datetime(df_sorted[date_column]).apply(lambda x: x.toordinal())
-    
-    corr = df_sorted[['fecha_num', kpi_column]].corr().iloc[0, 1]
-    
-    # Determinar tendencia según dirección del KPI
-    kpi_mejor = get_kpi_direction(kpi_column)
-    
-    if abs(corr) < 0.1:
-        return 'estable'
-    elif kpi_mejor == 'alto':
-        return 'mejorando' if corr > 0 else 'empeorando'
-    else:  # kpi_mejor == 'bajo'
-        return 'mejorando' if corr < 0 else 'empeorando'
\ No newline at end of file
+    # Regresión en forma cerrada (ver utils.trends para muchas series a la vez)
+    return compute_trends(df, kpi_column, None, date_column)['tendencia'].iloc[0]
\ No newline at end of file
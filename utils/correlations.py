@@ -0,0 +1,204 @@
+"""
+Motor de correlaciones entre KPIs para toda la flota (simultáneas y con desfase)
+
+A partir de la tabla de hechos se arma una sola vez un arreglo denso
+máquina x turno-en-el-tiempo x KPI (NaN donde no hay registro). Las
+correlaciones de todos los pares de KPIs, de todas las máquinas y de cada desfase
+salen de sumas con einsum sobre ese arreglo, con la misma semántica que
+DataFrame.corr (Pearson con los registros que ambos KPIs tienen en común).
+
+Desfases (en turnos): 0 = mismo turno, 1 = turno siguiente (S3 -> S1 del día
+siguiente), n_turnos = mismo turno del día siguiente.
+"""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from Config.constants import TURNOS
+from utils.fact_table import LLAVES
+from utils.memo import memoize_aggregation
+
+MIN_REGISTROS_CORRELACION = 11  # Registros en común mínimos (mismo criterio que el panel de insights)
+
+
+def build_kpi_tensor(fact: pd.DataFrame,
+                     kpis: Sequence[str],
+                     fecha_inicio=None,
+                     fecha_fin=None,
+                     turnos: Optional[Sequence[str]] = None) -> Dict:
+    """
+    Arreglo denso máquina x turno-en-el-tiempo x KPI a partir de la tabla de hechos
+
+    Args:
+        fact: Tabla de hechos (get_fact_table)
+        kpis: Columnas de KPI a incluir
+        fecha_inicio: Fecha mínima incluida (opcional)
+        fecha_fin: Fecha máxima incluida (opcional)
+        turnos: Turnos incluidos (opcional; los demás quedan como NaN)
+
+    Returns:
+        Dict con 'valores' (arreglo float64 M x T x K), 'maquinas', 'turnos' y 'kpis'
+    """
+    maquinas = list(pd.Categorical(fact['maquina']).categories)
+    todos_turnos = list(pd.Categorical(fact['turno']).categories)
+    n_turnos = max(len(todos_turnos), 1)
+
+    filas = np.ones(len(fact), dtype=bool)
+    if fecha_inicio is not None:
+        filas &= (fact['fecha'] >= pd.to_datetime(fecha_inicio)).to_numpy()
+    if fecha_fin is not None:
+        filas &= (fact['fecha'] <= pd.to_datetime(fecha_fin)).to_numpy()
+    if turnos is not None:
+        filas &= fact['turno'].isin(turnos).to_numpy()
+    sub = fact[filas]
+
+    if len(sub) == 0:
+        valores = np.empty((len(maquinas), 0, len(kpis)))
+    else:
+        dias = sub['fecha'].to_numpy().astype('datetime64[D]')
+        dia = (dias - dias.min()).astype(np.int64)
+        m = pd.Categorical(sub['maquina'], categories=maquinas).codes.astype(np.int64)
+        t = pd.Categorical(sub['turno'], categories=todos_turnos).codes.astype(np.int64)
+        slot = dia * n_turnos + t
+
+        valores = np.full((len(maquinas), int(slot.max()) + 1, len(kpis)), np.nan)
+        valores[m, slot, :] = sub[list(kpis)].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    return {'valores': valores, 'maquinas': maquinas, 'turnos': todos_turnos, 'kpis': list(kpis)}
+
+
+def lagged_correlations(valores: np.ndarray, lag: int = 0,
+                        min_periods: int = MIN_REGISTROS_CORRELACION) -> Dict[str, np.ndarray]:
+    """
+    Correlación de Pearson entre x_i(t) y x_j(t + lag) para todas las máquinas
+
+    Args:
+        valores: Arreglo M x T x K (NaN = sin registro)
+        lag: Desfase en turnos (>= 0)
+        min_periods: Registros en común mínimos (si no, NaN)
+
+    Returns:
+        Dict con 'correlacion' y 'n' (arreglos M x K x K; fila = KPI en t,
+        columna = KPI en t + lag)
+    """
+    n_t = valores.shape[1]
+    if lag >= n_t:
+        forma = (valores.shape[0], valores.shape[2], valores.shape[2])
+        return {'correlacion': np.full(forma, np.nan), 'n': np.zeros(forma, dtype=np.int64)}
+
+    # Centrar por máquina y KPI reduce la cancelación numérica en las sumas
+    with np.errstate(invalid='ignore'):
+        media = np.nanmean(valores, axis=1, keepdims=True) if n_t > 0 else 0.0
+    centrados = valores - np.nan_to_num(media)
+
+    a = centrados[:, :n_t - lag, :]
+    b = centrados[:, lag:, :]
+    va, vb = ~np.isnan(a), ~np.isnan(b)
+    a0, b0 = np.where(va, a, 0.0), np.where(vb, b, 0.0)
+    va, vb = va.astype(np.float64), vb.astype(np.float64)
+
+    # Sumas restringidas a los turnos donde ambos KPIs tienen registro
+    n = np.einsum('mti,mtj->mij', va, vb)
+    sx = np.einsum('mti,mtj->mij', a0, vb)
+    sy = np.einsum('mti,mtj->mij', va, b0)
+    sxx = np.einsum('mti,mtj->mij', a0 * a0, vb)
+    syy = np.einsum('mti,mtj->mij', va, b0 * b0)
+    sxy = np.einsum('mti,mtj->mij', a0, b0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = n * sxy - sx * sy
+        var_x = n * sxx - sx * sx
+        var_y = n * syy - sy * sy
+        corr = cov / np.sqrt(var_x * var_y)
+    corr = np.clip(corr, -1.0, 1.0)
+    corr[(n < min_periods) | (var_x <= 0) | (var_y <= 0)] = np.nan
+
+    return {'correlacion': corr, 'n': n.round().astype(np.int64)}
+
+
+@memoize_aggregation(lambda fact, kpis, **kwargs: LLAVES + list(kpis))
+def compute_correlations(fact: pd.DataFrame,
+                         kpis: Sequence[str],
+                         fecha_inicio=None,
+                         fecha_fin=None,
+                         turnos: Optional[Sequence[str]] = None,
+                         lags: Optional[Sequence[int]] = None,
+                         min_periods: int = MIN_REGISTROS_CORRELACION) -> pd.DataFrame:
+    """
+    Correlaciones de todos los pares de KPIs, en todas las máquinas y desfases
+
+    Args:
+        fact: Tabla de hechos (get_fact_table)
+        kpis: KPIs a correlacionar
+        fecha_inicio: Fecha mínima incluida (opcional)
+        fecha_fin: Fecha máxima incluida (opcional)
+        turnos: Turnos incluidos (opcional)
+        lags: Desfases en turnos (por defecto 0, turno siguiente y día siguiente)
+        min_periods: Registros en común mínimos
+
+    Returns:
+        DataFrame con columnas 'maquina', 'lag', 'kpi_1', 'kpi_2', 'correlacion' y
+        'n' (kpi_2 medido lag turnos después de kpi_1). Con lag 0 solo se incluye
+        cada par una vez; con desfase se incluyen ambos sentidos y la
+        autocorrelación de cada KPI. Sin filas con correlación NaN.
+    """
+    tensor = build_kpi_tensor(fact, kpis, fecha_inicio, fecha_fin, turnos)
+    n_turnos = len(tensor['turnos'])
+    if lags is None:
+        lags = sorted({0, 1, n_turnos})
+
+    k = len(kpis)
+    i, j = np.meshgrid(np.arange(k), np.arange(k), indexing='ij')
+    resultados = []
+    for lag in lags:
+        res = lagged_correlations(tensor['valores'], lag, min_periods)
+        pares = (i < j) if lag == 0 else np.ones((k, k), dtype=bool)
+        pi, pj = i[pares], j[pares]
+        for m, maquina in enumerate(tensor['maquinas']):
+            resultados.append(pd.DataFrame({
+                'maquina': maquina,
+                'lag': lag,
+                'kpi_1': [kpis[x] for x in pi],
+                'kpi_2': [kpis[x] for x in pj],
+                'correlacion': res['correlacion'][m][pares],
+                'n': res['n'][m][pares]
+            }))
+
+    columnas = ['maquina', 'lag', 'kpi_1', 'kpi_2', 'correlacion', 'n']
+    if not resultados:
+        return pd.DataFrame(columns=columnas)
+    tabla = pd.concat(resultados, ignore_index=True)
+    return tabla[tabla['correlacion'].notna()].reset_index(drop=True)[columnas]
+
+
+def strong_correlations(correlaciones: pd.DataFrame, umbral: float = 0.7) -> pd.DataFrame:
+    """
+    Filtra correlaciones fuertes (|r| > umbral), de la más fuerte a la más débil
+
+    Args:
+        correlaciones: Resultado de compute_correlations
+        umbral: Valor absoluto mínimo (exclusivo)
+
+    Returns:
+        DataFrame con las mismas columnas; excluye autocorrelaciones
+    """
+    fuertes = correlaciones[
+        (correlaciones['correlacion'].abs() > umbral) &
+        (correlaciones['kpi_1'] != correlaciones['kpi_2'])
+    ]
+    orden = fuertes['correlacion'].abs().sort_values(ascending=False, kind='stable').index
+    return fuertes.loc[orden].reset_index(drop=True)
+
+
+def lag_label(lag: int, n_turnos: int = len(TURNOS)) -> str:
+    """Descripción de un desfase en turnos"""
+    if lag == 0:
+        return 'mismo turno'
+    if lag == 1:
+        return 'turno siguiente'
+    if n_turnos > 0 and lag % n_turnos == 0:
+        dias = lag // n_turnos
+        return 'día siguiente' if dias == 1 else f'{dias} días después'
+    return f'{lag} turnos después'
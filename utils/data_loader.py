@@ -1,9 +1,16 @@
 """
 Funciones para carga y procesamiento de archivos
 """
+import io
+import os
+import numpy as np
 import pandas as pd
 import streamlit as st
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from pickle import PicklingError
+from collections.abc import Mapping
 from typing import Dict, List, Optional, Tuple
 
 from Config.constants import (
@@ -11,14 +18,23 @@ from Config.constants import (
     COLUMNA_SHIFT,
     COLUMNAS_ASIGNACIONES,
     FECHA_INICIO,
-    FECHA_FIN
+    FECHA_FIN,
+    PROCESAMIENTO_PARALELO,
+    ESQUEMA_PROCESAMIENTO,
+    COLUMNAS_PERCENTIL,
+    MAX_WORKERS_PROCESAMIENTO
 )
 
-from utils.calculations import parse_shift_column, process_updt_file
+from utils.calculations import parse_shift_series, process_updt_file
+from utils.dataset_registry import get_dataset_registry
+from utils.dataset_store import PartitionedDataset, make_partition, save_dataset, load_dataset
+from utils.ingestion_cache import get_ingestion_cache, get_asignaciones_version, make_ingestion_key
+from utils.percentiles import add_percentile_columns
 from utils.validators import (
     validate_filename,
     validate_file_structure,
-    validate_shift_format,
+    validate_indicator_frame,
+    compute_column_stats,
     validate_date_range,
     validate_turno_values,
     validate_numeric_values,
@@ -30,6 +46,8 @@ def load_excel_file(uploaded_file, indicador: str) -> Tuple[Optional[pd.DataFram
     errores = []
     try:
         file_ext = Path(uploaded_file.name).suffix.lower()
+        if hasattr(uploaded_file, 'seek'):
+            uploaded_file.seek(0)  # El archivo pudo haberse leído antes (huella de contenido)
         if file_ext == '.csv':
             df = pd.read_csv(uploaded_file, skiprows=FILA_INICIO_DATOS)
         else:
@@ -63,11 +81,13 @@ def process_indicator_file(uploaded_file, indicador: str, maquina: str) -> Tuple
     if not es_valido:
         return None, generate_validation_report(validaciones)
 
-    # 4) Validar formato Shift
-    es_valido, msg, invalid_idx = validate_shift_format(df[COLUMNA_SHIFT])
+    # 4) Validar formato Shift y columna del KPI (una pasada vectorizada por columna)
+    max_val = 100 if indicador in ['UPDT', 'Reject Rate', 'Strategic PR'] else None
+    validacion = validate_indicator_frame(df, indicador if indicador != 'UPDT' else None, 0, max_val)
+    es_valido, msg, invalid_idx = validacion['shift']
     validaciones.append((es_valido, msg))
     if not es_valido:
-        df = df.drop(invalid_idx).reset_index(drop=True)
+        df = df[validacion['mascara']].reset_index(drop=True)
         validaciones.append((True, f"⚠️ Se eliminaron {len(invalid_idx)} filas con formato inválido"))
 
     # 4.5) Procesar UPDT antes del parseo
@@ -81,8 +101,7 @@ def process_indicator_file(uploaded_file, indicador: str, maquina: str) -> Tuple
 
     # 5) Parsear columna Shift
     try:
-        parsed_data = df[COLUMNA_SHIFT].apply(parse_shift_column)
-        df_parsed = pd.DataFrame(parsed_data.tolist())
+        df_parsed = parse_shift_series(df[COLUMNA_SHIFT])
         df = pd.concat([df, df_parsed], axis=1)
         validaciones.append((True, "✅ Columna Shift parseada correctamente"))
     except Exception as e:
@@ -99,11 +118,11 @@ def process_indicator_file(uploaded_file, indicador: str, maquina: str) -> Tuple
 
     # 8) Validar valores numéricos
     kpi_col = indicador if indicador in df.columns else None
+    stats = None
     if kpi_col:
-        if indicador in ['UPDT', 'Reject Rate', 'Strategic PR']:
-            es_valido, msg = validate_numeric_values(df[kpi_col], kpi_col, 0, 100)
-        else:
-            es_valido, msg = validate_numeric_values(df[kpi_col], kpi_col, 0)
+        # UPDT se calcula en 4.5; los demás reutilizan las estadísticas del paso 4
+        stats = validacion['stats'] or compute_column_stats(df[kpi_col], 0, max_val)
+        es_valido, msg = validate_numeric_values(df[kpi_col], kpi_col, 0, max_val, stats=stats)
         validaciones.append((es_valido, msg))
 
     # 9) Asignar máquina
@@ -113,7 +132,7 @@ def process_indicator_file(uploaded_file, indicador: str, maquina: str) -> Tuple
     # 10) Conversión a porcentaje para KPIs relevantes
     if indicador in ['UPDT', 'Reject Rate', 'Strategic PR'] and kpi_col:
         # Multiplicar por 100 si los valores parecen estar en escala 0-1
-        if df[kpi_col].max() <= 1:
+        if stats['es_numerico'] and stats['maximo'] <= 1:
             df[kpi_col] = df[kpi_col] * 100
             validaciones.append((True, f"✅ {indicador} convertido a porcentaje (0-100)"))
 
@@ -160,52 +179,298 @@ def load_asignaciones_csv(filepath: str = 'data/asignaciones_operadores.csv') ->
 
 
 def merge_with_asignaciones(df_indicador: pd.DataFrame, df_asignaciones: pd.DataFrame) -> pd.DataFrame:
-    def get_operador_info(row):
-        fecha = row['fecha']
-        turno = row['turno']
-        maquina = row['maquina']
-        match = df_asignaciones[
-            (df_asignaciones['Fecha_Inicio'] <= fecha) &
-            (df_asignaciones['Fecha_Fin'] >= fecha) &
-            (df_asignaciones['Turno'] == turno) &
-            (df_asignaciones['Máquina'] == maquina)
-        ]
-        if len(match) > 0:
-            return pd.Series({'operador': match.iloc[0]['Operador'], 'coordinador': match.iloc[0]['Coordinador']})
-        else:
-            return pd.Series({'operador': 'SIN_ASIGNAR', 'coordinador': 'SIN_ASIGNAR'})
+    """
+    Cruza cada registro del indicador con la asignación vigente (operador y coordinador)
+
+    Un registro corresponde a una asignación cuando coinciden máquina y turno y su
+    fecha cae dentro de [Fecha_Inicio, Fecha_Fin]. Si varias asignaciones aplican,
+    se toma la primera en el orden del archivo de asignaciones. Los registros sin
+    asignación quedan como 'SIN_ASIGNAR'.
 
+    Args:
+        df_indicador: DataFrame con columnas 'fecha', 'turno' y 'maquina'
+        df_asignaciones: DataFrame cargado con load_asignaciones_csv
+
+    Returns:
+        DataFrame con columnas 'operador' y 'coordinador' agregadas
+    """
     df_merged = df_indicador.copy()
-    operador_info = df_merged.apply(get_operador_info, axis=1)
-    df_merged = pd.concat([df_merged, operador_info], axis=1)
+
+    operador = np.full(len(df_merged), 'SIN_ASIGNAR', dtype=object)
+    coordinador = np.full(len(df_merged), 'SIN_ASIGNAR', dtype=object)
+
+    if len(df_merged) > 0 and len(df_asignaciones) > 0:
+        posiciones = _match_asignaciones(df_merged, df_asignaciones)
+        encontrados = posiciones >= 0
+        operador[encontrados] = df_asignaciones['Operador'].astype(object).to_numpy()[posiciones[encontrados]]
+        coordinador[encontrados] = df_asignaciones['Coordinador'].astype(object).to_numpy()[posiciones[encontrados]]
+
+    df_merged['operador'] = operador
+    df_merged['coordinador'] = coordinador
     return df_merged
 
 
-def consolidate_all_data(uploaded_files_dict: Dict[str, Dict[str, any]], df_asignaciones: pd.DataFrame) -> Dict[str, pd.DataFrame]:
-    consolidated = {'MTBF': [], 'UPDT': [], 'Reject Rate': [], 'Strategic PR': []}
+def _match_asignaciones(df_indicador: pd.DataFrame, df_asignaciones: pd.DataFrame) -> np.ndarray:
+    """
+    Obtiene, para cada fila del indicador, la posición de su asignación (-1 si no hay)
+
+    Si los intervalos de cada (Máquina, Turno) no se traslapan se usa un merge_asof
+    agrupado (ordenamiento + búsqueda binaria). Si hay traslapes se hace un join por
+    (Máquina, Turno), se filtra por fecha y se conserva la primera asignación.
+    """
+    filas = pd.DataFrame({
+        '_fila': np.arange(len(df_indicador)),
+        'maquina': df_indicador['maquina'].astype(object).to_numpy(),
+        'turno': df_indicador['turno'].astype(object).to_numpy(),
+        'fecha': pd.to_datetime(df_indicador['fecha']).astype('datetime64[ns]').to_numpy()
+    })
+    asig = pd.DataFrame({
+        '_pos': np.arange(len(df_asignaciones)),
+        'maquina': df_asignaciones['Máquina'].astype(object).to_numpy(),
+        'turno': df_asignaciones['Turno'].astype(object).to_numpy(),
+        'inicio': pd.to_datetime(df_asignaciones['Fecha_Inicio']).astype('datetime64[ns]').to_numpy(),
+        'fin': pd.to_datetime(df_asignaciones['Fecha_Fin']).astype('datetime64[ns]').to_numpy()
+    })
+
+    # Filas sin fecha nunca pueden coincidir
+    filas = filas[filas['fecha'].notna()]
+    asig = asig[asig['inicio'].notna() & asig['fin'].notna()]
+
+    posiciones = np.full(len(df_indicador), -1, dtype=np.int64)
+    if len(filas) == 0 or len(asig) == 0:
+        return posiciones
+
+    asig = asig.sort_values(['maquina', 'turno', 'inicio', '_pos'], kind='mergesort')
+    fin_previo = asig.groupby(['maquina', 'turno'], sort=False)['fin'].cummax()
+    fin_previo = fin_previo.groupby([asig['maquina'], asig['turno']], sort=False).shift()
+    hay_traslapes = bool((asig['inicio'] <= fin_previo).any())
+
+    if not hay_traslapes:
+        # Intervalos disjuntos: la única candidata es la última que inicia antes de la fecha
+        match = pd.merge_asof(
+            filas.sort_values('fecha', kind='mergesort'),
+            asig.sort_values('inicio', kind='mergesort'),
+            left_on='fecha',
+            right_on='inicio',
+            by=['maquina', 'turno'],
+            direction='backward'
+        )
+        match = match[match['_pos'].notna() & (match['fin'] >= match['fecha'])]
+    else:
+        match = filas.merge(asig, on=['maquina', 'turno'], how='inner')
+        match = match[(match['inicio'] <= match['fecha']) & (match['fin'] >= match['fecha'])]
+        match = match.groupby('_fila', sort=False)['_pos'].min().reset_index()
+
+    posiciones[match['_fila'].to_numpy(dtype=np.int64)] = match['_pos'].to_numpy(dtype=np.int64)
+    return posiciones
+
+
+def consolidate_all_data(uploaded_files_dict: Dict[str, Dict[str, any]],
+                         df_asignaciones: pd.DataFrame,
+                         paralelo: bool = PROCESAMIENTO_PARALELO,
+                         max_workers: Optional[int] = MAX_WORKERS_PROCESAMIENTO,
+                         usar_cache: bool = True,
+                         base: Optional[Mapping] = None) -> Tuple[PartitionedDataset, List[Dict]]:
+    """
+    Procesa los archivos subidos y los consolida en particiones (maquina, indicador)
+
+    Si se indica un dataset base, cada archivo reemplaza solo su partición: los
+    archivos idénticos a la partición existente no se vuelven a procesar y las
+    particiones no incluidas en esta carga se conservan.
+
+    Args:
+        uploaded_files_dict: {maquina: {indicador: archivo}}
+        df_asignaciones: DataFrame de asignaciones de operadores
+        paralelo: Procesar cada archivo en un proceso separado
+        max_workers: Número máximo de procesos (None = número de CPUs)
+        usar_cache: Reutilizar resultados de archivos ya procesados (mismo contenido,
+            indicador, máquina y asignaciones)
+        base: Dataset consolidado previo sobre el que se reemplazan particiones
+
+    Returns:
+        Tupla (PartitionedDataset, lista de reportes por archivo). El orden de los
+        reportes es el mismo en modo serial y paralelo.
+    """
+    if base is not None and not isinstance(base, PartitionedDataset):
+        base = PartitionedDataset.from_frames(base)
+
+    tareas = [
+        (maquina, indicador, uploaded_file)
+        for maquina, archivos in uploaded_files_dict.items()
+        for indicador, uploaded_file in archivos.items()
+        if uploaded_file is not None
+    ]
+
+    asignaciones_version = get_asignaciones_version(df_asignaciones)
+    llaves = [
+        make_ingestion_key(_read_file_bytes(uploaded_file), indicador, maquina, asignaciones_version)
+        for maquina, indicador, uploaded_file in tareas
+    ]
+
+    # Particiones sin cambios y resultados ya procesados (caché por contenido)
+    resultados = [None] * len(tareas)
+    origen = [None] * len(tareas)
+    cache = get_ingestion_cache() if usar_cache else None
+    for i, (maquina, indicador, _) in enumerate(tareas):
+        info = base.partition_info((maquina, indicador)) if base is not None else None
+        if info is not None and info.get('llave') == llaves[i]:
+            reporte = info.get('reporte') or generate_validation_report(
+                [(True, "✅ Archivo sin cambios (partición reutilizada)")])
+            resultados[i] = (None, reporte)
+            origen[i] = 'sin_cambios'
+        elif cache is not None:
+            resultados[i] = cache.get(llaves[i])
+            origen[i] = 'cache' if resultados[i] is not None else None
+
+    pendientes = [i for i, resultado in enumerate(resultados) if resultado is None]
+    tareas_pendientes = [tareas[i] for i in pendientes]
+
+    nuevos = None
+    if paralelo and len(tareas_pendientes) > 1:
+        nuevos = _process_files_parallel(tareas_pendientes, df_asignaciones, max_workers)
+    if nuevos is None:
+        nuevos = [
+            _process_and_merge(uploaded_file, indicador, maquina, df_asignaciones)
+            for maquina, indicador, uploaded_file in tareas_pendientes
+        ]
+
+    for i, resultado in zip(pendientes, nuevos):
+        resultados[i] = resultado
+        if cache is not None:
+            cache.put(llaves[i], resultado)
+
+    nuevas_particiones = {}
     reportes = []
-    for maquina, archivos in uploaded_files_dict.items():
-        for indicador, uploaded_file in archivos.items():
-            if uploaded_file is not None:
-                df_processed, reporte = process_indicator_file(uploaded_file, indicador, maquina)
-                reportes.append({'maquina': maquina, 'indicador': indicador, 'reporte': reporte})
-                if df_processed is not None and reporte['es_valido']:
-                    df_with_operators = merge_with_asignaciones(df_processed, df_asignaciones)
-                    consolidated[indicador].append(df_with_operators)
-    final_data = {}
-    for indicador, dfs_list in consolidated.items():
-        if dfs_list:
-            final_data[indicador] = pd.concat(dfs_list, ignore_index=True)
-    return final_data, reportes
-
-
-def save_to_session_state(data_dict: Dict[str, pd.DataFrame]):
-    st.session_state['data_loaded'] = True
-    st.session_state['kpi_data'] = data_dict
-    st.session_state['fecha_carga'] = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+    for i, ((maquina, indicador, _), (df_with_operators, reporte)) in enumerate(zip(tareas, resultados)):
+        reportes.append({'maquina': maquina, 'indicador': indicador, 'reporte': reporte,
+                         'desde_cache': origen[i] is not None,
+                         'sin_cambios': origen[i] == 'sin_cambios'})
+        if df_with_operators is not None:
+            nuevas_particiones[(maquina, indicador)] = make_partition(
+                df_with_operators, llave=llaves[i], reporte=reporte, esquema=ESQUEMA_PROCESAMIENTO)
+
+    if base is not None:
+        return base.replace_partitions(nuevas_particiones), reportes
+    return PartitionedDataset(nuevas_particiones), reportes
+
+
+def _process_and_merge(uploaded_file, indicador: str, maquina: str,
+                       df_asignaciones: pd.DataFrame) -> Tuple[Optional[pd.DataFrame], Dict]:
+    """Unidad de trabajo por archivo: procesar, validar y cruzar con asignaciones"""
+    df_processed, reporte = process_indicator_file(uploaded_file, indicador, maquina)
+    if df_processed is not None and reporte['es_valido']:
+        df_merged = merge_with_asignaciones(df_processed, df_asignaciones)
+        if COLUMNAS_PERCENTIL:
+            df_merged = add_percentile_columns(df_merged, indicador)
+        return df_merged, reporte
+    return None, reporte
+
+
+def _process_bytes_and_merge(nombre: str, contenido: bytes, indicador: str, maquina: str,
+                             df_asignaciones: pd.DataFrame) -> Tuple[Optional[pd.DataFrame], Dict]:
+    """Versión serializable de _process_and_merge para ejecutarse en otro proceso"""
+    archivo = io.BytesIO(contenido)
+    archivo.name = nombre
+    return _process_and_merge(archivo, indicador, maquina, df_asignaciones)
+
+
+def _process_files_parallel(tareas: List[Tuple[str, str, any]], df_asignaciones: pd.DataFrame,
+                            max_workers: Optional[int]) -> Optional[List[Tuple[Optional[pd.DataFrame], Dict]]]:
+    """
+    Procesa los archivos en un pool de procesos conservando el orden de las tareas
+
+    Returns:
+        Lista de resultados en el orden de tareas, o None si el pool no está
+        disponible (el llamador procesa entonces en serie)
+    """
+    nombres, contenidos, indicadores, maquinas = [], [], [], []
+    for maquina, indicador, uploaded_file in tareas:
+        nombres.append(uploaded_file.name)
+        contenidos.append(_read_file_bytes(uploaded_file))
+        indicadores.append(indicador)
+        maquinas.append(maquina)
+
+    workers = min(max_workers or os.cpu_count() or 1, len(tareas))
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(
+                _process_bytes_and_merge,
+                nombres, contenidos, indicadores, maquinas,
+                [df_asignaciones] * len(tareas)
+            ))
+    except (OSError, BrokenProcessPool, PicklingError, NotImplementedError) as e:
+        print(f"⚠️ Procesamiento paralelo no disponible ({e}); procesando en serie")
+        return None
+
+
+def _read_file_bytes(uploaded_file) -> bytes:
+    """Obtiene el contenido completo de un archivo subido sin alterar su posición"""
+    if hasattr(uploaded_file, 'getvalue'):
+        return uploaded_file.getvalue()
+    posicion = uploaded_file.tell()
+    uploaded_file.seek(0)
+    contenido = uploaded_file.read()
+    uploaded_file.seek(posicion)
+    return contenido
+
+
+def save_to_session_state(data_dict: Mapping) -> PartitionedDataset:
+    """
+    Publica el dataset consolidado en el registro compartido, lo persiste en disco
+    (solo particiones nuevas o modificadas) y apunta la sesión a su versión
+
+    Args:
+        data_dict: PartitionedDataset o {indicador: DataFrame consolidado}
+
+    Returns:
+        Copia canónica del dataset (compartida con otras sesiones de la misma versión)
+    """
+    if not isinstance(data_dict, PartitionedDataset):
+        data_dict = PartitionedDataset.from_frames(data_dict)
 
+    try:
+        save_dataset(data_dict)
+    except Exception as e:
+        print(f"⚠️ No se pudo persistir el dataset: {e}")
+
+    data_dict.fecha_carga = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+    data = get_dataset_registry().publish(data_dict)
+    _point_session_to(data)
+    return data
+
+
+def load_from_session_state() -> Optional[Mapping]:
+    """
+    Obtiene el dataset de la sesión desde el registro compartido
+
+    La sesión sigue viendo su versión mientras esté publicada; si no tiene o ya se
+    descartó, usa la versión vigente y, si el servidor no tiene ninguna, abre el
+    almacenamiento persistente (lectura diferida por indicador).
+
+    Returns:
+        Mapping indicador -> DataFrame, o None si no hay datos
+    """
+    registro = get_dataset_registry()
+    data = registro.get(st.session_state.get('dataset_version'))
+    if data is None:
+        data = registro.current()
 
-def load_from_session_state() -> Optional[Dict[str, pd.DataFrame]]:
-    if 'data_loaded' in st.session_state and st.session_state['data_loaded']:
-        return st.session_state.get('kpi_data', None)
-    return None
\ No newline at end of file
+    if data is None:
+        try:
+            data = load_dataset()
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el dataset persistido: {e}")
+            data = None
+        if data is not None:
+            data = registro.publish(data)
+
+    if data is not None:
+        _point_session_to(data)
+    return data
+
+
+def _point_session_to(data: PartitionedDataset):
+    # La sesión solo guarda la versión; el dataset vive una vez en el registro
+    st.session_state['data_loaded'] = True
+    st.session_state['fecha_carga'] = data.fecha_carga
+    st.session_state['dataset_version'] = data.version
@@ -0,0 +1,90 @@
+"""
+Registro compartido de datasets: una sola copia por versión para todas las sesiones
+
+Cada sesión guarda solo la versión del dataset que está viendo; el dataset vive
+una vez en el proceso. Publicar una versión nueva no modifica las anteriores, así
+que una página que ya obtuvo su dataset termina de dibujarse con él.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import streamlit as st
+
+from Config.constants import REGISTRO_MAX_VERSIONES
+from utils.dataset_store import PartitionedDataset
+
+
+class DatasetRegistry:
+    """
+    Datasets publicados por versión (solo lectura)
+
+    Conserva la versión vigente y hasta max_versiones versiones recientes para las
+    sesiones que aún las están usando.
+    """
+
+    def __init__(self, max_versiones: int = REGISTRO_MAX_VERSIONES):
+        self.max_versiones = max(1, max_versiones)
+        self._versiones: 'OrderedDict[str, PartitionedDataset]' = OrderedDict()
+        self._vigente: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def publish(self, dataset: PartitionedDataset) -> PartitionedDataset:
+        """
+        Publica un dataset como versión vigente
+
+        Si la versión ya estaba publicada (mismos archivos subidos por otra sesión)
+        se devuelve la copia existente y se descarta la nueva.
+
+        Args:
+            dataset: Dataset consolidado
+
+        Returns:
+            Copia canónica del dataset para esa versión
+        """
+        with self._lock:
+            canonico = self._versiones.get(dataset.version, dataset)
+            self._versiones[dataset.version] = canonico
+            self._versiones.move_to_end(dataset.version)
+            self._vigente = dataset.version
+            while len(self._versiones) > self.max_versiones:
+                self._versiones.popitem(last=False)
+            return canonico
+
+    def get(self, version: Optional[str]) -> Optional[PartitionedDataset]:
+        """Dataset de una versión publicada o None si no existe (o ya se descartó)"""
+        if version is None:
+            return None
+        with self._lock:
+            return self._versiones.get(version)
+
+    def current(self) -> Optional[PartitionedDataset]:
+        """Dataset vigente o None si no se ha publicado ninguno"""
+        with self._lock:
+            return self._versiones.get(self._vigente) if self._vigente else None
+
+    def clear(self):
+        """Descarta todas las versiones publicadas"""
+        with self._lock:
+            self._versiones.clear()
+            self._vigente = None
+
+    def stats(self) -> Dict:
+        """Versiones publicadas y versión vigente"""
+        with self._lock:
+            return {
+                'versiones': list(self._versiones),
+                'vigente': self._vigente
+            }
+
+
+@st.cache_resource
+def get_dataset_registry() -> DatasetRegistry:
+    """
+    Registro compartido por todas las sesiones del servidor
+
+    Returns:
+        Instancia única de DatasetRegistry
+    """
+    return DatasetRegistry(REGISTRO_MAX_VERSIONES)
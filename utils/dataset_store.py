@@ -0,0 +1,439 @@
+"""
+Almacenamiento persistente del dataset consolidado (Parquet particionado)
+
+Estructura en disco:
+    <store_dir>/manifest.json
+    <store_dir>/<indicador>/<maquina>-<version>.parquet
+
+Cada partición (indicador, máquina) se escribe con nombre basado en su contenido y
+de forma atómica; el manifest se reemplaza al final, por lo que un lector siempre
+ve una versión completa del dataset. Una partición que no cambió no se vuelve a
+escribir.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from Config.constants import (
+    DATASET_STORE_DIR,
+    ESQUEMA_PROCESAMIENTO,
+    INDICADORES,
+    COLUMNAS_CATEGORICAS,
+    COLUMNAS_CALENDARIO_TIPOS,
+    KPI_FLOAT32
+)
+from utils.memo import register_frame
+
+MANIFEST = 'manifest.json'
+
+_write_lock = threading.Lock()
+
+
+def partition_version(df: pd.DataFrame) -> str:
+    """
+    Huella del contenido de una partición
+
+    Args:
+        df: DataFrame de la partición
+
+    Returns:
+        Huella hexadecimal corta
+    """
+    h = hashlib.sha256()
+    h.update('|'.join(f"{c}:{t}" for c, t in df.dtypes.items()).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def save_dataset(data: Mapping, store_dir: str = DATASET_STORE_DIR) -> str:
+    """
+    Persiste el dataset consolidado particionado por indicador y máquina
+
+    Solo se escriben las particiones que aún no tienen archivo en disco; las demás
+    se reutilizan. El manifest publicado contiene exactamente las particiones de data.
+
+    Args:
+        data: PartitionedDataset o {indicador: DataFrame consolidado}
+        store_dir: Carpeta del almacenamiento
+
+    Returns:
+        Versión del dataset guardado
+    """
+    dataset = data if isinstance(data, PartitionedDataset) else PartitionedDataset.from_frames(data)
+    raiz = Path(store_dir)
+    raiz.mkdir(parents=True, exist_ok=True)
+
+    with _write_lock:
+        anterior = read_manifest(store_dir)
+        entradas = []
+        for clave, info in dataset.partition_items():
+            maquina, indicador = clave
+            archivo = f"{_slug(indicador)}/{_slug(maquina)}-{info['version']}.parquet"
+            ruta = raiz / archivo
+            if not ruta.exists():
+                ruta.parent.mkdir(parents=True, exist_ok=True)
+                df = dataset.partition_frame(clave)
+                _atomic_write(ruta, lambda tmp: df.to_parquet(tmp, index=False))
+            entradas.append({
+                'maquina': maquina,
+                'indicador': indicador,
+                'archivo': archivo,
+                'version': info['version'],
+                'llave': info.get('llave'),
+                'esquema': info.get('esquema'),
+                'filas': info['filas'],
+                'reporte': info.get('reporte')
+            })
+
+        manifest = {
+            'version': dataset.version,
+            'fecha_carga': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'particiones': entradas,
+            # Archivos del manifest anterior: lectores en curso aún pueden necesitarlos
+            'archivos_previos': [p['archivo'] for p in anterior['particiones']] if anterior else []
+        }
+        _atomic_write(raiz / MANIFEST, lambda tmp: Path(tmp).write_text(
+            json.dumps(manifest, ensure_ascii=False, indent=2, default=_json_default), encoding='utf-8'))
+
+        _collect_garbage(raiz, manifest)
+
+    return dataset.version
+
+
+def read_manifest(store_dir: str = DATASET_STORE_DIR) -> Optional[Dict]:
+    """
+    Lee el manifest vigente del almacenamiento
+
+    Returns:
+        Dict del manifest o None si no existe
+    """
+    ruta = Path(store_dir) / MANIFEST
+    try:
+        return json.loads(ruta.read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return None
+
+
+def load_dataset(store_dir: str = DATASET_STORE_DIR) -> Optional['PartitionedDataset']:
+    """
+    Abre el dataset persistido sin leer las particiones todavía
+
+    Args:
+        store_dir: Carpeta del almacenamiento
+
+    Returns:
+        PartitionedDataset (mapping indicador -> DataFrame) o None si no hay datos guardados
+    """
+    manifest = read_manifest(store_dir)
+    if manifest is None or not manifest['particiones']:
+        return None
+
+    raiz = Path(store_dir)
+    particiones = {}
+    for p in manifest['particiones']:
+        # Particiones de otro esquema de procesamiento no se reutilizan al volver a subir el archivo
+        vigente = p.get('esquema') == ESQUEMA_PROCESAMIENTO
+        particiones[(p['maquina'], p['indicador'])] = {
+            'version': p['version'],
+            'llave': p.get('llave') if vigente else None,
+            'esquema': p.get('esquema'),
+            'filas': p['filas'],
+            'reporte': p.get('reporte'),
+            'ruta': raiz / p['archivo']
+        }
+    return PartitionedDataset(particiones, fecha_carga=manifest.get('fecha_carga'))
+
+
+def clear_dataset(store_dir: str = DATASET_STORE_DIR):
+    """Elimina el manifest y las particiones del almacenamiento"""
+    raiz = Path(store_dir)
+    with _write_lock:
+        (raiz / MANIFEST).unlink(missing_ok=True)
+        for ruta in raiz.glob('*/*.parquet'):
+            ruta.unlink(missing_ok=True)
+
+
+def compact_frame(df: pd.DataFrame, indicador: Optional[str] = None,
+                  kpi_float32: bool = KPI_FLOAT32) -> pd.DataFrame:
+    """
+    Convierte un DataFrame consolidado a tipos compactos
+
+    - Dimensiones (maquina, turno, operador, ...) como categóricas con categorías ordenadas
+    - Campos de calendario como int8/int16 (solo si los valores caben)
+    - KPI como float32 si kpi_float32 es True
+
+    Args:
+        df: DataFrame consolidado de un indicador
+        indicador: Nombre de la columna del KPI (opcional)
+        kpi_float32: Reducir el KPI a float32
+
+    Returns:
+        DataFrame nuevo con tipos compactos
+    """
+    columnas = {}
+    for col in COLUMNAS_CATEGORICAS:
+        if col not in df.columns:
+            continue
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            serie = serie.cat.remove_unused_categories()
+            columnas[col] = serie.cat.reorder_categories(sorted(serie.cat.categories))
+        else:
+            columnas[col] = serie.astype('category')
+
+    for col, tipo in COLUMNAS_CALENDARIO_TIPOS.items():
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]) and len(df) > 0:
+            limites = np.iinfo(tipo)
+            if limites.min <= df[col].min() and df[col].max() <= limites.max:
+                columnas[col] = df[col].astype(tipo)
+
+    if kpi_float32 and indicador in df.columns and pd.api.types.is_float_dtype(df[indicador]):
+        columnas[indicador] = df[indicador].astype(np.float32)
+
+    return df.assign(**columnas) if columnas else df
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """Memoria ocupada por un DataFrame (incluye el contenido de los textos)"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class PartitionedDataset(Mapping):
+    """
+    Dataset consolidado formado por particiones (maquina, indicador)
+
+    Se comporta como un mapping indicador -> DataFrame: el DataFrame de cada
+    indicador se arma (concatenando sus particiones en orden) la primera vez que
+    se accede. Las particiones pueden estar en memoria o en disco (lectura diferida).
+
+    Es inmutable: replace_partitions devuelve un dataset nuevo que comparte las
+    particiones y DataFrames de los indicadores no afectados.
+
+    Al armarse, cada DataFrame se compacta con compact_frame; memory_report
+    muestra la memoria antes y después.
+    """
+
+    def __init__(self, particiones: Dict[Tuple[str, str], Dict],
+                 fecha_carga: Optional[str] = None,
+                 frames: Optional[Dict[str, pd.DataFrame]] = None):
+        self._particiones = dict(particiones)
+        self.fecha_carga = fecha_carga
+        self._frames: Dict[str, pd.DataFrame] = dict(frames or {})
+        self._memoria: Dict[str, Tuple[int, int]] = {}
+        self._derivados: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._derivados_lock = threading.RLock()
+
+        self._por_indicador: Dict[str, List[Tuple[str, str]]] = {}
+        for clave in self._particiones:
+            self._por_indicador.setdefault(clave[1], []).append(clave)
+        orden_kpi = {ind: i for i, ind in enumerate(INDICADORES)}
+        self._indicadores = sorted(self._por_indicador, key=lambda ind: orden_kpi.get(ind, len(orden_kpi)))
+
+        self._kpi_versions = {
+            indicador: _combine_versions(
+                f"{m}/{self._particiones[(m, i)]['version']}" for m, i in claves
+            )
+            for indicador, claves in self._por_indicador.items()
+        }
+        self.version = _combine_versions(f"{ind}/{self._kpi_versions[ind]}" for ind in self._indicadores)
+
+    @classmethod
+    def from_frames(cls, data_dict: Dict[str, pd.DataFrame],
+                    llaves: Optional[Dict[Tuple[str, str], str]] = None) -> 'PartitionedDataset':
+        """
+        Crea un dataset a partir de DataFrames por indicador (una partición por máquina)
+
+        Args:
+            data_dict: {indicador: DataFrame consolidado}
+            llaves: Llave de ingesta opcional por partición
+
+        Returns:
+            PartitionedDataset
+        """
+        particiones = {}
+        for indicador, df in data_dict.items():
+            for maquina, df_maquina in df.groupby('maquina', sort=False, observed=True):
+                clave = (maquina, indicador)
+                particiones[clave] = make_partition(df_maquina.reset_index(drop=True),
+                                                    llave=(llaves or {}).get(clave))
+        return cls(particiones)
+
+    def __getitem__(self, indicador: str) -> pd.DataFrame:
+        if indicador not in self._por_indicador:
+            raise KeyError(indicador)
+        with self._lock:
+            if indicador not in self._frames:
+                claves = self._por_indicador[indicador]
+                frames = [self._load_partition(clave) for clave in claves]
+                df = pd.concat(frames, ignore_index=True)
+                bytes_antes = frame_bytes(df)
+                df = compact_frame(df, indicador)
+                self._memoria[indicador] = (bytes_antes, frame_bytes(df))
+                # Las particiones pasan a ser rebanadas del DataFrame armado (sin duplicar memoria)
+                inicio = 0
+                for clave, frame in zip(claves, frames):
+                    self._particiones[clave] = {**self._particiones[clave], 'df': df.iloc[inicio:inicio + len(frame)]}
+                    inicio += len(frame)
+                self._frames[indicador] = df
+                register_frame(df, (self._kpi_versions[indicador], indicador))
+            return self._frames[indicador]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._indicadores)
+
+    def __len__(self) -> int:
+        return len(self._indicadores)
+
+    def memory_report(self) -> pd.DataFrame:
+        """
+        Memoria de los indicadores ya armados, antes y después de compactar
+
+        Returns:
+            DataFrame con indicador, filas, bytes_antes, bytes_despues y ahorro_pct
+        """
+        with self._lock:
+            memoria = dict(self._memoria)
+            filas = {ind: len(df) for ind, df in self._frames.items()}
+        registros = [
+            {
+                'indicador': ind,
+                'filas': filas.get(ind, 0),
+                'bytes_antes': antes,
+                'bytes_despues': despues,
+                'ahorro_pct': (1 - despues / antes) * 100 if antes > 0 else 0.0
+            }
+            for ind, (antes, despues) in memoria.items()
+        ]
+        return pd.DataFrame(registros, columns=['indicador', 'filas', 'bytes_antes', 'bytes_despues', 'ahorro_pct'])
+
+    def derived(self, nombre: str, construir: Callable[['PartitionedDataset'], object]):
+        """
+        Artefacto derivado del dataset (tabla de hechos, cubos, ...) construido una sola vez
+
+        Como el dataset es inmutable, el artefacto es válido mientras exista esta versión.
+
+        Args:
+            nombre: Nombre del artefacto
+            construir: Función que recibe el dataset y construye el artefacto
+
+        Returns:
+            Artefacto construido (el mismo objeto en llamadas siguientes)
+        """
+        with self._derivados_lock:
+            if nombre not in self._derivados:
+                self._derivados[nombre] = construir(self)
+            return self._derivados[nombre]
+
+    def kpi_version(self, indicador: str) -> str:
+        """Versión de un indicador: solo cambia si cambia alguna de sus particiones"""
+        return self._kpi_versions[indicador]
+
+    def partition_items(self) -> List[Tuple[Tuple[str, str], Dict]]:
+        """Lista de (clave, metadatos) de las particiones en orden"""
+        return [(clave, self._particiones[clave]) for ind in self._indicadores for clave in self._por_indicador[ind]]
+
+    def partition_info(self, clave: Tuple[str, str]) -> Optional[Dict]:
+        """Metadatos de una partición (version, llave, esquema, filas, reporte) o None"""
+        return self._particiones.get(clave)
+
+    def partition_frame(self, clave: Tuple[str, str]) -> pd.DataFrame:
+        """DataFrame de una partición (maquina, indicador)"""
+        with self._lock:
+            return self._load_partition(clave)
+
+    def replace_partitions(self, nuevas: Dict[Tuple[str, str], Dict]) -> 'PartitionedDataset':
+        """
+        Crea un dataset nuevo con particiones reemplazadas o agregadas
+
+        Solo se descartan los DataFrames de los indicadores afectados; los demás
+        se comparten con este dataset sin copiarse.
+
+        Args:
+            nuevas: {(maquina, indicador): partición creada con make_partition}
+
+        Returns:
+            PartitionedDataset nuevo
+        """
+        particiones = dict(self._particiones)
+        particiones.update(nuevas)
+        afectados = {indicador for _, indicador in nuevas}
+        with self._lock:
+            frames = {ind: df for ind, df in self._frames.items() if ind not in afectados}
+            memoria = {ind: m for ind, m in self._memoria.items() if ind not in afectados}
+        nuevo = PartitionedDataset(particiones, fecha_carga=self.fecha_carga, frames=frames)
+        nuevo._memoria = memoria
+        return nuevo
+
+    def _load_partition(self, clave: Tuple[str, str]) -> pd.DataFrame:
+        info = self._particiones[clave]
+        if info.get('df') is None:
+            info = {**info, 'df': pd.read_parquet(info['ruta'])}
+            self._particiones[clave] = info
+        return info['df']
+
+
+def make_partition(df: pd.DataFrame, llave: Optional[str] = None, reporte: Optional[Dict] = None,
+                   esquema: Optional[int] = None) -> Dict:
+    """
+    Crea los metadatos de una partición en memoria
+
+    Args:
+        df: DataFrame de una sola máquina e indicador
+        llave: Llave de ingesta del archivo de origen (para detectar archivos sin cambios)
+        reporte: Reporte de validación del archivo de origen
+        esquema: ESQUEMA_PROCESAMIENTO con el que se generó df (None si no viene de la ingesta)
+
+    Returns:
+        Dict con df, version, llave, esquema, filas y reporte
+    """
+    return {
+        'df': df,
+        'version': partition_version(df),
+        'llave': llave,
+        'esquema': esquema,
+        'filas': int(len(df)),
+        'reporte': reporte
+    }
+
+
+def _combine_versions(partes) -> str:
+    return hashlib.sha256('|'.join(partes).encode('utf-8')).hexdigest()[:16]
+
+
+def _json_default(valor):
+    # Reportes de validación pueden traer tipos numpy
+    if hasattr(valor, 'item'):
+        return valor.item()
+    return str(valor)
+
+
+def _slug(valor: str) -> str:
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in str(valor))
+
+
+def _atomic_write(destino: Path, escribir):
+    fd, tmp = tempfile.mkstemp(dir=destino.parent, suffix='.tmp')
+    os.close(fd)
+    try:
+        escribir(tmp)
+        os.replace(tmp, destino)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _collect_garbage(raiz: Path, manifest: Dict):
+    vigentes = {p['archivo'] for p in manifest['particiones']} | set(manifest['archivos_previos'])
+    for ruta in raiz.glob('*/*.parquet'):
+        if ruta.relative_to(raiz).as_posix() not in vigentes:
+            ruta.unlink(missing_ok=True)
@@ -0,0 +1,182 @@
+"""
+Reducción de puntos (decimación) para series de tiempo largas en gráficos
+
+Con varios años x 3 turnos x varias máquinas, enviar cada punto al navegador hace
+pesado el JSON de Plotly. Una línea no puede mostrar más detalle que los pixeles
+del gráfico, así que cada serie se reduce a un número de puntos proporcional al
+ancho en pixeles conservando su forma:
+
+- 'lttb' (Largest-Triangle-Three-Buckets): elige en cada bucket el punto que forma
+  el triángulo de mayor área con sus vecinos; conserva picos y tendencias.
+- 'minmax': conserva el mínimo y el máximo de cada columna de pixeles; ningún pico
+  se pierde.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from Config.constants import GRAFICO_ANCHO_PX, DECIMACION_PUNTOS_POR_PX
+
+METODOS_DECIMACION = ('lttb', 'minmax')
+
+
+def target_points(ancho_px: int = GRAFICO_ANCHO_PX) -> int:
+    """
+    Número de puntos por serie para un gráfico de cierto ancho
+
+    Args:
+        ancho_px: Ancho del área de trazado en pixeles
+
+    Returns:
+        Puntos máximos por serie
+    """
+    return max(int(ancho_px * DECIMACION_PUNTOS_POR_PX), 3)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Posiciones de los puntos elegidos por Largest-Triangle-Three-Buckets
+
+    Args:
+        x: Valores del eje X (numéricos, ordenados)
+        y: Valores del eje Y (sin nulos)
+        n_out: Puntos a conservar (incluye el primero y el último)
+
+    Returns:
+        Arreglo ordenado de posiciones
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # n_out - 2 buckets para los puntos interiores (el primero y el último se conservan)
+    cortes = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Promedio de cada bucket (el "tercer punto" del triángulo del bucket anterior)
+    suma_x = np.add.reduceat(x[:n - 1], cortes[:-1])
+    suma_y = np.add.reduceat(y[:n - 1], cortes[:-1])
+    tamaños = np.diff(cortes)
+    prom_x = np.append(suma_x / tamaños, x[-1])
+    prom_y = np.append(suma_y / tamaños, y[-1])
+
+    elegidos = np.empty(n_out, dtype=np.int64)
+    elegidos[0] = 0
+    elegidos[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        inicio, fin = cortes[i], cortes[i + 1]
+        bx, by = x[inicio:fin], y[inicio:fin]
+        # Área (x2) del triángulo punto elegido anterior - candidato - promedio siguiente
+        areas = np.abs(
+            (x[a] - prom_x[i + 1]) * (by - y[a])
+            - (x[a] - bx) * (prom_y[i + 1] - y[a])
+        )
+        a = inicio + int(np.argmax(areas))
+        elegidos[i + 1] = a
+    return elegidos
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Posiciones del mínimo y el máximo de cada bucket de igual ancho en X
+
+    Args:
+        x: Valores del eje X (numéricos, ordenados)
+        y: Valores del eje Y (sin nulos)
+        n_out: Puntos a conservar (2 por bucket, más el primero y el último)
+
+    Returns:
+        Arreglo ordenado de posiciones
+    """
+    n = len(x)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n_buckets = (n_out - 2) // 2
+    rango = x[-1] - x[0]
+    if rango > 0:
+        bucket = np.minimum(((x - x[0]) / rango * n_buckets).astype(np.int64), n_buckets - 1)
+    else:
+        bucket = np.arange(n) * n_buckets // n
+
+    # Dentro de cada bucket, ordenado por y: el primero es el mínimo y el último el máximo
+    orden = np.lexsort((y, bucket))
+    b = bucket[orden]
+    primeros = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    ultimos = np.r_[primeros[1:] - 1, n - 1]
+    elegidos = np.concatenate([orden[primeros], orden[ultimos], [0, n - 1]])
+    return np.unique(elegidos)
+
+
+def decimate_frame(df: pd.DataFrame,
+                   x_col: str,
+                   y_col: str,
+                   n_out: int,
+                   method: str = 'lttb',
+                   group_col: Optional[str] = None) -> pd.DataFrame:
+    """
+    Reduce cada serie de un DataFrame a lo más n_out puntos
+
+    Las filas deben venir ordenadas por x_col. Si x_col no es numérica ni fecha
+    (p. ej. 'fecha_str'), se usa la posición de la fila dentro de la serie.
+
+    Args:
+        df: DataFrame con los datos
+        x_col: Columna del eje X
+        y_col: Columna del eje Y
+        n_out: Puntos máximos por serie
+        method: 'lttb' o 'minmax'
+        group_col: Columna que separa las series (opcional)
+
+    Returns:
+        df sin cambios si ninguna serie excede n_out; si no, un subconjunto de sus
+        filas (mismo orden) sin nulos en y_col
+    """
+    if method not in METODOS_DECIMACION:
+        raise ValueError(f"Método de decimación no válido: '{method}'")
+    seleccionar = lttb_indices if method == 'lttb' else minmax_indices
+
+    if _largest_series(df, group_col) <= n_out:
+        return df  # Ninguna serie excede el presupuesto: sin cambios
+
+    df = df[df[y_col].notna()]
+    if group_col is None:
+        grupos = [np.arange(len(df))]
+    else:
+        grupos = list(df.groupby(group_col, observed=True, sort=False).indices.values())
+
+    x_total = df[x_col]
+    y_total = df[y_col].to_numpy(dtype=np.float64)
+    posiciones = []
+    for pos in grupos:
+        if len(pos) > n_out:
+            x = _numeric_axis(x_total.iloc[pos])
+            if np.any(np.diff(x) < 0):
+                orden = np.argsort(x, kind='stable')
+                pos, x = pos[orden], x[orden]
+            pos = pos[seleccionar(x, y_total[pos], n_out)]
+        posiciones.append(pos)
+
+    if not posiciones:
+        return df
+    return df.iloc[np.sort(np.concatenate(posiciones))]
+
+
+def _largest_series(df: pd.DataFrame, group_col: Optional[str]) -> int:
+    if group_col is None or len(df) == 0:
+        return len(df)
+    return int(df.groupby(group_col, observed=True).size().max())
+
+
+def _numeric_axis(serie: pd.Series) -> np.ndarray:
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.to_numpy().astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.to_numpy(dtype=np.float64)
+    return np.arange(len(serie), dtype=np.float64)
@@ -0,0 +1,121 @@
+"""
+Tabla de hechos: los cuatro KPIs alineados por máquina, fecha y turno
+
+Una fila por (maquina, fecha, turno) con una columna por KPI (NaN si ese KPI no
+tiene registro) más operador, coordinador y campos de calendario. Permite filtrar
+y cruzar KPIs en una sola pasada en lugar de hacer merge entre pares de DataFrames.
+"""
+
+from collections.abc import Mapping
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from utils.dataset_store import PartitionedDataset, compact_frame
+from utils.memo import register_frame
+
+LLAVES = ['maquina', 'fecha', 'turno']
+COLUMNAS_DESCRIPTIVAS = ['operador', 'coordinador', 'fecha_str', 'dia', 'mes', 'año',
+                         'week', 'dia_semana', 'mes_asignado']
+
+
+def build_fact_table(data: Mapping) -> pd.DataFrame:
+    """
+    Construye la tabla de hechos alineando todos los KPIs
+
+    Cada registro se identifica con una llave entera (máquina, día, turno); la
+    alineación es un np.unique + searchsorted sobre esas llaves. Si un KPI tiene
+    varios registros con la misma llave se promedian. Operador, coordinador y
+    calendario se toman del primer KPI (en orden de data) que tenga la llave.
+
+    Args:
+        data: Mapping indicador -> DataFrame consolidado
+
+    Returns:
+        DataFrame ordenado por maquina, fecha y turno
+    """
+    frames = {ind: df for ind, df in data.items() if ind in df.columns and len(df) > 0}
+    if not frames:
+        return pd.DataFrame(columns=LLAVES + COLUMNAS_DESCRIPTIVAS + list(data.keys()))
+
+    maquinas = _union_categories(frames.values(), 'maquina')
+    turnos = _union_categories(frames.values(), 'turno')
+    base = min(df['fecha'].min() for df in frames.values()).to_datetime64().astype('datetime64[D]')
+    fin = max(df['fecha'].max() for df in frames.values()).to_datetime64().astype('datetime64[D]')
+    n_dias = int((fin - base).astype(np.int64)) + 1
+    n_turnos = len(turnos)
+
+    llaves = {}
+    for ind, df in frames.items():
+        m = pd.Categorical(df['maquina'], categories=maquinas).codes.astype(np.int64)
+        t = pd.Categorical(df['turno'], categories=turnos).codes.astype(np.int64)
+        d = (df['fecha'].to_numpy().astype('datetime64[D]') - base).astype(np.int64)
+        llaves[ind] = (m * n_dias + d) * n_turnos + t
+
+    universo = np.unique(np.concatenate(list(llaves.values())))
+    n = len(universo)
+
+    tabla = {
+        'maquina': pd.Categorical.from_codes(universo // (n_dias * n_turnos), categories=maquinas),
+        'fecha': (base + (universo // n_turnos) % n_dias).astype(next(iter(frames.values()))['fecha'].dtype),
+        'turno': pd.Categorical.from_codes(universo % n_turnos, categories=turnos)
+    }
+
+    # Columnas descriptivas: primera fuente que tenga cada llave
+    cubierto = np.zeros(n, dtype=bool)
+    piezas, destinos = [], []
+    descriptivas = [c for c in COLUMNAS_DESCRIPTIVAS if all(c in df.columns for df in frames.values())]
+    for ind, df in frames.items():
+        pos = np.searchsorted(universo, llaves[ind])
+        pos_unicas, filas = np.unique(pos, return_index=True)
+        nuevas = ~cubierto[pos_unicas]
+        cubierto[pos_unicas[nuevas]] = True
+        piezas.append(df[descriptivas].iloc[filas[nuevas]])
+        destinos.append(pos_unicas[nuevas])
+    orden = np.argsort(np.concatenate(destinos), kind='stable')
+    desc = pd.concat(piezas, ignore_index=True).iloc[orden].reset_index(drop=True)
+
+    # Una columna por KPI (promedio si hay registros repetidos con la misma llave)
+    for ind in data.keys():
+        if ind not in frames:
+            tabla[ind] = np.full(n, np.nan)
+            continue
+        valores = frames[ind][ind].to_numpy(dtype=np.float64, na_value=np.nan)
+        validos = ~np.isnan(valores)
+        pos = np.searchsorted(universo, llaves[ind][validos])
+        suma = np.bincount(pos, weights=valores[validos], minlength=n)
+        conteo = np.bincount(pos, minlength=n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            tabla[ind] = np.where(conteo > 0, suma / conteo, np.nan)
+
+    fact = pd.concat([pd.DataFrame(tabla), desc], axis=1)
+    return compact_frame(fact[LLAVES + descriptivas + list(data.keys())])
+
+
+def get_fact_table(data: Mapping) -> pd.DataFrame:
+    """
+    Tabla de hechos del dataset, construida una sola vez por versión
+
+    Args:
+        data: PartitionedDataset (se reutiliza la tabla ya construida) o dict de DataFrames
+
+    Returns:
+        DataFrame de build_fact_table (compartido: no modificar)
+    """
+    if isinstance(data, PartitionedDataset):
+        return data.derived('fact_table', _build_registered)
+    return build_fact_table(data)
+
+
+def _build_registered(data: PartitionedDataset) -> pd.DataFrame:
+    fact = build_fact_table(data)
+    register_frame(fact, (data.version, 'fact_table'))  # Firma para memorizar agregaciones
+    return fact
+
+
+def _union_categories(frames, columna: str) -> List[str]:
+    valores = set()
+    for df in frames:
+        valores.update(pd.unique(df[columna].dropna()))
+    return sorted(valores)
@@ -0,0 +1,247 @@
+"""
+Motor de filtros para los DataFrames de KPIs (fechas, máquina, turno, operador, LC)
+
+Cada DataFrame se indexa una sola vez por versión del dataset: fechas ordenadas
+(rango de fechas = dos searchsorted) y, por dimensión, los códigos de cada fila y
+las posiciones de cada valor. Un filtro devuelve las mismas filas y en el mismo
+orden que la máscara booleana equivalente, sin copias adicionales.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from Config.constants import FILTRO_MEMO_MAX
+from utils.dataset_store import PartitionedDataset
+from utils.memo import register_frame
+
+DIMENSIONES_FILTRO = ['maquina', 'turno', 'operador', 'coordinador']
+
+
+class FrameIndex:
+    """
+    Índice de filtrado sobre un DataFrame (no lo modifica ni lo copia)
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._fechas = df['fecha'].to_numpy()
+        self._orden = np.argsort(self._fechas, kind='stable')
+        self._fechas_ordenadas = self._fechas[self._orden]
+
+        self._codigos: Dict[str, np.ndarray] = {}
+        self._categorias: Dict[str, pd.Index] = {}
+        self._posiciones: Dict[str, Dict[object, np.ndarray]] = {}
+        for dim in DIMENSIONES_FILTRO:
+            if dim not in df.columns:
+                continue
+            categorico = pd.Categorical(df[dim])
+            codigos = categorico.codes.astype(np.int64)
+            self._codigos[dim] = codigos
+            self._categorias[dim] = categorico.categories
+            # Posiciones (en orden original) de cada valor de la dimensión
+            orden = np.argsort(codigos, kind='stable')
+            cortes = np.searchsorted(codigos[orden], np.arange(len(categorico.categories) + 1))
+            self._posiciones[dim] = {
+                valor: orden[cortes[i]:cortes[i + 1]]
+                for i, valor in enumerate(categorico.categories)
+            }
+
+    def positions(self, fecha_inicio=None, fecha_fin=None, **filtros) -> Optional[np.ndarray]:
+        """
+        Posiciones (en orden original) de las filas que cumplen los filtros
+
+        Args:
+            fecha_inicio: Fecha mínima incluida (opcional)
+            fecha_fin: Fecha máxima incluida (opcional)
+            **filtros: dimensión -> valores permitidos (None = sin filtro)
+
+        Returns:
+            Arreglo de posiciones, o None si se conservan todas las filas
+        """
+        n = len(self.df)
+        inicio = self._to_datetime64(fecha_inicio)
+        fin = self._to_datetime64(fecha_fin)
+        i0 = int(np.searchsorted(self._fechas_ordenadas, inicio, side='left')) if inicio is not None else 0
+        i1 = int(np.searchsorted(self._fechas_ordenadas, fin, side='right')) if fin is not None else n
+
+        activos = {}
+        for dim, valores in filtros.items():
+            if valores is None:
+                continue
+            if dim not in self._codigos:
+                raise KeyError(f"Dimensión de filtro no disponible: '{dim}'")
+            valores = [valores] if isinstance(valores, str) else list(valores)
+            permitidos = self._categorias[dim].isin(valores)
+            if permitidos.all():
+                continue  # Todos los valores seleccionados: no filtra nada
+            activos[dim] = permitidos
+
+        # Punto de partida: el rango de fechas o la dimensión con menos filas
+        costos = {
+            dim: sum(len(p) for p, ok in zip(self._posiciones[dim].values(), permitidos) if ok)
+            for dim, permitidos in activos.items()
+        }
+        dim_inicial = min(costos, key=costos.get) if costos else None
+
+        if dim_inicial is not None and costos[dim_inicial] < i1 - i0:
+            partes = [p for p, ok in zip(self._posiciones[dim_inicial].values(), activos.pop(dim_inicial)) if ok]
+            pos = np.sort(np.concatenate(partes)) if partes else np.empty(0, dtype=np.int64)
+            if inicio is not None or fin is not None:
+                fechas = self._fechas[pos]
+                dentro = np.ones(len(pos), dtype=bool)
+                if inicio is not None:
+                    dentro &= fechas >= inicio
+                if fin is not None:
+                    dentro &= fechas <= fin
+                pos = pos[dentro]
+        elif i0 == 0 and i1 == n and not activos:
+            return None
+        else:
+            pos = np.sort(self._orden[i0:i1])
+
+        for dim, permitidos in activos.items():
+            tabla = np.append(permitidos, False)  # Código -1 (nulo) nunca pasa
+            pos = pos[tabla[self._codigos[dim][pos]]]
+
+        return pos
+
+    def filter(self, fecha_inicio=None, fecha_fin=None, **filtros) -> pd.DataFrame:
+        """
+        Filtra el DataFrame (ver positions)
+
+        Returns:
+            El DataFrame original si no se descarta nada, una rebanada si las filas
+            son contiguas, o las filas seleccionadas en orden original
+        """
+        pos = self.positions(fecha_inicio, fecha_fin, **filtros)
+        if pos is None:
+            return self.df
+        if len(pos) == 0:
+            return self.df.iloc[0:0]
+        if pos[-1] - pos[0] + 1 == len(pos):
+            return self.df.iloc[pos[0]:pos[-1] + 1]
+        return self.df.take(pos)
+
+    def _to_datetime64(self, fecha):
+        if fecha is None:
+            return None
+        return pd.Timestamp(fecha).to_datetime64().astype(self._fechas.dtype)
+
+
+class FilterEngine:
+    """
+    Filtros sobre todos los KPIs de un dataset
+
+    Los índices se construyen al primer uso de cada KPI y los resultados recientes
+    se memorizan por firma de filtro, así que una recarga de la página que no cambia
+    los filtros no vuelve a filtrar. Los DataFrames devueltos son compartidos: no
+    modificarlos.
+    """
+
+    def __init__(self, data: Mapping, memo_max: int = FILTRO_MEMO_MAX):
+        self._data = data
+        self._indices: Dict[str, FrameIndex] = {}
+        self._memo: 'OrderedDict[tuple, pd.DataFrame]' = OrderedDict()
+        self.memo_max = memo_max
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def index(self, indicador: str) -> FrameIndex:
+        """Índice de un KPI (se construye una sola vez)"""
+        with self._lock:
+            if indicador not in self._indices:
+                self._indices[indicador] = FrameIndex(self._data[indicador])
+            return self._indices[indicador]
+
+    def filter(self, indicador: str, fecha_inicio=None, fecha_fin=None, **filtros) -> pd.DataFrame:
+        """
+        Filtra un KPI por rango de fechas (inclusivo) y dimensiones
+
+        Args:
+            indicador: KPI a filtrar
+            fecha_inicio: Fecha mínima incluida (opcional)
+            fecha_fin: Fecha máxima incluida (opcional)
+            **filtros: maquina/turno/operador/coordinador -> valores permitidos
+
+        Returns:
+            DataFrame filtrado (compartido: no modificar)
+        """
+        firma = _signature(indicador, fecha_inicio, fecha_fin, filtros)
+        with self._lock:
+            if firma in self._memo:
+                self._memo.move_to_end(firma)
+                self.hits += 1
+                return self._memo[firma]
+            self.misses += 1
+
+        resultado = self.index(indicador).filter(fecha_inicio, fecha_fin, **filtros)
+        version = getattr(self._data, 'version', None)
+        if version is not None:
+            # Las agregaciones sobre este resultado se memorizan sin recorrerlo
+            register_frame(resultado, (version, firma))
+
+        with self._lock:
+            self._memo[firma] = resultado
+            while len(self._memo) > self.memo_max:
+                self._memo.popitem(last=False)
+        return resultado
+
+    def filter_all(self, fecha_inicio=None, fecha_fin=None, **filtros) -> Dict[str, pd.DataFrame]:
+        """
+        Aplica los mismos filtros a todos los KPIs
+
+        Returns:
+            Dict indicador -> DataFrame filtrado
+        """
+        return {
+            indicador: self.filter(indicador, fecha_inicio, fecha_fin, **filtros)
+            for indicador in self._data.keys()
+        }
+
+    def stats(self) -> Dict:
+        """Uso de la memoria de resultados"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entradas': len(self._memo),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total * 100) if total > 0 else 0
+            }
+
+
+def get_filter_engine(data: Mapping) -> FilterEngine:
+    """
+    Motor de filtros del dataset, compartido por todas las sesiones de la misma versión
+
+    Args:
+        data: PartitionedDataset (se reutiliza el motor) o dict de DataFrames
+
+    Returns:
+        FilterEngine
+    """
+    if isinstance(data, PartitionedDataset):
+        return data.derived('filter_engine', FilterEngine)
+    return FilterEngine(data)
+
+
+def _signature(indicador: str, fecha_inicio, fecha_fin, filtros: Dict) -> tuple:
+    dims = []
+    for dim in sorted(filtros):
+        valores = filtros[dim]
+        if valores is None:
+            continue
+        valores = [valores] if isinstance(valores, str) else valores
+        dims.append((dim, tuple(sorted(map(str, valores)))))
+    return (
+        indicador,
+        pd.Timestamp(fecha_inicio) if fecha_inicio is not None else None,
+        pd.Timestamp(fecha_fin) if fecha_fin is not None else None,
+        tuple(dims)
+    )
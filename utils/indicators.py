@@ -0,0 +1,22 @@
+"""
+Metadatos de los indicadores (KPIs) definidos en INDICADORES
+"""
+
+from Config.constants import INDICADORES
+
+
+def get_kpi_direction(kpi_name: str) -> str:
+    """
+    Obtiene la dirección de mejora de un KPI
+    
+    Args:
+        kpi_name: Nombre del KPI
+    
+    Returns:
+        'alto' o 'bajo' indicando qué es mejor
+    """
+    for key, value in INDICADORES.items():
+        if kpi_name in value['variantes']:
+            return value['mejor']
+    
+    return 'alto'  # Default
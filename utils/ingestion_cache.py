@@ -0,0 +1,189 @@
+"""
+Caché de ingesta: evita re-procesar archivos que no cambiaron
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from Config.constants import INGESTION_CACHE_MAX_MB, INGESTION_CACHE_DIR, ESQUEMA_PROCESAMIENTO, COLUMNAS_PERCENTIL
+
+
+def make_ingestion_key(contenido: bytes, indicador: str, maquina: str, asignaciones_version: str) -> str:
+    """
+    Construye la llave de caché de un archivo procesado
+
+    Incluye ESQUEMA_PROCESAMIENTO y COLUMNAS_PERCENTIL, así que al cambiar el
+    procesamiento ningún resultado anterior (caché o partición guardada) se reutiliza.
+
+    Args:
+        contenido: Bytes del archivo subido
+        indicador: Indicador del archivo ('MTBF', 'UPDT', etc.)
+        maquina: Máquina a la que se asigna el archivo
+        asignaciones_version: Versión de las asignaciones (get_asignaciones_version)
+
+    Returns:
+        Llave hexadecimal
+    """
+    h = hashlib.sha256()
+    h.update(hashlib.sha256(contenido).digest())
+    percentiles = repr(sorted((nombre, list(by)) for nombre, by in COLUMNAS_PERCENTIL.items()))
+    for parte in (indicador, maquina, asignaciones_version, str(ESQUEMA_PROCESAMIENTO), percentiles):
+        h.update(b'\0')
+        h.update(parte.encode('utf-8'))
+    return h.hexdigest()
+
+
+def get_asignaciones_version(df_asignaciones: pd.DataFrame) -> str:
+    """
+    Calcula una huella del contenido de las asignaciones
+
+    Args:
+        df_asignaciones: DataFrame de asignaciones
+
+    Returns:
+        Huella hexadecimal (cambia si cambia cualquier celda o columna)
+    """
+    h = hashlib.sha256()
+    h.update('|'.join(map(str, df_asignaciones.columns)).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df_asignaciones, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+class IngestionCache:
+    """
+    Caché LRU de resultados de procesamiento por archivo (DataFrame + reporte)
+
+    El nivel en memoria se limita por bytes; el nivel en disco es opcional y guarda
+    cada entrada como pickle. Los DataFrames devueltos son compartidos: no modificarlos.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries: 'OrderedDict[str, Tuple[Tuple[Optional[pd.DataFrame], Dict], int]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Tuple[Optional[pd.DataFrame], Dict]]:
+        """Obtiene una entrada (memoria y luego disco) o None si no existe"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+        valor = self._read_disk(key)
+
+        with self._lock:
+            if valor is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store_memory(key, valor)
+        return valor
+
+    def put(self, key: str, valor: Tuple[Optional[pd.DataFrame], Dict]):
+        """Guarda una entrada en memoria (desalojando LRU) y en disco si está habilitado"""
+        with self._lock:
+            self._store_memory(key, valor)
+        self._write_disk(key, valor)
+
+    def clear(self):
+        """Vacía el nivel en memoria (el nivel en disco se conserva)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Estadísticas de uso de la caché"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entradas': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total * 100) if total > 0 else 0
+            }
+
+    def _store_memory(self, key: str, valor: Tuple[Optional[pd.DataFrame], Dict]):
+        tamaño = _estimate_bytes(valor)
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        if tamaño > self.max_bytes:
+            return  # No cabe en memoria; queda solo en disco
+        self._entries[key] = (valor, tamaño)
+        self._bytes += tamaño
+        while self._bytes > self.max_bytes:
+            _, (_, tamaño_lru) = self._entries.popitem(last=False)
+            self._bytes -= tamaño_lru
+
+    def _read_disk(self, key: str) -> Optional[Tuple[Optional[pd.DataFrame], Dict]]:
+        if self.disk_dir is None:
+            return None
+        ruta = self.disk_dir / f"{key}.pkl"
+        try:
+            with open(ruta, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ Entrada de caché ilegible ({ruta.name}): {e}")
+            return None
+
+    def _write_disk(self, key: str, valor: Tuple[Optional[pd.DataFrame], Dict]):
+        if self.disk_dir is None:
+            return
+        # Escritura atómica: archivo temporal + rename
+        fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.disk_dir / f"{key}.pkl")
+        except Exception as e:
+            print(f"⚠️ No se pudo escribir la caché en disco: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def _estimate_bytes(valor: Tuple[Optional[pd.DataFrame], Dict]) -> int:
+    df, _ = valor
+    tamaño = 1024  # Reporte de validación y overhead
+    if df is not None:
+        tamaño += int(df.memory_usage(index=True, deep=True).sum())
+    return tamaño
+
+
+_ingestion_cache: Optional[IngestionCache] = None
+_ingestion_cache_lock = threading.Lock()
+
+
+def get_ingestion_cache() -> IngestionCache:
+    """
+    Caché de ingesta compartida por todo el proceso (todas las sesiones)
+
+    Returns:
+        Instancia única de IngestionCache configurada con las constantes
+    """
+    global _ingestion_cache
+    with _ingestion_cache_lock:
+        if _ingestion_cache is None:
+            _ingestion_cache = IngestionCache(
+                max_bytes=INGESTION_CACHE_MAX_MB * 1024 * 1024,
+                disk_dir=INGESTION_CACHE_DIR
+            )
+        return _ingestion_cache
@@ -0,0 +1,355 @@
+"""
+Cubo de agregados por KPI: estadísticas precalculadas por máquina, turno,
+operador, coordinador y week
+
+Las páginas obtienen promedios, desviaciones, conteos, mínimos y máximos de
+cualquier combinación de esas dimensiones (rollup) sin recorrer los registros por
+turno. Con filtro de fechas, las celdas completamente dentro del rango salen del
+cubo y solo las celdas que cruzan un borde del rango se recalculan con sus
+propios registros, así que el resultado es exacto.
+"""
+
+from collections.abc import Mapping
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from Config.constants import QUANTIL_BINS, QUANTIL_EXACTO_MAX
+from utils.dataset_store import PartitionedDataset
+
+DIMENSIONES_CUBO = ['maquina', 'turno', 'operador', 'coordinador', 'año', 'week', 'mes_asignado']
+DIMENSIONES_FILTRO_CUBO = ['maquina', 'turno', 'operador', 'coordinador']
+
+
+class KPICube:
+    """
+    Cubo de un KPI: una celda por combinación de dimensiones con count, sum, m2
+    (suma de cuadrados de desviaciones respecto a la media de la celda, estable
+    numéricamente), min, max y el rango de fechas de sus registros
+
+    Cada celda guarda además un sketch de cuantiles: cuántos valores caen en cada
+    uno de quantile_bins intervalos de igual ancho entre el mínimo y el máximo
+    global del KPI. Los sketches se suman al agregar celdas, y un cuantil estimado
+    difiere del exacto a lo más en quantile_error = (máximo - mínimo) / quantile_bins.
+    """
+
+    def __init__(self, df: pd.DataFrame, kpi_col: str, quantile_bins: int = QUANTIL_BINS):
+        self.kpi_col = kpi_col
+        self.dimensiones = [d for d in DIMENSIONES_CUBO if d in df.columns]
+        self._fechas = df['fecha'].to_numpy()
+
+        valores = df[kpi_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        celda = df.groupby(self.dimensiones, observed=True, sort=True, dropna=False).ngroup().to_numpy()
+        n_celdas = int(celda.max()) + 1 if len(celda) > 0 else 0
+        self._valores = valores
+        self._celda = celda
+
+        # Registros de cada celda (para recalcular celdas que cruzan el borde del rango)
+        self._orden = np.argsort(celda, kind='stable')
+        self._cortes = np.searchsorted(celda[self._orden], np.arange(n_celdas + 1))
+
+        primeras = self._orden[self._cortes[:-1]]
+        celdas = df[self.dimensiones].iloc[primeras].reset_index(drop=True)
+        celdas = celdas.assign(**_stats_by_group(celda, valores, n_celdas))
+        fechas = pd.Series(self._fechas)
+        celdas['fecha_min'] = fechas.groupby(celda).min().to_numpy()
+        celdas['fecha_max'] = fechas.groupby(celda).max().to_numpy()
+        self.celdas = celdas
+
+        # Sketch de cuantiles: histograma disperso por celda sobre bins globales de igual ancho
+        validos = ~np.isnan(valores)
+        self.quantile_bins = max(1, int(quantile_bins))
+        self._v_min = float(valores[validos].min()) if validos.any() else 0.0
+        v_max = float(valores[validos].max()) if validos.any() else 0.0
+        self.quantile_error = (v_max - self._v_min) / self.quantile_bins
+        self._bin = np.full(len(valores), -1, dtype=np.int64)
+        self._bin[validos] = self._bin_of(valores[validos])
+        llaves, conteos = np.unique(celda[validos] * self.quantile_bins + self._bin[validos], return_counts=True)
+        self._sketch_celda = llaves // self.quantile_bins
+        self._sketch_bin = llaves % self.quantile_bins
+        self._sketch_conteo = conteos
+        self._sketch_cortes = np.searchsorted(self._sketch_celda, np.arange(n_celdas + 1))
+
+        self._codigos = {}
+        for dim in DIMENSIONES_FILTRO_CUBO:
+            if dim in celdas.columns:
+                categorico = pd.Categorical(celdas[dim])
+                self._codigos[dim] = (categorico.codes.astype(np.int64), categorico.categories)
+
+    def rollup(self, by: Sequence[str] = (), fecha_inicio=None, fecha_fin=None, **filtros) -> pd.DataFrame:
+        """
+        Agrega el KPI por las dimensiones indicadas
+
+        Equivale a filtrar los registros y hacer df.groupby(by)[kpi].agg(
+        ['count', 'sum', 'mean', 'std', 'min', 'max']) (mismos grupos; count sin nulos).
+
+        Args:
+            by: Dimensiones del resultado (vacío = un solo total)
+            fecha_inicio: Fecha mínima incluida (opcional)
+            fecha_fin: Fecha máxima incluida (opcional)
+            **filtros: maquina/turno/operador/coordinador -> valores permitidos
+
+        Returns:
+            DataFrame indexado por by con count, sum, mean, std, min y max
+        """
+        by = list(by)
+        faltantes = [d for d in by if d not in self.dimensiones]
+        if faltantes:
+            raise KeyError(f"Dimensiones no disponibles en el cubo: {faltantes}")
+
+        completas, parciales, inicio, fin = self._select(fecha_inicio, fecha_fin, filtros)
+
+        partes = [self.celdas.loc[completas]]
+        if parciales.any():
+            partes.append(self._recompute_cells(np.flatnonzero(parciales), inicio, fin))
+        tabla = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+
+        return _combine(tabla, by)
+
+    def quantiles(self, q: Sequence[float] = (0.25, 0.5, 0.75, 0.95), by: Sequence[str] = (),
+                  fecha_inicio=None, fecha_fin=None, exact: Optional[bool] = None,
+                  **filtros) -> pd.DataFrame:
+        """
+        Cuantiles del KPI por las dimensiones indicadas
+
+        En modo aproximado se suman los sketches de las celdas (sin recorrer los
+        registros, salvo los de celdas que cruzan un borde del rango de fechas); el
+        error es a lo más quantile_error. En modo exacto se usan los registros
+        (igual que df.groupby(by)[kpi].quantile(q) con interpolación lineal).
+
+        Args:
+            q: Cuantiles a calcular (0-1)
+            by: Dimensiones del resultado (vacío = un solo total)
+            fecha_inicio: Fecha mínima incluida (opcional)
+            fecha_fin: Fecha máxima incluida (opcional)
+            exact: True/False fuerza el modo; None usa el exacto si la selección
+                tiene a lo más QUANTIL_EXACTO_MAX registros
+            **filtros: maquina/turno/operador/coordinador -> valores permitidos
+
+        Returns:
+            DataFrame indexado por by con count y una columna por cuantil ('p50', 'p95', ...)
+        """
+        by = list(by)
+        q = np.asarray(q, dtype=np.float64)
+        completas, parciales, inicio, fin = self._select(fecha_inicio, fecha_fin, filtros)
+        ids_completas = np.flatnonzero(completas)
+        filas_parciales = self._rows_in_range(np.flatnonzero(parciales), inicio, fin)
+        filas_parciales = filas_parciales[self._bin[filas_parciales] >= 0]
+
+        n_total = int(self.celdas['count'].to_numpy()[ids_completas].sum()) + len(filas_parciales)
+        if exact is None:
+            exact = n_total <= QUANTIL_EXACTO_MAX
+        columnas = [_quantile_label(x) for x in q]
+
+        if exact:
+            filas = np.concatenate([self._rows_of_cells(ids_completas), filas_parciales])
+            filas = np.sort(filas[self._bin[filas] >= 0])
+            valores = pd.Series(self._valores[filas])
+            if by and len(filas) == 0:
+                return pd.DataFrame(columns=['count'] + columnas, dtype=np.float64,
+                                    index=pd.MultiIndex.from_arrays([[]] * len(by), names=by))
+            if by:
+                grupos = [self.celdas[d].to_numpy()[self._celda[filas]] for d in by]
+                agrupado = valores.groupby(grupos, sort=True)
+                resultado = agrupado.quantile(q).unstack()
+                resultado.columns = columnas
+                resultado.insert(0, 'count', agrupado.size())
+                resultado.index.names = by
+                return resultado
+            return pd.DataFrame([[len(valores)] + list(valores.quantile(q).to_numpy())],
+                                columns=['count'] + columnas, index=['total'])
+
+        # Sketch: (celda, bin, conteo) de las celdas completas + registros de las parciales
+        segmentos = self._sketch_cortes[ids_completas], self._sketch_cortes[ids_completas + 1]
+        entradas = _ranges(*segmentos)
+        celda = np.concatenate([self._sketch_celda[entradas], self._celda[filas_parciales]])
+        bins = np.concatenate([self._sketch_bin[entradas], self._bin[filas_parciales]])
+        conteo = np.concatenate([self._sketch_conteo[entradas], np.ones(len(filas_parciales), dtype=np.int64)])
+
+        ids_celdas, celda_local = np.unique(celda, return_inverse=True)
+        if by:
+            agrupado = self.celdas.iloc[ids_celdas][by].groupby(by, observed=True, sort=True)
+            grupo_celda = agrupado.ngroup().to_numpy()
+            indice = agrupado.size().index
+        else:
+            grupo_celda = np.zeros(len(ids_celdas), dtype=np.int64)
+            indice = pd.Index(['total'] if len(ids_celdas) > 0 else [])
+        grupo = grupo_celda[celda_local]
+
+        # Histograma por grupo (ordenado por grupo y bin) y rangos acumulados
+        llaves, inversa = np.unique(grupo * self.quantile_bins + bins, return_inverse=True)
+        conteo_llave = np.bincount(inversa, weights=conteo).astype(np.int64)
+        grupo_llave = llaves // self.quantile_bins
+        bin_llave = llaves % self.quantile_bins
+        acumulado = np.cumsum(conteo_llave)
+        n_grupo = np.bincount(grupo_llave, weights=conteo_llave, minlength=len(indice)).astype(np.int64)
+        base_grupo = np.concatenate([[0], np.cumsum(n_grupo)[:-1]])
+
+        resultado = pd.DataFrame({'count': n_grupo}, index=indice)
+        for columna, cuantil in zip(columnas, q):
+            posicion = (n_grupo - 1) * cuantil
+            k0 = np.floor(posicion)
+            fraccion = posicion - k0
+            v0 = self._value_at_rank(base_grupo + k0, acumulado, conteo_llave, bin_llave)
+            v1 = self._value_at_rank(base_grupo + np.ceil(posicion), acumulado, conteo_llave, bin_llave)
+            resultado[columna] = np.where(n_grupo > 0, v0 + fraccion * (v1 - v0), np.nan)
+        return resultado
+
+    def _value_at_rank(self, rango: np.ndarray, acumulado: np.ndarray,
+                       conteo: np.ndarray, bins: np.ndarray) -> np.ndarray:
+        # Valor estimado del k-ésimo registro (k desde 0): uniforme dentro de su bin
+        if len(acumulado) == 0:
+            return np.full(len(rango), np.nan)
+        entrada = np.minimum(np.searchsorted(acumulado, rango, side='right'), len(acumulado) - 1)
+        dentro = (rango - (acumulado[entrada] - conteo[entrada]) + 0.5) / conteo[entrada]
+        return self._v_min + (bins[entrada] + dentro) * self.quantile_error
+
+    def _bin_of(self, valores: np.ndarray) -> np.ndarray:
+        if self.quantile_error == 0:
+            return np.zeros(len(valores), dtype=np.int64)
+        bins = ((valores - self._v_min) / self.quantile_error).astype(np.int64)
+        return np.clip(bins, 0, self.quantile_bins - 1)
+
+    def _select(self, fecha_inicio, fecha_fin, filtros: dict):
+        # Celdas completamente dentro del rango y celdas que cruzan un borde
+        seleccion = np.ones(len(self.celdas), dtype=bool)
+        for dim, valores in filtros.items():
+            if valores is None:
+                continue
+            if dim not in self._codigos:
+                raise KeyError(f"Dimensión de filtro no disponible: '{dim}'")
+            codigos, categorias = self._codigos[dim]
+            valores = [valores] if isinstance(valores, str) else list(valores)
+            tabla = np.append(categorias.isin(valores), False)
+            seleccion &= tabla[codigos]
+
+        inicio = self._to_datetime64(fecha_inicio)
+        fin = self._to_datetime64(fecha_fin)
+        completas = seleccion.copy()
+        if inicio is not None:
+            completas &= self.celdas['fecha_min'].to_numpy() >= inicio
+        if fin is not None:
+            completas &= self.celdas['fecha_max'].to_numpy() <= fin
+        parciales = seleccion & ~completas
+        if inicio is not None:
+            parciales &= self.celdas['fecha_max'].to_numpy() >= inicio
+        if fin is not None:
+            parciales &= self.celdas['fecha_min'].to_numpy() <= fin
+        return completas, parciales, inicio, fin
+
+    def _rows_of_cells(self, ids: np.ndarray) -> np.ndarray:
+        return self._orden[_ranges(self._cortes[ids], self._cortes[ids + 1])]
+
+    def _rows_in_range(self, ids: np.ndarray, inicio, fin) -> np.ndarray:
+        filas = self._rows_of_cells(ids)
+        dentro = np.ones(len(filas), dtype=bool)
+        if inicio is not None:
+            dentro &= self._fechas[filas] >= inicio
+        if fin is not None:
+            dentro &= self._fechas[filas] <= fin
+        return filas[dentro]
+
+    def _recompute_cells(self, ids: np.ndarray, inicio, fin) -> pd.DataFrame:
+        # Registros de las celdas parciales que caen dentro del rango
+        filas = self._rows_in_range(ids, inicio, fin)
+        celda = self._celda[filas]
+        ids_presentes, grupo = np.unique(celda, return_inverse=True)
+        stats = _stats_by_group(grupo, self._valores[filas], len(ids_presentes))
+        return self.celdas.iloc[ids_presentes][self.dimensiones].reset_index(drop=True).assign(**stats)
+
+    def _to_datetime64(self, fecha):
+        if fecha is None:
+            return None
+        return pd.Timestamp(fecha).to_datetime64().astype(self._fechas.dtype)
+
+
+def get_kpi_cube(data: Mapping, indicador: str) -> KPICube:
+    """
+    Cubo de un KPI, construido una sola vez por versión del dataset
+
+    Args:
+        data: PartitionedDataset (se reutiliza el cubo) o dict de DataFrames
+        indicador: KPI
+
+    Returns:
+        KPICube
+    """
+    if isinstance(data, PartitionedDataset):
+        return data.derived(f'kpi_cube:{indicador}', lambda ds: KPICube(ds[indicador], indicador))
+    return KPICube(data[indicador], indicador)
+
+
+def _ranges(inicios: np.ndarray, fines: np.ndarray) -> np.ndarray:
+    # Concatenación vectorizada de np.arange(inicio, fin) para cada par
+    largos = fines - inicios
+    if len(largos) == 0 or largos.sum() == 0:
+        return np.empty(0, dtype=np.int64)
+    desplazamiento = np.repeat(inicios - np.cumsum(largos) + largos, largos)
+    return np.arange(largos.sum()) + desplazamiento
+
+
+def _quantile_label(q: float) -> str:
+    return f"p{q * 100:g}".replace('.', '_')
+
+
+def _stats_by_group(grupo: np.ndarray, valores: np.ndarray, n_grupos: int) -> dict:
+    validos = ~np.isnan(valores)
+    g, v = grupo[validos], valores[validos]
+    n = np.bincount(g, minlength=n_grupos)
+    suma = np.bincount(g, weights=v, minlength=n_grupos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = suma / n
+    m2 = np.bincount(g, weights=(v - media[g]) ** 2, minlength=n_grupos)
+
+    minimo = np.full(n_grupos, np.inf)
+    maximo = np.full(n_grupos, -np.inf)
+    np.minimum.at(minimo, g, v)
+    np.maximum.at(maximo, g, v)
+    return {
+        'count': n,
+        'sum': suma,
+        'm2': m2,
+        'min': np.where(n > 0, minimo, np.nan),
+        'max': np.where(n > 0, maximo, np.nan)
+    }
+
+
+def _combine(tabla: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+    columnas = ['count', 'sum', 'mean', 'std', 'min', 'max']
+    if len(tabla) == 0:
+        indice = pd.MultiIndex.from_arrays([[]] * len(by), names=by) if len(by) > 1 else pd.Index([], name=by[0] if by else None)
+        return pd.DataFrame(columns=columnas, index=indice, dtype=np.float64)
+
+    if by:
+        agrupado = tabla.groupby(by, observed=True, sort=True)
+        grupo = agrupado.ngroup().to_numpy()
+        indice = agrupado.size().index
+    else:
+        grupo = np.zeros(len(tabla), dtype=np.int64)
+        indice = pd.Index(['total'])
+    n_grupos = len(indice)
+
+    n_celda = tabla['count'].to_numpy(dtype=np.float64)
+    suma_celda = tabla['sum'].to_numpy()
+    n = np.bincount(grupo, weights=n_celda, minlength=n_grupos)
+    suma = np.bincount(grupo, weights=suma_celda, minlength=n_grupos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = suma / n
+        media_celda = np.where(n_celda > 0, suma_celda / n_celda, 0.0)
+        # Combinación de varianzas por grupos (Chan et al.)
+        desvio = np.where(n_celda > 0, media_celda - media[grupo], 0.0)
+        m2 = np.bincount(grupo, weights=tabla['m2'].to_numpy() + n_celda * desvio ** 2, minlength=n_grupos)
+        std = np.where(n > 1, np.sqrt(np.maximum(m2, 0) / (n - 1)), np.nan)
+
+    minimo = pd.Series(tabla['min'].to_numpy()).groupby(grupo).min().to_numpy()
+    maximo = pd.Series(tabla['max'].to_numpy()).groupby(grupo).max().to_numpy()
+
+    return pd.DataFrame({
+        'count': n.astype(np.int64),
+        'sum': suma,
+        'mean': np.where(n > 0, media, np.nan),
+        'std': std,
+        'min': minimo,
+        'max': maximo
+    }, index=indice)
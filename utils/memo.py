@@ -0,0 +1,203 @@
+"""
+Memoización de agregaciones (promedios por week/mes, preparación de gráficos, rankings)
+
+La llave de cada resultado es (función, firma del DataFrame, argumentos). La firma
+de un DataFrame que viene del motor de filtros o del dataset es (versión del
+dataset, KPI, filtros) y se obtiene sin recorrerlo; para cualquier otro DataFrame
+se usa una huella del contenido de las columnas que la función lee.
+"""
+
+import functools
+import hashlib
+import inspect
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional
+
+import pandas as pd
+
+from Config.constants import AGREGACION_MEMO_MAX
+
+_firmas: Dict[int, tuple] = {}
+_firmas_lock = threading.Lock()
+
+
+def register_frame(df: pd.DataFrame, firma: Hashable):
+    """
+    Asocia una firma a un DataFrame de solo lectura (p. ej. resultado de un filtro)
+
+    Args:
+        df: DataFrame que no se modificará
+        firma: Identifica su contenido, p. ej. (versión del dataset, KPI, filtros)
+    """
+    clave = id(df)
+
+    def _olvidar(_, clave=clave):
+        with _firmas_lock:
+            registro = _firmas.get(clave)
+            if registro is not None and registro[0]() is None:
+                del _firmas[clave]
+
+    with _firmas_lock:
+        _firmas[clave] = (weakref.ref(df, _olvidar), firma)
+
+
+def frame_signature(df: pd.DataFrame, columnas: Optional[List[str]] = None) -> Hashable:
+    """
+    Firma de un DataFrame: la registrada o una huella de su contenido
+
+    Args:
+        df: DataFrame
+        columnas: Columnas a considerar en la huella (por defecto todas)
+
+    Returns:
+        Valor hashable que cambia si cambia el contenido
+    """
+    with _firmas_lock:
+        registro = _firmas.get(id(df))
+    if registro is not None and registro[0]() is df:
+        return ('registrado', registro[1])
+
+    columnas = [c for c in (columnas or list(df.columns)) if c in df.columns]
+    h = hashlib.sha256()
+    h.update(f"{len(df)}|{'|'.join(map(str, columnas))}".encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df[columnas], index=True).to_numpy().tobytes())
+    return ('contenido', h.hexdigest())
+
+
+class AggregationMemo:
+    """
+    Caché LRU acotada de resultados de agregación con contadores de aciertos
+    """
+
+    def __init__(self, max_entries: int = AGREGACION_MEMO_MAX):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, object]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, llave: Hashable, calcular: Callable[[], object]):
+        """
+        Devuelve el resultado memorizado o lo calcula y lo guarda
+
+        Los DataFrames/Series se devuelven como copia: quien llama puede modificarlos.
+        """
+        with self._lock:
+            if llave in self._entries:
+                self._entries.move_to_end(llave)
+                self.hits += 1
+                return _copy(self._entries[llave])
+            self.misses += 1
+
+        resultado = calcular()
+
+        with self._lock:
+            self._entries[llave] = resultado
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return _copy(resultado)
+
+    def clear(self):
+        """Vacía la caché"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Estadísticas de uso de la caché"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entradas': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total * 100) if total > 0 else 0
+            }
+
+
+_aggregation_memo = AggregationMemo()
+
+
+def get_aggregation_memo() -> AggregationMemo:
+    """Caché de agregaciones compartida por todo el proceso (todas las sesiones)"""
+    return _aggregation_memo
+
+
+def call_key(funcion: Callable, args: tuple, kwargs: Dict,
+             columnas: Optional[Callable[..., List[str]]] = None) -> Hashable:
+    """
+    Llave de una llamada f(df, *args, **kwargs) para memorizar su resultado
+
+    Los argumentos se normalizan con la firma de f (posicionales y por nombre dan la
+    misma llave). Los DataFrames/Series se reemplazan por su firma y las listas,
+    tuplas y dicts por equivalentes hashables.
+
+    Args:
+        funcion: Función llamada
+        args: Argumentos posicionales
+        kwargs: Argumentos por nombre
+        columnas: Recibe los argumentos de f (por nombre) y devuelve las columnas
+            del primer argumento (DataFrame) que f lee
+
+    Returns:
+        Llave hashable
+
+    Raises:
+        TypeError: Si algún argumento no es hashable
+    """
+    argumentos = inspect.signature(funcion).bind(*args, **kwargs)
+    argumentos.apply_defaults()
+    valores = list(argumentos.arguments.items())
+
+    partes = []
+    for i, (nombre, valor) in enumerate(valores):
+        if i == 0 and columnas is not None and isinstance(valor, pd.DataFrame):
+            partes.append((nombre, frame_signature(valor, columnas(**argumentos.arguments))))
+        else:
+            partes.append((nombre, _freeze(valor)))
+    llave = (funcion.__module__, funcion.__qualname__, tuple(partes))
+    hash(llave)
+    return llave
+
+
+def memoize_aggregation(columnas: Callable[..., List[str]]):
+    """
+    Decorador para funciones de agregación f(df, *args, **kwargs)
+
+    Args:
+        columnas: Recibe los mismos argumentos que f y devuelve las columnas de df
+            que f lee (para la huella de DataFrames sin firma registrada)
+
+    Returns:
+        Decorador
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            try:
+                llave = call_key(funcion, args, kwargs, columnas)
+            except TypeError:
+                return funcion(*args, **kwargs)  # Argumentos no hashables: sin memoizar
+            return _aggregation_memo.get_or_compute(llave, lambda: funcion(*args, **kwargs))
+        return envoltura
+    return decorador
+
+
+def _freeze(valor):
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return frame_signature(valor.to_frame() if isinstance(valor, pd.Series) else valor)
+    if isinstance(valor, (list, tuple)):
+        return tuple(_freeze(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in valor.items()))
+    if isinstance(valor, set):
+        return frozenset(valor)
+    return valor
+
+
+def _copy(valor):
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return valor.copy()
+    return valor
@@ -0,0 +1,162 @@
+"""
+Detección de valores atípicos (IQR) con límites por grupo
+
+Cada máquina y turno tiene su propio nivel base, así que un mismo valor puede ser
+normal en una y atípico en otra. Los cuartiles se calculan por grupo (por
+defecto máquina x turno) en una sola pasada: se ordena por (grupo, valor) y se
+interpola dentro de cada segmento, igual que Series.quantile. No se copia el
+DataFrame: el resultado es una máscara booleana alineada con sus filas.
+"""
+
+from collections.abc import Mapping
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from Config.constants import OUTLIER_AGRUPACION
+from utils.memo import memoize_aggregation
+
+FACTOR_IQR = 1.5
+
+
+def grouped_quartiles(valores: np.ndarray, codigos: np.ndarray, n_grupos: int) -> Dict[str, np.ndarray]:
+    """
+    Q1 y Q3 (interpolación lineal) de cada grupo
+
+    Args:
+        valores: Valores (NaN se ignoran)
+        codigos: Grupo de cada valor (0..n_grupos-1; -1 = sin grupo)
+        n_grupos: Número de grupos
+
+    Returns:
+        Dict con 'q1', 'q3' y 'n' (un elemento por grupo; NaN si el grupo no tiene datos)
+    """
+    validos = ~np.isnan(valores) & (codigos >= 0)
+    v, c = valores[validos], codigos[validos]
+    orden = np.lexsort((v, c))
+    v, c = v[orden], c[orden]
+
+    n = np.bincount(c, minlength=n_grupos)
+    inicio = np.concatenate([[0], np.cumsum(n)[:-1]])
+    resultado = {'n': n}
+    for nombre, q in (('q1', 0.25), ('q3', 0.75)):
+        pos = q * (n - 1)
+        bajo = np.floor(pos).astype(np.int64)
+        alto = np.ceil(pos).astype(np.int64)
+        con_datos = n > 0
+        cuartil = np.full(n_grupos, np.nan)
+        i_bajo = (inicio + bajo)[con_datos]
+        i_alto = (inicio + alto)[con_datos]
+        cuartil[con_datos] = v[i_bajo] + (pos - bajo)[con_datos] * (v[i_alto] - v[i_bajo])
+        resultado[nombre] = cuartil
+    return resultado
+
+
+@memoize_aggregation(lambda df, kpi_col, by=None, factor=FACTOR_IQR: [kpi_col] + list(by or []))
+def outlier_summary(df: pd.DataFrame,
+                    kpi_col: str,
+                    by: Optional[List[str]] = None,
+                    factor: float = FACTOR_IQR) -> Dict:
+    """
+    Valores atípicos de un KPI con límites IQR por grupo (memoizada)
+
+    Args:
+        df: DataFrame con el KPI (no se modifica ni se copia)
+        kpi_col: Columna del KPI
+        by: Columnas que definen los grupos (None o [] = límites globales)
+        factor: Múltiplo del IQR para los límites
+
+    Returns:
+        Dict con 'mascara' (np.ndarray bool alineado con las filas de df),
+        'n_atipicos', 'n' (valores no nulos) y 'limites' (DataFrame por grupo con
+        q1, q3, limite_inf, limite_sup, n y n_atipicos). Compartido: no modificar.
+    """
+    valores = df[kpi_col].to_numpy(dtype=np.float64, na_value=np.nan)
+    by = list(by or [])
+
+    if by:
+        grupos = df.groupby(by, observed=True, sort=True)
+        codigos = grupos.ngroup().to_numpy(dtype=np.int64)
+        limites = grupos.size().index.to_frame(index=False)
+    else:
+        codigos = np.zeros(len(df), dtype=np.int64)
+        limites = pd.DataFrame(index=[0])
+    n_grupos = len(limites)
+
+    cuartiles = grouped_quartiles(valores, codigos, n_grupos)
+    iqr = cuartiles['q3'] - cuartiles['q1']
+    limite_inf = cuartiles['q1'] - factor * iqr
+    limite_sup = cuartiles['q3'] + factor * iqr
+
+    # Límites de cada fila (las filas sin grupo no son atípicas)
+    con_grupo = codigos >= 0
+    inf_fila = np.full(len(df), -np.inf)
+    sup_fila = np.full(len(df), np.inf)
+    inf_fila[con_grupo] = limite_inf[codigos[con_grupo]]
+    sup_fila[con_grupo] = limite_sup[codigos[con_grupo]]
+    with np.errstate(invalid='ignore'):
+        mascara = (valores < inf_fila) | (valores > sup_fila)
+
+    limites = limites.assign(
+        q1=cuartiles['q1'],
+        q3=cuartiles['q3'],
+        limite_inf=limite_inf,
+        limite_sup=limite_sup,
+        n=cuartiles['n'],
+        n_atipicos=np.bincount(codigos[mascara], minlength=n_grupos)
+    )
+
+    return {
+        'mascara': mascara,
+        'n_atipicos': int(mascara.sum()),
+        'n': int((~np.isnan(valores)).sum()),
+        'limites': limites
+    }
+
+
+def detect_outliers(data: Mapping,
+                    by: Optional[List[str]] = None,
+                    factor: float = FACTOR_IQR) -> Dict[str, Dict]:
+    """
+    Valores atípicos de todos los KPIs
+
+    Args:
+        data: Mapping indicador -> DataFrame (p. ej. resultado de filter_all)
+        by: Columnas que definen los grupos (por defecto OUTLIER_AGRUPACION; las
+            que no estén en un DataFrame se omiten)
+        factor: Múltiplo del IQR para los límites
+
+    Returns:
+        Dict indicador -> resultado de outlier_summary (solo KPIs con datos)
+    """
+    by = OUTLIER_AGRUPACION if by is None else by
+    resultados = {}
+    for indicador, df in data.items():
+        if indicador not in df.columns or len(df) == 0:
+            continue
+        columnas = [c for c in by if c in df.columns]
+        resultados[indicador] = outlier_summary(df, indicador, columnas, factor)
+    return resultados
+
+
+def outlier_counts(resultados: Dict[str, Dict]) -> pd.DataFrame:
+    """
+    Resumen de conteos por KPI
+
+    Args:
+        resultados: Resultado de detect_outliers
+
+    Returns:
+        DataFrame con columnas 'indicador', 'n', 'n_atipicos' y 'pct_atipicos'
+    """
+    filas = [
+        {
+            'indicador': indicador,
+            'n': r['n'],
+            'n_atipicos': r['n_atipicos'],
+            'pct_atipicos': (r['n_atipicos'] / r['n'] * 100) if r['n'] > 0 else 0.0
+        }
+        for indicador, r in resultados.items()
+    ]
+    return pd.DataFrame(filas, columns=['indicador', 'n', 'n_atipicos', 'pct_atipicos'])
@@ -0,0 +1,159 @@
+"""
+Percentiles por grupo con distribuciones ordenadas una sola vez
+
+Cada grupo (p. ej. máquina o máquina x turno) guarda sus valores ordenados; el
+percentil de un valor es la fracción de valores estrictamente menores (mismo
+criterio que calculate_percentile_rank) y sale de un np.searchsorted, así que
+muchas consultas cuestan O(log n) cada una en lugar de recorrer el grupo.
+"""
+
+from collections.abc import Mapping
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from Config.constants import COLUMNAS_PERCENTIL
+from utils.dataset_store import PartitionedDataset
+
+PERCENTIL_SIN_DATOS = 50.0  # Default si el grupo no tiene datos
+
+
+class PercentileIndex:
+    """
+    Distribuciones ordenadas de un KPI por grupo
+    """
+
+    def __init__(self, df: pd.DataFrame, kpi_col: str, by: Optional[List[str]] = None,
+                 mascara: Optional[np.ndarray] = None):
+        """
+        Args:
+            df: DataFrame con el KPI (no se modifica ni se copia)
+            kpi_col: Columna del KPI
+            by: Columnas que definen los grupos (None o [] = una sola distribución)
+            mascara: Filas que forman parte de las distribuciones (opcional)
+        """
+        self.kpi_col = kpi_col
+        self.by = list(by or [])
+        valores = df[kpi_col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        if self.by:
+            grupos = df.groupby(self.by, observed=True, sort=True)
+            codigos = grupos.ngroup().to_numpy(dtype=np.int64)
+            llaves = grupos.size().index
+        else:
+            codigos = np.zeros(len(df), dtype=np.int64)
+            llaves = pd.Index([None])
+        self._codigo_de: Dict[Hashable, int] = {llave: i for i, llave in enumerate(llaves)}
+        self._codigos = codigos
+        self._valores = valores
+
+        incluidos = ~np.isnan(valores) & (codigos >= 0)
+        if mascara is not None:
+            incluidos &= np.asarray(mascara, dtype=bool)
+        v, c = valores[incluidos], codigos[incluidos]
+        orden = np.lexsort((v, c))
+        self._ordenados = v[orden]
+        self._n = np.bincount(c, minlength=len(llaves))
+        self._inicio = np.concatenate([[0], np.cumsum(self._n)])
+
+    def group_size(self, grupo: Hashable = None) -> int:
+        """Número de valores en la distribución de un grupo"""
+        codigo = self._codigo_de.get(grupo)
+        return int(self._n[codigo]) if codigo is not None else 0
+
+    def rank(self, valores, grupos=None) -> np.ndarray:
+        """
+        Percentiles (0-100) de varios valores, cada uno dentro de su grupo
+
+        Args:
+            valores: Valores a evaluar
+            grupos: Grupo de cada valor (una llave para todos, o una por valor);
+                None si el índice no tiene grupos. Con varias columnas de grupo la
+                llave es una tupla.
+
+        Returns:
+            Arreglo de percentiles (PERCENTIL_SIN_DATOS si el grupo no tiene datos,
+            NaN si el valor es nulo)
+        """
+        valores = np.atleast_1d(np.asarray(valores, dtype=np.float64))
+        if grupos is None or np.ndim(grupos) == 0 or isinstance(grupos, tuple):
+            codigos = np.full(len(valores), self._codigo_de.get(grupos, -1), dtype=np.int64)
+        else:
+            codigos = np.array([self._codigo_de.get(g, -1) for g in grupos], dtype=np.int64)
+        return self._rank_codes(valores, codigos)
+
+    def row_ranks(self) -> np.ndarray:
+        """
+        Percentil de cada fila del DataFrame dentro de su propio grupo
+
+        Returns:
+            Arreglo alineado con las filas (NaN en filas sin valor o sin grupo)
+        """
+        resultado = self._rank_codes(self._valores, self._codigos)
+        resultado[self._codigos < 0] = np.nan
+        return resultado
+
+    def _rank_codes(self, valores: np.ndarray, codigos: np.ndarray) -> np.ndarray:
+        resultado = np.full(len(valores), PERCENTIL_SIN_DATOS)
+        for codigo in np.unique(codigos[codigos >= 0]):
+            n = self._n[codigo]
+            if n == 0:
+                continue
+            filas = codigos == codigo
+            segmento = self._ordenados[self._inicio[codigo]:self._inicio[codigo + 1]]
+            resultado[filas] = np.searchsorted(segmento, valores[filas], side='left') / n * 100
+        resultado[np.isnan(valores)] = np.nan
+        return resultado
+
+
+def get_percentile_index(data: Mapping, indicador: str, by: Optional[List[str]] = None,
+                         solo_asignados: bool = False) -> PercentileIndex:
+    """
+    Índice de percentiles de un KPI, construido una sola vez por versión del dataset
+
+    Args:
+        data: PartitionedDataset (se reutiliza el índice) o dict de DataFrames
+        indicador: KPI
+        by: Columnas que definen los grupos (None = una sola distribución)
+        solo_asignados: Excluir registros sin operador asignado ('SIN_ASIGNAR')
+
+    Returns:
+        PercentileIndex
+    """
+    def construir(dataset):
+        df = dataset[indicador]
+        mascara = (df['operador'] != 'SIN_ASIGNAR').to_numpy() if solo_asignados else None
+        return PercentileIndex(df, indicador, by, mascara)
+
+    if isinstance(data, PartitionedDataset):
+        nombre = f"percentiles:{indicador}:{','.join(by or [])}:{'asignados' if solo_asignados else 'todos'}"
+        return data.derived(nombre, construir)
+    return construir(data)
+
+
+def add_percentile_columns(df: pd.DataFrame, kpi_col: str,
+                           columnas: Optional[Dict[str, List[str]]] = None) -> pd.DataFrame:
+    """
+    Agrega columnas con el percentil de cada registro dentro de su grupo
+
+    Se usa al consolidar cada archivo (una máquina por archivo), así que 'pct_maquina'
+    es el percentil dentro de la máquina y 'pct_turno' dentro de máquina y turno.
+    Es opcional (COLUMNAS_PERCENTIL vacío por defecto): las columnas sirven para
+    vistas y exportaciones a nivel de registro; las páginas no las leen y los
+    percentiles agregados se calculan con get_percentile_index.
+
+    Args:
+        df: DataFrame con el KPI
+        kpi_col: Columna del KPI
+        columnas: Nombre de columna -> columnas de grupo (por defecto COLUMNAS_PERCENTIL)
+
+    Returns:
+        DataFrame con las columnas agregadas (float32)
+    """
+    columnas = COLUMNAS_PERCENTIL if columnas is None else columnas
+    nuevas = {
+        nombre: PercentileIndex(df, kpi_col, [c for c in by if c in df.columns]).row_ranks().astype(np.float32)
+        for nombre, by in columnas.items()
+    }
+    return df.assign(**nuevas)
@@ -0,0 +1,156 @@
+"""
+Estadísticas y ranking por entidad (LC, operador, máquina) en una sola pasada
+
+Cada KPI se agrupa una vez por entidad (groupby con todas las métricas a la vez)
+y el ranking normaliza el promedio de cada entidad con el mínimo y máximo del KPI,
+invirtiendo los KPIs donde "bajo es mejor". El Score Global es el promedio
+ponderado de los scores por KPI disponibles.
+"""
+
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from Config.constants import RANKING_PESOS_KPI
+from utils.indicators import get_kpi_direction
+from utils.memo import memoize_aggregation
+
+SCORE_SIN_RANGO = 50.0  # Score cuando todos los valores del KPI son iguales
+COLUMNAS_ESTADISTICAS = ['promedio', 'desv_est', 'minimo', 'maximo', 'registros', 'validos', 'maquinas']
+
+
+def _as_list(entidad: Union[str, Sequence[str]]) -> List[str]:
+    return [entidad] if isinstance(entidad, str) else list(entidad)
+
+
+@memoize_aggregation(lambda df, kpi_col, entidad: [kpi_col, 'maquina'] + _as_list(entidad))
+def entity_kpi_stats(df: pd.DataFrame, kpi_col: str, entidad: Union[str, List[str]]) -> pd.DataFrame:
+    """
+    Estadísticas de un KPI por entidad (memoizada)
+
+    Args:
+        df: DataFrame con el KPI
+        kpi_col: Columna del KPI
+        entidad: Columna(s) de agrupación, p. ej. 'coordinador' o ['coordinador', 'operador']
+
+    Returns:
+        DataFrame con las columnas de entidad más promedio, desv_est, minimo,
+        maximo, registros (filas), validos (valores no nulos del KPI) y maquinas
+        (máquinas distintas)
+    """
+    columnas = _as_list(entidad)
+    if len(df) == 0:
+        return pd.DataFrame(columns=columnas + COLUMNAS_ESTADISTICAS)
+    grupos = df.groupby(columnas, observed=True)
+    tabla = grupos[kpi_col].agg(['mean', 'std', 'min', 'max', 'size', 'count'])
+    tabla.columns = COLUMNAS_ESTADISTICAS[:6]
+    tabla['maquinas'] = grupos['maquina'].nunique() if 'maquina' in df.columns else 0
+    return tabla.reset_index()
+
+
+def entity_stats(data: Mapping, entidad: Union[str, List[str]]) -> pd.DataFrame:
+    """
+    Estadísticas de todos los KPIs por entidad
+
+    Args:
+        data: Mapping indicador -> DataFrame (p. ej. resultado de filter_all)
+        entidad: Columna(s) de agrupación
+
+    Returns:
+        DataFrame largo con 'indicador', las columnas de entidad y las de entity_kpi_stats
+    """
+    tablas = [
+        entity_kpi_stats(df, indicador, entidad).assign(indicador=indicador)
+        for indicador, df in data.items()
+        if indicador in df.columns and len(df) > 0
+    ]
+    columnas = ['indicador'] + _as_list(entidad) + COLUMNAS_ESTADISTICAS
+    if not tablas:
+        return pd.DataFrame(columns=columnas)
+    return pd.concat(tablas, ignore_index=True)[columnas]
+
+
+@memoize_aggregation(lambda df, kpi_col, entidad, periodo='week': [kpi_col, entidad, periodo])
+def entity_period_means(df: pd.DataFrame, kpi_col: str, entidad: str, periodo: str = 'week') -> pd.DataFrame:
+    """
+    Promedio de un KPI por entidad y periodo (evolución semanal, animaciones; memoizada)
+
+    Args:
+        df: DataFrame con el KPI
+        kpi_col: Columna del KPI
+        entidad: Columna de la entidad (p. ej. 'coordinador')
+        periodo: Columna del periodo (p. ej. 'week')
+
+    Returns:
+        DataFrame con columnas entidad, periodo y kpi_col, ordenado por entidad y periodo
+    """
+    return df.groupby([entidad, periodo], observed=True)[kpi_col].mean().reset_index()
+
+
+def compute_ranking(data: Mapping,
+                    entidad: str = 'coordinador',
+                    pesos: Optional[Dict[str, float]] = None,
+                    entidades: Optional[Sequence] = None,
+                    direcciones: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Ranking de entidades por score normalizado (0-100) de todos los KPIs
+
+    Para cada KPI: score = (promedio de la entidad - mínimo) / (máximo - mínimo) x 100
+    con mínimo y máximo de todos los registros del KPI, invertido si "bajo es
+    mejor" (50 si el KPI no tiene rango). Score_Global = promedio ponderado de los
+    scores disponibles de la entidad.
+
+    Args:
+        data: Mapping indicador -> DataFrame (p. ej. resultado de filter_all)
+        entidad: Columna de la entidad ('coordinador', 'operador', 'maquina')
+        pesos: Peso de cada KPI (por defecto RANKING_PESOS_KPI; KPIs sin peso = 1)
+        entidades: Entidades a incluir (opcional; por defecto todas las que tengan datos)
+        direcciones: Dirección de mejora por KPI ('alto'/'bajo'; por defecto la de INDICADORES)
+
+    Returns:
+        DataFrame con la entidad, 'Score_Global' y una columna de score por KPI,
+        ordenado de mayor a menor Score_Global
+    """
+    pesos = {**RANKING_PESOS_KPI, **(pesos or {})}
+    direcciones = direcciones or {}
+
+    scores = {}
+    for indicador, df in data.items():
+        if indicador not in df.columns or len(df) == 0:
+            continue
+        stats = entity_kpi_stats(df, indicador, entidad).set_index(entidad)['promedio']
+        if entidades is not None:
+            stats = stats[stats.index.isin(list(entidades))]
+        if len(stats) == 0:
+            continue
+
+        valores = df[indicador].to_numpy(dtype=np.float64, na_value=np.nan)
+        min_val, max_val = np.nanmin(valores), np.nanmax(valores)
+        if max_val != min_val:
+            score = (stats - min_val) / (max_val - min_val)
+            if direcciones.get(indicador, get_kpi_direction(indicador)) == 'bajo':
+                score = 1 - score
+            score = score * 100
+        else:
+            score = pd.Series(SCORE_SIN_RANGO, index=stats.index)
+        scores[indicador] = score.where(stats.notna())
+
+    if not scores:
+        return pd.DataFrame(columns=[entidad, 'Score_Global'])
+
+    tabla = pd.DataFrame(scores)
+    tabla = tabla.loc[tabla.notna().any(axis=1)]
+    w = np.array([pesos.get(indicador, 1.0) for indicador in tabla.columns], dtype=np.float64)
+    disponibles = tabla.notna().to_numpy()
+    suma_pesos = (disponibles * w).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        global_score = np.nansum(tabla.to_numpy() * w, axis=1) / suma_pesos
+
+    tabla.insert(0, 'Score_Global', global_score)
+    tabla.index.name = entidad
+    tabla = tabla.reset_index()
+    if isinstance(tabla[entidad].dtype, pd.CategoricalDtype):
+        tabla[entidad] = tabla[entidad].astype(object)
+    return tabla.sort_values('Score_Global', ascending=False, kind='stable').reset_index(drop=True)
@@ -0,0 +1,177 @@
+"""
+Tendencias de KPIs en forma cerrada para muchas series a la vez
+
+Para cada serie (entidad x KPI) la regresión lineal KPI ~ fecha sale de las
+sumas de x, y, xy, x² y y² por grupo (np.bincount), así que máquinas,
+operadores y LCs se calculan en una sola pasada sin ordenar ni copiar. La
+clasificación 'mejorando'/'empeorando'/'estable' es la misma de calculate_trend.
+"""
+
+import math
+from collections.abc import Mapping
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.indicators import get_kpi_direction
+from utils.memo import memoize_aggregation
+
+UMBRAL_TENDENCIA = 0.1  # |correlación| menor = 'estable'
+ICONOS_TENDENCIA = {'mejorando': '📈', 'empeorando': '📉', 'estable': '➡️'}
+
+
+def trend_label(correlacion: float, kpi_column: str) -> str:
+    """
+    Clasifica la tendencia según la correlación fecha-KPI y la dirección del KPI
+
+    Args:
+        correlacion: Correlación de Pearson entre fecha y KPI
+        kpi_column: Nombre del KPI
+
+    Returns:
+        'mejorando', 'empeorando' o 'estable' (también si la correlación es NaN:
+        serie constante o todas las fechas en un mismo día)
+    """
+    if np.isnan(correlacion) or abs(correlacion) < UMBRAL_TENDENCIA:
+        return 'estable'
+    elif get_kpi_direction(kpi_column) == 'alto':
+        return 'mejorando' if correlacion > 0 else 'empeorando'
+    else:
+        return 'mejorando' if correlacion < 0 else 'empeorando'
+
+
+def trend_arrow(tendencia: str) -> str:
+    """Ícono de una tendencia ('➡️' si no se reconoce)"""
+    return ICONOS_TENDENCIA.get(tendencia, '➡️')
+
+
+def student_t_pvalue(t: np.ndarray, gl: np.ndarray) -> np.ndarray:
+    """
+    p-valor de dos colas de la t de Student
+
+    Fórmula cerrada para grados de libertad enteros (Abramowitz & Stegun 26.7.3-4);
+    con más de 100 grados de libertad se usa la aproximación normal.
+
+    Args:
+        t: Estadísticos t
+        gl: Grados de libertad (enteros >= 1)
+
+    Returns:
+        p-valores (NaN donde t o gl no son válidos)
+    """
+    t = np.abs(np.asarray(t, dtype=np.float64))
+    gl = np.asarray(gl, dtype=np.int64)
+    p = np.full(t.shape, np.nan)
+
+    normal = (gl > 100) & ~np.isnan(t)
+    p[normal] = [math.erfc(v / math.sqrt(2)) for v in t[normal]]
+
+    exacta = (gl >= 1) & (gl <= 100) & ~np.isnan(t)
+    if exacta.any():
+        v, nu = t[exacta], gl[exacta]
+        theta = np.arctan(v / np.sqrt(nu))
+        s, c2 = np.sin(theta), np.cos(theta) ** 2
+        impar = nu % 2 == 1
+        # Serie de nu // 2 términos: t_0 = 1 (par) o cos θ (impar),
+        # t_j = t_{j-1} cos²θ (2j - 1) / (2j) (par) o (2j) / (2j + 1) (impar)
+        n_terminos = nu // 2
+        termino = np.where(impar, np.cos(theta), 1.0)
+        suma = np.where(n_terminos > 0, termino, 0.0)
+        for j in range(1, int(n_terminos.max(initial=0))):
+            factor = np.where(impar, (2 * j) / (2 * j + 1), (2 * j - 1) / (2 * j))
+            termino = termino * c2 * factor
+            suma = suma + np.where(j < n_terminos, termino, 0.0)
+        acumulada = np.where(impar, 2 / np.pi * (theta + s * suma), s * suma)
+        p[exacta] = np.clip(1 - acumulada, 0.0, 1.0)
+    return p
+
+
+@memoize_aggregation(lambda df, kpi_column, by=None, date_column='fecha': [kpi_column, date_column] + list(by or []))
+def compute_trends(df: pd.DataFrame,
+                   kpi_column: str,
+                   by: Optional[List[str]] = None,
+                   date_column: str = 'fecha') -> pd.DataFrame:
+    """
+    Tendencia lineal del KPI en el tiempo para cada grupo, en una sola pasada
+
+    Args:
+        df: DataFrame con KPI y fechas (no se modifica)
+        kpi_column: Columna del KPI
+        by: Columnas que definen las series, p. ej. ['operador'] (None = una serie)
+        date_column: Columna de fecha
+
+    Returns:
+        DataFrame con las columnas de by más 'n', 'pendiente' (unidades del KPI
+        por día), 'correlacion', 't', 'p_valor' y 'tendencia'
+    """
+    by = list(by or [])
+    fechas = pd.to_datetime(df[date_column]).to_numpy().astype('datetime64[D]')
+    y = df[kpi_column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    if by:
+        grupos = df.groupby(by, observed=True, sort=True)
+        codigos = grupos.ngroup().to_numpy(dtype=np.int64)
+        tabla = grupos.size().index.to_frame(index=False)
+    else:
+        codigos = np.zeros(len(df), dtype=np.int64)
+        tabla = pd.DataFrame(index=[0])
+    n_grupos = len(tabla)
+
+    validos = ~np.isnan(y) & ~np.isnat(fechas) & (codigos >= 0)
+    c, y = codigos[validos], y[validos]
+    # Días desde la primera fecha: mismas correlación y pendiente que el ordinal, mejor precisión
+    x = (fechas[validos] - fechas[validos].min()).astype(np.float64) if validos.any() else np.empty(0)
+
+    def suma(pesos=None):
+        return np.bincount(c, weights=pesos, minlength=n_grupos).astype(np.float64)
+
+    n = suma()
+    sx, sy = suma(x), suma(y)
+    sxx, syy, sxy = suma(x * x), suma(y * y), suma(x * y)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = n * sxy - sx * sy
+        var_x = n * sxx - sx * sx
+        var_y = n * syy - sy * sy
+        pendiente = np.where(var_x > 0, cov / var_x, np.nan)
+        correlacion = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+        correlacion[(var_x <= 0) | (var_y <= 0)] = np.nan
+        gl = n - 2
+        t = correlacion * np.sqrt(gl / (1 - correlacion ** 2))
+    t = np.where(gl >= 1, t, np.nan)
+
+    return tabla.assign(
+        n=n.astype(np.int64),
+        pendiente=pendiente,
+        correlacion=correlacion,
+        t=t,
+        p_valor=student_t_pvalue(t, np.maximum(gl, 0)),
+        tendencia=[trend_label(r, kpi_column) for r in correlacion]
+    )
+
+
+def compute_all_trends(data: Mapping,
+                       by: Optional[List[str]] = None,
+                       date_column: str = 'fecha') -> pd.DataFrame:
+    """
+    Tendencias de todos los KPIs por entidad (máquina, operador, LC, ...)
+
+    Args:
+        data: Mapping indicador -> DataFrame (p. ej. resultado de filter_all)
+        by: Columnas que definen las entidades (None = una serie por KPI)
+        date_column: Columna de fecha
+
+    Returns:
+        DataFrame de compute_trends con una columna 'indicador' adicional
+    """
+    tablas = [
+        compute_trends(df, indicador, by, date_column).assign(indicador=indicador)
+        for indicador, df in data.items()
+        if indicador in df.columns and len(df) > 0
+    ]
+    if not tablas:
+        return pd.DataFrame(columns=['indicador'] + list(by or []) +
+                            ['n', 'pendiente', 'correlacion', 't', 'p_valor', 'tendencia'])
+    tabla = pd.concat(tablas, ignore_index=True)
+    return tabla[['indicador'] + [c for c in tabla.columns if c != 'indicador']]
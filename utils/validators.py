@@ -2,9 +2,9 @@
 Funciones de validación de archivos y datos
 """
 
+import numpy as np
 import pandas as pd
-import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
 from Config.constants import (
@@ -87,6 +87,24 @@ def validate_file_structure(df: pd.DataFrame, indicador: str) -> Tuple[bool, str
     return True, "✅ Estructura válida"
 
 
+SHIFT_PATTERN = r'S[1-3]\s\d{2}-\d{2}-\d{4}'
+
+
+def shift_format_mask(shift_series: pd.Series) -> np.ndarray:
+    """
+    Máscara vectorizada de valores de 'Shift' con formato válido
+    
+    Args:
+        shift_series: Serie de pandas con valores de Shift
+    
+    Returns:
+        Arreglo booleano (True = formato correcto)
+    """
+    valores = shift_series.astype(str).str.strip()
+    validos = shift_series.notna() & valores.str.fullmatch(SHIFT_PATTERN).fillna(False).astype(bool)
+    return validos.to_numpy(dtype=bool)
+
+
 def validate_shift_format(shift_series: pd.Series) -> Tuple[bool, str, List[int]]:
     """
     Valida el formato de la columna 'Shift'
@@ -99,20 +117,11 @@ def validate_shift_format(shift_series: pd.Series) -> Tuple[bool, str, List[int]
     Returns:
         Tupla (es_valido, mensaje, lista_indices_invalidos)
     """
-    # Pattern: S[1-3] seguido de espacio y fecha DD-MM-YYYY
-    pattern = r'^S[1-3]\s\d{2}-\d{2}-\d{4}$'
-    
-    invalid_indices = []
-    
-    for idx, value in enumerate(shift_series):
-        if pd.isna(value):
-            invalid_indices.append(idx)
-            continue
-        
-        value_str = str(value).strip()
-        if not re.match(pattern, value_str):
-            invalid_indices.append(idx)
-    
+    invalid_indices = np.flatnonzero(~shift_format_mask(shift_series)).tolist()
+    return _shift_format_result(invalid_indices)
+
+
+def _shift_format_result(invalid_indices: List[int]) -> Tuple[bool, str, List[int]]:
     if invalid_indices:
         n_invalid = len(invalid_indices)
         sample = invalid_indices[:5]  # Primeros 5 errores
@@ -125,6 +134,84 @@ def validate_shift_format(shift_series: pd.Series) -> Tuple[bool, str, List[int]
     return True, "✅ Formato de Shift correcto", []
 
 
+def compute_column_stats(series: pd.Series, min_val: float = None, max_val: float = None,
+                         mask: Optional[np.ndarray] = None) -> Dict:
+    """
+    Calcula en una sola pasada las estadísticas de validación de una columna numérica
+    
+    Args:
+        series: Serie con valores numéricos
+        min_val: Valor mínimo permitido (opcional)
+        max_val: Valor máximo permitido (opcional)
+        mask: Filas a considerar (opcional, por defecto todas)
+    
+    Returns:
+        Dict con es_numerico, n, n_nulos, minimo, maximo, n_bajo_min, n_sobre_max
+    """
+    if not pd.api.types.is_numeric_dtype(series):
+        return {'es_numerico': False, 'n': int(len(series) if mask is None else mask.sum())}
+    
+    valores = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    if mask is not None:
+        valores = valores[mask]
+    
+    nulos = np.isnan(valores)
+    n_nulos = int(nulos.sum())
+    presentes = valores[~nulos]
+    
+    return {
+        'es_numerico': True,
+        'n': int(len(valores)),
+        'n_nulos': n_nulos,
+        'minimo': float(presentes.min()) if len(presentes) > 0 else np.nan,
+        'maximo': float(presentes.max()) if len(presentes) > 0 else np.nan,
+        'n_bajo_min': int((presentes < min_val).sum()) if min_val is not None else 0,
+        'n_sobre_max': int((presentes > max_val).sum()) if max_val is not None else 0
+    }
+
+
+def validate_indicator_frame(df: pd.DataFrame, kpi_col: Optional[str] = None,
+                             min_val: float = None, max_val: float = None) -> Dict:
+    """
+    Etapa de validación vectorizada de un archivo de indicador
+    
+    Calcula todas las verificaciones con una pasada por columna: formato de 'Shift'
+    (regex vectorizada) y, si se indica, nulos, mínimo/máximo y valores fuera de
+    rango de la columna del KPI (solo sobre las filas con Shift válido).
+    
+    Args:
+        df: DataFrame cargado desde el archivo
+        kpi_col: Columna del KPI a validar (opcional)
+        min_val: Valor mínimo permitido del KPI (opcional)
+        max_val: Valor máximo permitido del KPI (opcional)
+    
+    Returns:
+        Dict con:
+            mascara: arreglo booleano de filas a conservar
+            conteos: {'shift_invalidos', 'nulos', 'bajo_min', 'sobre_max'}
+            stats: estadísticas de la columna del KPI (compute_column_stats) o None
+            shift: tupla (es_valido, mensaje, indices_invalidos) de validate_shift_format
+    """
+    mascara = shift_format_mask(df[COLUMNA_SHIFT])
+    shift = _shift_format_result(np.flatnonzero(~mascara).tolist())
+    
+    stats = None
+    if kpi_col is not None and kpi_col in df.columns:
+        stats = compute_column_stats(df[kpi_col], min_val, max_val, mask=mascara)
+    
+    return {
+        'mascara': mascara,
+        'conteos': {
+            'shift_invalidos': len(shift[2]),
+            'nulos': stats.get('n_nulos', 0) if stats else 0,
+            'bajo_min': stats.get('n_bajo_min', 0) if stats else 0,
+            'sobre_max': stats.get('n_sobre_max', 0) if stats else 0
+        },
+        'stats': stats,
+        'shift': shift
+    }
+
+
 def validate_date_range(df: pd.DataFrame, fecha_inicio: str, fecha_fin: str) -> Tuple[bool, str]:
     """
     Valida que las fechas estén dentro del rango esperado (OPCIONAL - solo informativo)
@@ -168,7 +255,8 @@ def validate_turno_values(turno_series: pd.Series) -> Tuple[bool, str]:
 
 
 def validate_numeric_values(series: pd.Series, column_name: str, 
-                           min_val: float = None, max_val: float = None) -> Tuple[bool, str]:
+                           min_val: float = None, max_val: float = None,
+                           stats: Optional[Dict] = None) -> Tuple[bool, str]:
     """
     Valida valores numéricos de un KPI
     
@@ -177,30 +265,35 @@ def validate_numeric_values(series: pd.Series, column_name: str,
         column_name: Nombre de la columna
         min_val: Valor mínimo permitido (opcional)
         max_val: Valor máximo permitido (opcional)
+        stats: Estadísticas ya calculadas con compute_column_stats (opcional,
+            evita volver a recorrer la columna)
     
     Returns:
         Tupla (es_valido, mensaje)
     """
+    if stats is None:
+        stats = compute_column_stats(series, min_val, max_val)
+    
     # Verificar que sea numérico
-    if not pd.api.types.is_numeric_dtype(series):
+    if not stats['es_numerico']:
         return False, f"❌ Columna '{column_name}' debe ser numérica"
     
     # Contar valores nulos
-    n_nulls = series.isna().sum()
+    n_nulls = stats['n_nulos']
     if n_nulls > 0:
-        pct_nulls = (n_nulls / len(series)) * 100
+        pct_nulls = (n_nulls / stats['n']) * 100
         if pct_nulls > 50:  # Más del 50% nulos
             return False, f"❌ Demasiados valores nulos en '{column_name}': {pct_nulls:.1f}%"
     
     # Verificar valores negativos (si aplica)
     if min_val is not None:
-        n_below = (series < min_val).sum()
+        n_below = stats['n_bajo_min']
         if n_below > 0:
             return False, f"❌ {n_below} valores menores a {min_val} en '{column_name}'"
     
     # Verificar valores máximos (si aplica)
     if max_val is not None:
-        n_above = (series > max_val).sum()
+        n_above = stats['n_sobre_max']
         if n_above > 0:
             return False, f"❌ {n_above} valores mayores a {max_val} en '{column_name}'"
     
@@ -248,7 +341,7 @@ def check_data_completeness(df: pd.DataFrame, fecha_inicio: str, fecha_fin: str)
     completitud = (dias_unicos / dias_totales) * 100
     
     # Por turno
-    registros_por_turno = df.groupby('turno').size()
+    registros_por_turno = df.groupby('turno', observed=True).size()
     
     return {
         'dias_totales_esperados': dias_totales,
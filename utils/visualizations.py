@@ -2,14 +2,190 @@
 Funciones de visualización reutilizables con Plotly
 """
 
+import functools
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
 from typing import List, Dict, Optional
 import calendar
-from Config.constants import COLOR_PALETTE, INDICADORES
+from Config.constants import COLOR_PALETTE, INDICADORES, WEBGL_UMBRAL_PUNTOS, BOX_MAX_OUTLIERS, FIGURA_CACHE_MAX
+from utils.bootstrap import bootstrap_ranking
+from utils.decimation import decimate_frame, target_points
+from utils.indicators import get_kpi_direction
+from utils.memo import AggregationMemo, call_key, memoize_aggregation
+
+# Figuras ya construidas (JSON), compartidas por todas las sesiones
+_figure_cache = AggregationMemo(FIGURA_CACHE_MAX)
+
+
+def get_figure_cache() -> AggregationMemo:
+    """Caché de figuras (LRU con contadores de aciertos)"""
+    return _figure_cache
+
+
+def cache_figure(columnas=None):
+    """
+    Decorador para funciones create_*: memoriza la figura serializada
+    
+    La llave es la huella de los datos de entrada (firma registrada o
+    hash_pandas_object de las columnas que lee el gráfico) más los parámetros.
+    Cada llamada devuelve una figura nueva, que quien llama puede modificar.
+    
+    Args:
+        columnas: Recibe los mismos argumentos que la función y devuelve las
+            columnas del DataFrame que el gráfico lee (None = todas)
+    
+    Returns:
+        Decorador
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            try:
+                llave = call_key(funcion, args, kwargs, columnas)
+            except TypeError:
+                return funcion(*args, **kwargs)  # Parámetros no hashables: sin caché
+            serializada = _figure_cache.get_or_compute(llave, lambda: funcion(*args, **kwargs).to_json())
+            return pio.from_json(serializada)
+        return envoltura
+    return decorador
+
+
+@memoize_aggregation(lambda df, by, kpi_col: [by, kpi_col])
+def group_mean(df: pd.DataFrame, by: str, kpi_col: str) -> pd.DataFrame:
+    """
+    Promedio de un KPI por una columna (preparación de gráficos, memoizada)
+    
+    Args:
+        df: DataFrame con la columna de agrupación y el KPI
+        by: Columna de agrupación ('week', 'operador', ...)
+        kpi_col: Nombre de la columna del KPI
+    
+    Returns:
+        DataFrame con columnas by y kpi_col
+    """
+    return df.groupby(by, observed=True)[kpi_col].mean().reset_index()
+
+
+@memoize_aggregation(lambda df, x_col, y_col, value_col: [x_col, y_col, value_col])
+def pivot_mean(df: pd.DataFrame, x_col: str, y_col: str, value_col: str) -> pd.DataFrame:
+    """
+    Matriz de promedios y_col x x_col (preparación de heatmaps, memoizada)
+    
+    Args:
+        df: DataFrame con los datos
+        x_col: Columna para eje X (columnas de la matriz)
+        y_col: Columna para eje Y (filas de la matriz)
+        value_col: Columna de valores
+    
+    Returns:
+        DataFrame pivoteado
+    """
+    return df.pivot_table(
+        index=y_col,
+        columns=x_col,
+        values=value_col,
+        aggfunc='mean',
+        observed=True
+    )
+
+
+@memoize_aggregation(lambda df, kpi_col, top_n=10: ['operador', kpi_col])
+def operator_ranking_table(df: pd.DataFrame, kpi_col: str, top_n: int = 10) -> pd.DataFrame:
+    """
+    Top de operadores por promedio de un KPI (memoizada)
+    
+    Args:
+        df: DataFrame con columna 'operador' y KPI
+        kpi_col: Nombre de la columna del KPI
+        top_n: Número de operadores a mostrar
+    
+    Returns:
+        DataFrame con columnas 'operador' y kpi_col, del mejor al peor según la
+        dirección del KPI
+    """
+    op_avg = group_mean(df, 'operador', kpi_col)
+    return op_avg.sort_values(kpi_col, ascending=get_kpi_direction(kpi_col) == 'bajo').head(top_n)
+
+
+@memoize_aggregation(lambda df, column, bins=30: [column])
+def histogram_table(df: pd.DataFrame, column: str, bins: int = 30) -> pd.DataFrame:
+    """
+    Conteos por bin de igual ancho (preparación de histogramas, memoizada)
+    
+    Args:
+        df: DataFrame con los datos
+        column: Columna a analizar
+        bins: Número de bins
+    
+    Returns:
+        DataFrame con columnas 'inicio', 'fin' y 'conteo' (una fila por bin)
+    """
+    valores = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    valores = valores[np.isfinite(valores)]
+    if len(valores) == 0:
+        return pd.DataFrame({'inicio': [], 'fin': [], 'conteo': []})
+    
+    conteos, bordes = np.histogram(valores, bins=bins)
+    return pd.DataFrame({'inicio': bordes[:-1], 'fin': bordes[1:], 'conteo': conteos})
+
+
+@memoize_aggregation(lambda df, y_col, x_col=None, max_outliers=BOX_MAX_OUTLIERS: [y_col] + ([x_col] if x_col else []))
+def box_stats_table(df: pd.DataFrame,
+                    y_col: str,
+                    x_col: Optional[str] = None,
+                    max_outliers: int = BOX_MAX_OUTLIERS) -> pd.DataFrame:
+    """
+    Estadísticas de box plot por grupo (preparación de box plots, memoizada)
+    
+    Cuartiles con interpolación lineal y bigotes en el último valor dentro de
+    1.5 x IQR, igual que Plotly. De los valores atípicos se conservan a lo más
+    max_outliers por grupo, repartidos a lo largo de su rango (incluye los extremos).
+    
+    Args:
+        df: DataFrame con los datos
+        y_col: Columna con valores
+        x_col: Columna para agrupar (opcional)
+        max_outliers: Máximo de valores atípicos por grupo
+    
+    Returns:
+        DataFrame con columnas 'grupo', 'n', 'q1', 'mediana', 'q3', 'bigote_inf',
+        'bigote_sup' y 'atipicos' (arreglo de valores)
+    """
+    if x_col is None:
+        grupos = [(y_col, df[y_col])]
+    else:
+        grupos = list(df.groupby(x_col, observed=True)[y_col])
+    
+    filas = []
+    for grupo, serie in grupos:
+        valores = np.sort(serie.to_numpy(dtype=np.float64, na_value=np.nan))
+        valores = valores[np.isfinite(valores)]
+        if len(valores) == 0:
+            continue
+        q1, mediana, q3 = np.quantile(valores, [0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        # Valores ordenados: los bigotes son el primero/último dentro de las cercas
+        i0 = int(np.searchsorted(valores, q1 - 1.5 * iqr, side='left'))
+        i1 = int(np.searchsorted(valores, q3 + 1.5 * iqr, side='right'))
+        atipicos = np.concatenate([valores[:i0], valores[i1:]])
+        if len(atipicos) > max_outliers:
+            atipicos = atipicos[np.linspace(0, len(atipicos) - 1, max_outliers).round().astype(np.int64)]
+        filas.append({
+            'grupo': grupo,
+            'n': len(valores),
+            'q1': q1,
+            'mediana': mediana,
+            'q3': q3,
+            'bigote_inf': valores[i0],
+            'bigote_sup': valores[i1 - 1],
+            'atipicos': atipicos
+        })
+    
+    return pd.DataFrame(filas, columns=['grupo', 'n', 'q1', 'mediana', 'q3', 'bigote_inf', 'bigote_sup', 'atipicos'])
 
 
 def create_line_chart(df: pd.DataFrame, 
@@ -19,7 +195,9 @@ def create_line_chart(df: pd.DataFrame,
                      title: str = "",
                      x_label: str = "",
                      y_label: str = "",
-                     show_range_slider: bool = True) -> go.Figure:
+                     show_range_slider: bool = True,
+                     decimation: Optional[str] = 'lttb',
+                     max_points: Optional[int] = None) -> go.Figure:
     """
     Crea un line chart interactivo con Plotly
     
@@ -32,10 +210,15 @@ def create_line_chart(df: pd.DataFrame,
         x_label: Label eje X
         y_label: Label eje Y
         show_range_slider: Mostrar selector de rango
+        decimation: 'lttb', 'minmax' o None (enviar todos los puntos)
+        max_points: Puntos máximos por línea (por defecto según el ancho del gráfico)
     
     Returns:
         Figura de Plotly
     """
+    if decimation is not None:
+        df = decimate_frame(df, x_col, y_col, max_points or target_points(), decimation, color_col)
+    
     fig = px.line(
         df,
         x=x_col,
@@ -44,7 +227,8 @@ def create_line_chart(df: pd.DataFrame,
         title=title,
         labels={x_col: x_label, y_col: y_label},
         markers=True,
-        color_discrete_sequence=COLOR_PALETTE['maquinas']
+        color_discrete_sequence=COLOR_PALETTE['maquinas'],
+        render_mode='webgl' if len(df) > WEBGL_UMBRAL_PUNTOS else 'auto'
     )
     
     # Mejorar hover
@@ -78,6 +262,7 @@ def create_line_chart(df: pd.DataFrame,
     return fig
 
 
+@cache_figure(lambda df, x_col, y_col, color_col=None, *args, **kwargs: [x_col, y_col, color_col])
 def create_bar_chart(df: pd.DataFrame,
                     x_col: str,
                     y_col: str,
@@ -142,15 +327,72 @@ def create_animated_bar_chart(df: pd.DataFrame,
     Returns:
         Figura de Plotly
     """
-    fig = px.bar(
-        df,
-        x=x_col,
-        y=y_col,
-        color=color_col,
-        animation_frame=animation_frame,
+    # Matriz frame x categoría: la figura lleva una sola traza base y cada frame
+    # solo los valores de y (sin repetir trazas ni layout)
+    matriz = df.groupby([animation_frame, x_col], observed=True)[y_col].sum(min_count=1).unstack(x_col)
+    matriz = matriz.sort_index()
+    categorias = [str(c) for c in matriz.columns]
+    
+    colors = COLOR_PALETTE['maquinas']
+    if color_col is not None:
+        # Color de cada barra según el valor de color_col de su categoría
+        primeras = df.drop_duplicates(x_col)
+        color_por_x = dict(zip(primeras[x_col], primeras[color_col]))
+        valores_color = list(pd.unique(df[color_col]))
+        bar_colors = [colors[valores_color.index(color_por_x[c]) % len(colors)] for c in matriz.columns]
+    else:
+        bar_colors = colors[0]
+    
+    def _valores(fila):
+        return [None if pd.isna(v) else float(v) for v in fila]
+    
+    hover = f'{x_col}: %{{x}}<br>{y_col}: %{{y:.2f}}<extra></extra>'
+    nombres = [str(f) for f in matriz.index]
+    
+    fig = go.Figure(
+        data=[go.Bar(
+            x=categorias,
+            y=_valores(matriz.iloc[0]) if len(matriz) > 0 else [],
+            marker_color=bar_colors,
+            hovertemplate=hover
+        )],
+        frames=[
+            go.Frame(name=nombre, data=[go.Bar(y=_valores(fila))], traces=[0])
+            for nombre, fila in zip(nombres, matriz.to_numpy())
+        ]
+    )
+    
+    # Rangos globales fijos (no se recalculan en cada frame)
+    maximo = np.nanmax(matriz.to_numpy()) if matriz.notna().any().any() else 1.0
+    minimo = np.nanmin(matriz.to_numpy()) if matriz.notna().any().any() else 0.0
+    fig.update_yaxes(range=[min(0, minimo * 1.1), maximo * 1.1], title_text=y_col)
+    fig.update_xaxes(categoryorder='array', categoryarray=categorias, title_text=x_col)
+    
+    animacion = dict(frame=dict(duration=500, redraw=False), transition=dict(duration=500), mode='immediate')
+    fig.update_layout(
         title=title,
-        range_y=[0, df[y_col].max() * 1.1],  # Eje Y fijo
-        color_discrete_sequence=COLOR_PALETTE['maquinas']
+        updatemenus=[dict(
+            type='buttons',
+            direction='left',
+            showactive=False,
+            x=0.1, y=0, xanchor='right', yanchor='top',
+            pad=dict(r=10, t=70),
+            buttons=[
+                dict(label='▶', method='animate', args=[None, dict(animacion, fromcurrent=True)]),
+                dict(label='◼', method='animate',
+                     args=[[None], dict(frame=dict(duration=0, redraw=False), transition=dict(duration=0), mode='immediate')])
+            ]
+        )],
+        sliders=[dict(
+            active=0,
+            x=0.1, y=0, len=0.9, xanchor='left', yanchor='top',
+            pad=dict(b=10, t=60),
+            currentvalue=dict(prefix=f'{animation_frame}='),
+            steps=[
+                dict(label=nombre, method='animate', args=[[nombre], animacion])
+                for nombre in nombres
+            ]
+        )]
     )
     
     fig.update_layout(
@@ -181,15 +423,43 @@ def create_histogram(df: pd.DataFrame,
     Returns:
         Figura de Plotly
     """
-    fig = px.histogram(
-        df,
-        x=column,
-        title=title,
-        labels={column: x_label},
-        nbins=bins,
-        marginal="box",  # Agregar boxplot arriba
-        color_discrete_sequence=[color or COLOR_PALETTE['primary']]
-    )
+    # Bins y estadísticas de la caja se calculan aquí: la figura no lleva los valores crudos
+    color = color or COLOR_PALETTE['primary']
+    tabla = histogram_table(df, column, bins)
+    caja = box_stats_table(df, column)
+    
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.2, 0.8], vertical_spacing=0.02)
+    
+    if len(caja) > 0:
+        # Boxplot arriba (marginal)
+        stats = caja.iloc[0]
+        fig.add_trace(go.Box(
+            q1=[stats['q1']], median=[stats['mediana']], q3=[stats['q3']],
+            lowerfence=[stats['bigote_inf']], upperfence=[stats['bigote_sup']],
+            y=[column], orientation='h', name=column,
+            marker_color=color, hoverinfo='x'
+        ), row=1, col=1)
+        if len(stats['atipicos']) > 0:
+            fig.add_trace(go.Scatter(
+                x=stats['atipicos'], y=[column] * len(stats['atipicos']),
+                mode='markers', marker=dict(color=color, size=4), name='Atípicos',
+                hovertemplate='%{x:.2f}<extra></extra>'
+            ), row=1, col=1)
+    
+    fig.add_trace(go.Bar(
+        x=(tabla['inicio'] + tabla['fin']) / 2,
+        y=tabla['conteo'],
+        width=tabla['fin'] - tabla['inicio'],
+        customdata=tabla[['inicio', 'fin']].to_numpy(),
+        marker=dict(color=color, line=dict(width=0.5, color='white')),
+        name=column,
+        hovertemplate=f'{x_label or column}: %{{customdata[0]:.2f}} - %{{customdata[1]:.2f}}<br>count: %{{y}}<extra></extra>'
+    ), row=2, col=1)
+    
+    fig.update_layout(title=title)
+    fig.update_xaxes(title_text=x_label, row=2, col=1)
+    fig.update_yaxes(title_text='count', row=2, col=1)
+    fig.update_yaxes(showticklabels=False, row=1, col=1)
     
     # Agregar línea de promedio
     mean_val = df[column].mean()
@@ -198,7 +468,8 @@ def create_histogram(df: pd.DataFrame,
         line_dash="dash",
         line_color="red",
         annotation_text=f"Promedio: {mean_val:.2f}",
-        annotation_position="top right"
+        annotation_position="top right",
+        row=2, col=1
     )
     
     fig.update_layout(
@@ -228,26 +499,42 @@ def create_box_plot(df: pd.DataFrame,
     Returns:
         Figura de Plotly
     """
-    fig = px.box(
-        df,
-        x=x_col,
-        y=y_col,
-        title=title,
-        labels={y_col: y_label},
-        color=x_col,
-        color_discrete_sequence=COLOR_PALETTE['maquinas'],
-        points="outliers"  # Mostrar solo outliers
-    )
+    # Cuartiles, bigotes y atípicos se calculan aquí: la figura no lleva los valores crudos
+    caja = box_stats_table(df, y_col, x_col)
+    colors = COLOR_PALETTE['maquinas']
+    
+    fig = go.Figure()
+    for idx, stats in enumerate(caja.itertuples(index=False)):
+        color = colors[idx % len(colors)]
+        nombre = str(stats.grupo)
+        fig.add_trace(go.Box(
+            x=[nombre],
+            q1=[stats.q1], median=[stats.mediana], q3=[stats.q3],
+            lowerfence=[stats.bigote_inf], upperfence=[stats.bigote_sup],
+            name=nombre, marker_color=color
+        ))
+        if len(stats.atipicos) > 0:
+            fig.add_trace(go.Scatter(
+                x=[nombre] * len(stats.atipicos), y=stats.atipicos,
+                mode='markers', marker=dict(color=color, size=5), name=nombre,
+                hovertemplate='%{y:.2f}<extra></extra>'
+            ))
     
     fig.update_layout(
+        title=title,
+        xaxis_title=x_col or None,
+        yaxis_title=y_label or y_col,
         template='plotly_white',
         height=500,
         showlegend=False
     )
+    if x_col is None:
+        fig.update_xaxes(showticklabels=False)
     
     return fig
 
 
+@cache_figure(lambda df, x_col, y_col, value_col, *args, **kwargs: [x_col, y_col, value_col])
 def create_heatmap(df: pd.DataFrame,
                   x_col: str,
                   y_col: str,
@@ -269,12 +556,7 @@ def create_heatmap(df: pd.DataFrame,
         Figura de Plotly
     """
     # Pivotear datos para crear matriz
-    pivot_df = df.pivot_table(
-        index=y_col,
-        columns=x_col,
-        values=value_col,
-        aggfunc='mean'
-    )
+    pivot_df = pivot_mean(df, x_col, y_col, value_col)
     
     fig = go.Figure(data=go.Heatmap(
         z=pivot_df.values,
@@ -340,6 +622,7 @@ def create_scatter_plot(df: pd.DataFrame,
     return fig
 
 
+@cache_figure()
 def create_gauge_chart(value: float,
                       title: str = "",
                       min_val: float = 0,
@@ -393,7 +676,9 @@ def create_multi_line_comparison(df: pd.DataFrame,
                                  date_col: str,
                                  value_cols: List[str],
                                  title: str = "",
-                                 y_label: str = "") -> go.Figure:
+                                 y_label: str = "",
+                                 decimation: Optional[str] = 'lttb',
+                                 max_points: Optional[int] = None) -> go.Figure:
     """
     Crea gráfico de líneas múltiples para comparar varios KPIs
     
@@ -403,6 +688,8 @@ def create_multi_line_comparison(df: pd.DataFrame,
         value_cols: Lista de columnas a graficar
         title: Título del gráfico
         y_label: Label eje Y
+        decimation: 'lttb', 'minmax' o None (enviar todos los puntos)
+        max_points: Puntos máximos por línea (por defecto según el ancho del gráfico)
     
     Returns:
         Figura de Plotly
@@ -411,10 +698,19 @@ def create_multi_line_comparison(df: pd.DataFrame,
     
     colors = COLOR_PALETTE['maquinas']
     
+    # Cada KPI se reduce por separado (sus picos están en fechas distintas)
+    series = {
+        col: decimate_frame(df, date_col, col, max_points or target_points(), decimation)
+        if decimation is not None else df
+        for col in value_cols
+    }
+    total_puntos = sum(len(serie) for serie in series.values())
+    trazo = go.Scattergl if total_puntos > WEBGL_UMBRAL_PUNTOS else go.Scatter
+    
     for idx, col in enumerate(value_cols):
-        fig.add_trace(go.Scatter(
-            x=df[date_col],
-            y=df[col],
+        fig.add_trace(trazo(
+            x=series[col][date_col],
+            y=series[col][col],
             mode='lines+markers',
             name=col,
             line=dict(color=colors[idx % len(colors)], width=2),
@@ -442,6 +738,7 @@ def create_multi_line_comparison(df: pd.DataFrame,
     return fig
 
 
+@cache_figure(lambda df, path_cols, value_col, *args, **kwargs: list(path_cols) + [value_col])
 def create_sunburst_chart(df: pd.DataFrame,
                          path_cols: List[str],
                          value_col: str,
@@ -474,10 +771,12 @@ def create_sunburst_chart(df: pd.DataFrame,
     return fig
 
 
+@cache_figure(lambda df, kpi_col, *args, **kwargs: ['week', kpi_col])
 def create_week_performance_chart(df: pd.DataFrame,
                                   kpi_col: str,
                                   kpi_name: str,
-                                  better_direction: str = 'alto') -> go.Figure:
+                                  better_direction: str = 'alto',
+                                  week_avg: Optional[pd.DataFrame] = None) -> go.Figure:
     """
     Crea gráfico de performance por week con zonas de color
     
@@ -486,13 +785,16 @@ def create_week_performance_chart(df: pd.DataFrame,
         kpi_col: Nombre de la columna del KPI
         kpi_name: Nombre del KPI para display
         better_direction: 'alto' o 'bajo' (qué dirección es mejor)
+        week_avg: Promedios por week ya calculados, columnas 'week' y 'promedio'
+            (opcional, p. ej. desde el cubo de KPIs; evita agrupar df)
     
     Returns:
         Figura de Plotly
     """
     # Calcular promedio por week
-    week_avg = df.groupby('week')[kpi_col].mean().reset_index()
-    week_avg.columns = ['week', 'promedio']
+    if week_avg is None:
+        week_avg = group_mean(df, 'week', kpi_col)
+        week_avg.columns = ['week', 'promedio']
     
     # Calcular percentiles para zonas
     p25 = week_avg['promedio'].quantile(0.25)
@@ -546,10 +848,12 @@ def create_week_performance_chart(df: pd.DataFrame,
     return fig
 
 
+@cache_figure(lambda df, kpi_col, *args, **kwargs: ['operador', kpi_col])
 def create_operator_ranking(df: pd.DataFrame,
                            kpi_col: str,
                            kpi_name: str,
-                           top_n: int = 10) -> go.Figure:
+                           top_n: int = 10,
+                           show_ci: bool = False) -> go.Figure:
     """
     Crea gráfico de ranking de operadores
     
@@ -558,24 +862,48 @@ def create_operator_ranking(df: pd.DataFrame,
         kpi_col: Nombre de la columna del KPI
         kpi_name: Nombre del KPI para display
         top_n: Número de operadores a mostrar
+        show_ci: Mostrar intervalos de confianza bootstrap del promedio y la
+            probabilidad de cada operador de quedar en el top 3
     
     Returns:
         Figura de Plotly
     """
     # Promedio por operador
-    op_avg = df.groupby('operador')[kpi_col].mean().reset_index()
-    op_avg = op_avg.sort_values(kpi_col, ascending=False).head(top_n)
+    op_avg = operator_ranking_table(df, kpi_col, top_n)
     
     # Crear colores basados en ranking
     colors = ['green' if i < 3 else 'steelblue' for i in range(len(op_avg))]
     
+    error_x = None
+    hovertemplate = None
+    customdata = None
+    if show_ci:
+        ci = bootstrap_ranking(df, kpi_col, ['operador'])
+        ci = ci.assign(operador=ci['operador'].astype(str)).set_index('operador')
+        ci = ci.reindex(op_avg['operador'].astype(str))
+        error_x = dict(
+            type='data',
+            symmetric=False,
+            array=(ci['ci_sup'] - ci['promedio']).to_numpy(),
+            arrayminus=(ci['promedio'] - ci['ci_inf']).to_numpy(),
+            color='gray'
+        )
+        customdata = ci[['ci_inf', 'ci_sup', 'n', 'prob_top3']].to_numpy()
+        hovertemplate = (
+            '%{y}<br>Promedio: %{x:.2f}<br>IC: %{customdata[0]:.2f} - %{customdata[1]:.2f}'
+            '<br>Registros: %{customdata[2]}<br>P(Top 3): %{customdata[3]:.0%}<extra></extra>'
+        )
+    
     fig = go.Figure(go.Bar(
         x=op_avg[kpi_col],
         y=op_avg['operador'],
         orientation='h',
         marker=dict(color=colors),
         text=op_avg[kpi_col].round(2),
-        textposition='outside'
+        textposition='outside',
+        error_x=error_x,
+        customdata=customdata,
+        hovertemplate=hovertemplate
     ))
     
     fig.update_layout(